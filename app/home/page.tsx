@@ -25,6 +25,12 @@ import { usePathname } from 'next/navigation';
 import type React from 'react';
 import { useEffect, useRef, useState } from 'react';
 
+// Cards come from the server-side swipe deck: ranked by compatibility, with users
+// already swiped left out. Swiped cards leave the deck, so fetching again returns the
+// next ones; more are fetched once fewer than DECK_REFILL_AT cards remain
+const DECK_PAGE_SIZE = 20;
+const DECK_REFILL_AT = 5;
+
 // Type definition for user data from backend
 interface User {
         id: string;
@@ -179,7 +185,7 @@ export default function HomePage() {
 		const fetchUsers = async () => {
 			try {
 				setLoading(true);
-				const response = await apiClient.getUsers();
+				const response = await apiClient.getDeck(DECK_PAGE_SIZE);
 				if (response && Array.isArray(response)) {
 					setUsers(response);
 				} else {
@@ -199,6 +205,22 @@ export default function HomePage() {
 
 	const currentRoommate = users[currentIndex];
 
+	// Append the deck's next cards, skipping any already on screen (a swipe may not
+	// have left the deck yet)
+	const loadMoreCards = async () => {
+		try {
+			const response = await apiClient.getDeck(DECK_PAGE_SIZE);
+			if (Array.isArray(response)) {
+				setUsers((prev) => {
+					const seen = new Set(prev.map((user) => user.id));
+					return [...prev, ...response.filter((user: User) => !seen.has(user.id))];
+				});
+			}
+		} catch (error) {
+			console.error('Failed to fetch more users:', error);
+		}
+	};
+
 	const handleSwipe = async (direction: string) => {
 		if (!currentRoommate) return;
 
@@ -227,13 +249,14 @@ export default function HomePage() {
 			// Still proceed with UI update even if API call fails
 		}
 
+		if (users.length - currentIndex - 1 < DECK_REFILL_AT) {
+			await loadMoreCards();
+		}
+
 		setTimeout(() => {
 			setSwipeDirection(null);
-			if (currentIndex < users.length - 1) {
-				setCurrentIndex(currentIndex + 1);
-			} else {
-				setCurrentIndex(0);
-			}
+			// Swiped users cannot be swiped again, so the deck does not wrap around
+			setCurrentIndex((index) => index + 1);
 			setShowDetails(false);
 			setOffsetX(0);
 		}, 300);
@@ -367,7 +390,7 @@ export default function HomePage() {
 					)}
 
 					{/* No users state */}
-					{!loading && !error && users.length === 0 && (
+					{!loading && !error && !currentRoommate && (
 						<div className="flex items-center justify-center min-h-[60vh]">
 							<div className="text-center">
 								<p className="text-muted-foreground mb-4">No potential roommates found.</p>
@@ -0,0 +1,15 @@
+"""
+Shared tooling for the RoomieSwipe API test harnesses
+"""
+
+from .client import APIClient, get_client, build_headers
+from .metrics import LatencyHistogram, LatencyRecorder, print_latency_summary
+
+__all__ = [
+    "APIClient",
+    "get_client",
+    "build_headers",
+    "LatencyHistogram",
+    "LatencyRecorder",
+    "print_latency_summary",
+]
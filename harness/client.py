@@ -0,0 +1,114 @@
+"""
+Shared HTTP client for the RoomieSwipe API harnesses
+Keep-alive connection pooling, retries with backoff and per-request timing
+"""
+
+import os
+import threading
+import time
+from typing import Dict, Any, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from .metrics import LatencyRecorder
+
+DEFAULT_POOL_SIZE = int(os.environ.get("HARNESS_POOL_SIZE", "20"))
+DEFAULT_RETRIES = int(os.environ.get("HARNESS_RETRIES", "3"))
+DEFAULT_BACKOFF = float(os.environ.get("HARNESS_BACKOFF", "0.3"))
+DEFAULT_TIMEOUT = float(os.environ.get("HARNESS_TIMEOUT", "30"))
+
+# Only idempotent requests are retried on 5xx; connection errors are retried for every method
+RETRY_STATUSES = (502, 503, 504)
+RETRY_METHODS = frozenset(["GET", "PUT", "DELETE", "HEAD", "OPTIONS"])
+
+
+class APIClient:
+    """Pooled keep-alive client shared by every harness talking to one API"""
+
+    def __init__(self, api_url: str, pool_size: int = DEFAULT_POOL_SIZE,
+                 retries: int = DEFAULT_RETRIES, backoff_factor: float = DEFAULT_BACKOFF,
+                 timeout: float = DEFAULT_TIMEOUT):
+        self.api_url = api_url
+        self.timeout = timeout
+        self.recorder = LatencyRecorder()
+
+        retry = Retry(
+            total=retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=RETRY_STATUSES,
+            allowed_methods=RETRY_METHODS,
+            raise_on_status=False
+        )
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size,
+                              max_retries=retry)
+
+        self.session = requests.Session()
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def request(self, method: str, endpoint: str, data: Dict = None,
+                headers: Dict = None, files: Dict = None) -> requests.Response:
+        """Send a request over the pooled session and record how long it took"""
+        method = method.upper()
+        if method not in ("GET", "POST", "PUT", "DELETE"):
+            raise ValueError(f"Unsupported HTTP method: {method}")
+
+        kwargs: Dict[str, Any] = {"headers": headers, "timeout": self.timeout}
+        if files:
+            kwargs["files"] = files
+            kwargs["data"] = data
+        elif method in ("POST", "PUT"):
+            kwargs["json"] = data if data else None
+
+        url = f"{self.api_url}{endpoint}"
+        start = time.perf_counter()
+        try:
+            response = self.session.request(method, url, **kwargs)
+        except requests.exceptions.RequestException as e:
+            self._record(method, endpoint, None, time.perf_counter() - start)
+            raise Exception(f"Request failed: {str(e)}")
+
+        self._record(method, endpoint, response.status_code, time.perf_counter() - start)
+        return response
+
+    def _record(self, method: str, endpoint: str, status: Optional[int], elapsed: float):
+        # The recorder's histograms are bounded, so long runs do not grow memory
+        self.recorder.record(method, endpoint, elapsed * 1000.0,
+                             error=status is None or status >= 500)
+
+    def close(self):
+        """Release pooled connections"""
+        self.session.close()
+
+
+_clients: Dict[str, APIClient] = {}
+_clients_lock = threading.Lock()
+
+
+def get_client(api_url: str, **kwargs) -> APIClient:
+    """Return the process-wide client for an API URL, creating it on first use"""
+    with _clients_lock:
+        client = _clients.get(api_url)
+        if client is None:
+            client = APIClient(api_url, **kwargs)
+            _clients[api_url] = client
+        return client
+
+
+def build_headers(auth_token: Optional[str] = None, headers: Dict = None,
+                  files: Dict = None) -> Dict[str, str]:
+    """Build the default JSON/Bearer headers used by every harness"""
+    default_headers = {"Content-Type": "application/json"}
+    if auth_token:
+        default_headers["Authorization"] = f"Bearer {auth_token}"
+
+    if headers:
+        default_headers.update(headers)
+
+    # Remove Content-Type for file uploads
+    if files:
+        default_headers.pop("Content-Type", None)
+
+    return default_headers
@@ -0,0 +1,230 @@
+"""
+Performance regression comparator for saved harness result files
+Diffs per-endpoint latency percentiles and throughput between a baseline and
+a candidate run and exits non-zero when the candidate is significantly slower
+(Mann-Whitney on latency histograms) or has significantly lower throughput
+(Poisson rate test on request counts)
+"""
+
+import argparse
+import json
+import math
+import sys
+from typing import Dict, Any, List, Optional
+
+from .metrics import LatencyHistogram
+
+EXIT_OK = 0
+EXIT_REGRESSION = 1
+EXIT_INVALID_INPUT = 2
+
+PERCENTILE_FIELDS = ["p50_ms", "p90_ms", "p99_ms", "p999_ms"]
+# Latency fields --percentiles may gate on
+LATENCY_FIELDS = PERCENTILE_FIELDS + ["max_ms", "mean_ms"]
+
+
+def load_endpoints(path: str) -> Dict[str, Dict[str, Any]]:
+    """Per-endpoint latency summaries from a harness or load generator result file"""
+    with open(path) as f:
+        data = json.load(f)
+
+    if "latency" in data:
+        return data["latency"]["endpoints"]
+    if "steps" in data:
+        return data["steps"]
+    if "runs" in data and data["runs"]:
+        return data["runs"][-1]["steps"]
+    raise ValueError(f"{path} has no latency data; re-run the harness to record it")
+
+
+def mann_whitney_slower(baseline: LatencyHistogram, candidate: LatencyHistogram) -> Optional[float]:
+    """One-sided Mann-Whitney U p-value that the candidate's latencies are stochastically larger
+
+    Works directly on histogram buckets: every sample in a bucket is a tie and
+    receives the bucket's average rank, with the usual tie correction.
+    """
+    n1, n2 = baseline.total_count, candidate.total_count
+    if n1 == 0 or n2 == 0:
+        return None
+    if baseline.sub_bucket_bits != candidate.sub_bucket_bits:
+        raise ValueError("Histograms were recorded with different precision")
+
+    n = n1 + n2
+    rank = 0
+    candidate_rank_sum = 0.0
+    tie_term = 0
+    for index in sorted(set(baseline.counts) | set(candidate.counts)):
+        a = baseline.counts.get(index, 0)
+        b = candidate.counts.get(index, 0)
+        t = a + b
+        average_rank = rank + (t + 1) / 2.0
+        candidate_rank_sum += b * average_rank
+        tie_term += t ** 3 - t
+        rank += t
+
+    u = candidate_rank_sum - n2 * (n2 + 1) / 2.0
+    mean = n1 * n2 / 2.0
+    variance = n1 * n2 / 12.0 * ((n + 1) - tie_term / (n * (n - 1))) if n > 1 else 0.0
+    if variance <= 0:
+        return None
+    z = (u - mean) / math.sqrt(variance)
+    return 0.5 * math.erfc(z / math.sqrt(2))
+
+
+def throughput_drop_p_value(baseline: Dict[str, Any], candidate: Dict[str, Any]) -> Optional[float]:
+    """One-sided p-value that the candidate completed requests at a lower rate
+
+    Treats each run's request count as Poisson over its elapsed time (count /
+    throughput). Conditioned on the combined count, the candidate's count is
+    binomial under equal rates; a normal approximation with continuity
+    correction gives the lower tail.
+    """
+    n1, n2 = baseline.get("count", 0), candidate.get("count", 0)
+    r1, r2 = baseline.get("throughput_rps", 0.0), candidate.get("throughput_rps", 0.0)
+    if not (n1 and n2 and r1 and r2):
+        return None
+    t1, t2 = n1 / r1, n2 / r2
+    n = n1 + n2
+    share = t2 / (t1 + t2)
+    variance = n * share * (1 - share)
+    if variance <= 0:
+        return None
+    z = (n2 + 0.5 - n * share) / math.sqrt(variance)
+    return 0.5 * math.erfc(-z / math.sqrt(2))
+
+
+def relative_change(before: float, after: float) -> Optional[float]:
+    """Percent change, or None when there is no baseline to compare against"""
+    if before == 0:
+        return 0.0 if after == 0 else None
+    return (after - before) / before * 100.0
+
+
+def compare_endpoint(baseline: Dict[str, Any], candidate: Dict[str, Any], threshold: float,
+                     alpha: float, percentiles: List[str]) -> Dict[str, Any]:
+    """Diff one endpoint and decide whether it regressed"""
+    p_value = None
+    if "histogram" in baseline and "histogram" in candidate:
+        p_value = mann_whitney_slower(LatencyHistogram.from_dict(baseline["histogram"]),
+                                      LatencyHistogram.from_dict(candidate["histogram"]))
+    significant = p_value is not None and p_value < alpha
+
+    changes = {}
+    reasons = []
+    for field in percentiles:
+        change = relative_change(baseline.get(field, 0.0), candidate.get(field, 0.0))
+        changes[field] = change
+        if change is not None and change > threshold and significant:
+            reasons.append(f"{field} +{change:.1f}%")
+
+    # Throughput drops are held to the same bar: past the threshold and significant
+    throughput_change = relative_change(baseline.get("throughput_rps", 0.0),
+                                        candidate.get("throughput_rps", 0.0))
+    throughput_p_value = throughput_drop_p_value(baseline, candidate)
+    changes["throughput_rps"] = throughput_change
+    if (throughput_change is not None and throughput_change < -threshold
+            and throughput_p_value is not None and throughput_p_value < alpha):
+        reasons.append(f"throughput {throughput_change:.1f}%")
+
+    return {
+        "baseline_count": baseline.get("count", 0),
+        "candidate_count": candidate.get("count", 0),
+        "changes": changes,
+        "p_value": p_value,
+        "throughput_p_value": throughput_p_value,
+        "regressed": bool(reasons),
+        "reasons": reasons
+    }
+
+
+def compare_files(baseline_path: str, candidate_path: str, threshold: float = 10.0,
+                  alpha: float = 0.05, percentiles: List[str] = None) -> Dict[str, Any]:
+    """Compare every endpoint present in both result files"""
+    percentiles = percentiles or PERCENTILE_FIELDS
+    baseline = load_endpoints(baseline_path)
+    candidate = load_endpoints(candidate_path)
+
+    endpoints = {}
+    for name in sorted(set(baseline) & set(candidate)):
+        endpoints[name] = compare_endpoint(baseline[name], candidate[name], threshold, alpha, percentiles)
+
+    return {
+        "baseline": baseline_path,
+        "candidate": candidate_path,
+        "threshold_percent": threshold,
+        "alpha": alpha,
+        "endpoints": endpoints,
+        "missing_in_candidate": sorted(set(baseline) - set(candidate)),
+        "new_in_candidate": sorted(set(candidate) - set(baseline)),
+        "regressions": [name for name, result in endpoints.items() if result["regressed"]]
+    }
+
+
+def print_report(report: Dict[str, Any], percentiles: List[str]):
+    print(f"📊 Baseline:  {report['baseline']}")
+    print(f"📊 Candidate: {report['candidate']}")
+    print(f"Threshold: {report['threshold_percent']:.1f}%  alpha: {report['alpha']}")
+    print()
+    columns = percentiles + ["throughput_rps"]
+    print(f"{'endpoint':<40} " + " ".join(f"{c.replace('_ms', '').replace('_rps', ''):>10}" for c in columns)
+          + f" {'p-value':>9}")
+    for name, result in report["endpoints"].items():
+        cells = " ".join(f"{result['changes'][c]:>+9.1f}%" if result["changes"][c] is not None else f"{'new':>10}"
+                         for c in columns)
+        p_value = f"{result['p_value']:.4f}" if result["p_value"] is not None else "n/a"
+        status = "❌" if result["regressed"] else "✅"
+        print(f"{name:<40} {cells} {p_value:>9} {status}")
+
+    for name in report["missing_in_candidate"]:
+        print(f"⚠️  {name} missing from candidate run")
+
+    print()
+    if report["regressions"]:
+        print(f"❌ {len(report['regressions'])} endpoint(s) regressed:")
+        for name in report["regressions"]:
+            print(f"   {name}: {', '.join(report['endpoints'][name]['reasons'])}")
+    else:
+        print("🎉 No significant performance regressions")
+
+
+def parse_args(argv: List[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Compare latency between two saved harness result files")
+    parser.add_argument("baseline", help="result file from the known-good run")
+    parser.add_argument("candidate", help="result file from the run under test")
+    parser.add_argument("--threshold", type=float, default=10.0,
+                        help="percent slowdown (or throughput drop) treated as a regression")
+    parser.add_argument("--alpha", type=float, default=0.05,
+                        help="significance level for the Mann-Whitney test on latency histograms")
+    parser.add_argument("--percentiles", default=",".join(PERCENTILE_FIELDS),
+                        help=f"comma-separated latency fields to gate on ({', '.join(LATENCY_FIELDS)})")
+    parser.add_argument("--json", dest="json_output", default=None, help="write the report to this file")
+    return parser.parse_args(argv)
+
+
+def main(argv: List[str] = None) -> int:
+    """Main comparison execution"""
+    args = parse_args(sys.argv[1:] if argv is None else argv)
+    percentiles = [p.strip() for p in args.percentiles.split(",") if p.strip()]
+    unknown = [p for p in percentiles if p not in LATENCY_FIELDS]
+    if unknown or not percentiles:
+        print(f"❌ Unknown --percentiles field(s): {', '.join(unknown) or '(none given)'}; "
+              f"choose from {', '.join(LATENCY_FIELDS)}")
+        return EXIT_INVALID_INPUT
+
+    try:
+        report = compare_files(args.baseline, args.candidate, args.threshold, args.alpha, percentiles)
+    except (OSError, ValueError, KeyError) as e:
+        print(f"❌ Comparison failed: {str(e)}")
+        return EXIT_INVALID_INPUT
+
+    print_report(report, percentiles)
+
+    if args.json_output:
+        with open(args.json_output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    return EXIT_REGRESSION if report["regressions"] else EXIT_OK
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,293 @@
+"""
+RoomieSwipe asyncio load generator
+Replays the register -> login -> profile -> discovery -> like flow as many
+virtual users arriving at a configurable rate, with ramp-up/ramp-down
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import string
+import sys
+import time
+from typing import Dict, Any, Optional, List, Tuple
+
+import aiohttp
+
+from .metrics import LatencyHistogram, normalize_endpoint, summarize_histogram
+
+LOCATIONS = ["New York, NY", "San Francisco, CA", "Los Angeles, CA", "Chicago, IL", "Austin, TX"]
+
+
+class LoadProfile:
+    """Open-model arrival profile: linear ramp up, steady hold, linear ramp down"""
+
+    def __init__(self, rate: float, duration: float, ramp_up: float = 0.0, ramp_down: float = 0.0):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        if ramp_up + ramp_down > duration:
+            raise ValueError("ramp_up + ramp_down must not exceed duration")
+        self.rate = rate
+        self.duration = duration
+        self.ramp_up = ramp_up
+        self.ramp_down = ramp_down
+
+    def rate_at(self, elapsed: float) -> float:
+        """Target arrivals per second at a point in the run"""
+        if elapsed >= self.duration:
+            return 0.0
+        if self.ramp_up and elapsed < self.ramp_up:
+            return self.rate * elapsed / self.ramp_up
+        remaining = self.duration - elapsed
+        if self.ramp_down and remaining < self.ramp_down:
+            return self.rate * remaining / self.ramp_down
+        return self.rate
+
+
+class StepStats:
+    """Latency histogram and error counts for one flow step"""
+
+    def __init__(self):
+        self.errors = 0
+        self.statuses: Dict[str, int] = {}
+        self.histogram = LatencyHistogram()
+
+    @property
+    def count(self) -> int:
+        return self.histogram.total_count
+
+    def record(self, status: Optional[int], elapsed_ms: float, ok: bool):
+        if not ok:
+            self.errors += 1
+        key = str(status) if status is not None else "error"
+        self.statuses[key] = self.statuses.get(key, 0) + 1
+        self.histogram.record_ms(elapsed_ms)
+
+    def summary(self, elapsed: float) -> Dict[str, Any]:
+        summary = summarize_histogram(self.histogram, elapsed, self.errors)
+        summary["error_rate"] = (self.errors / self.count * 100) if self.count else 0.0
+        summary["statuses"] = self.statuses
+        return summary
+
+
+class LoadEngine:
+    """Drives virtual users against the API following a LoadProfile"""
+
+    def __init__(self, base_url: str = "http://localhost:3001", max_users: int = 5000,
+                 pool_size: int = 500, timeout: float = 30.0, seed: Optional[int] = None):
+        self.base_url = base_url
+        self.api_url = f"{base_url}/api"
+        self.max_users = max_users
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.rng = random.Random(seed)
+        self.steps: Dict[str, StepStats] = {}
+        self.flows_started = 0
+        self.flows_completed = 0
+        self.flows_failed = 0
+        self.flows_cancelled = 0
+        self.arrivals_dropped = 0
+        self.active_users = 0
+        # Phones count up from a random base so every virtual user in a run gets its own
+        self.phone_base = self.rng.randrange(10 ** 7)
+        self.users_generated = 0
+
+    def generate_user(self) -> Dict[str, str]:
+        """Registration payload in the same shape the harnesses use"""
+        suffix = ''.join(self.rng.choices(string.ascii_lowercase + string.digits, k=10))
+        phone = (self.phone_base + self.users_generated) % 10 ** 7
+        self.users_generated += 1
+        return {
+            "name": f"Load User {suffix[:4]}",
+            "email": f"load.{suffix}@example.com",
+            "phone": f"+1555{phone:07d}",
+            "password": "SecurePass123!",
+            "country": "United States",
+            "nationality": "American",
+            "location": self.rng.choice(LOCATIONS)
+        }
+
+    async def call(self, session: aiohttp.ClientSession, method: str, endpoint: str,
+                   data: Dict = None, token: str = None, expect: Tuple[int, ...] = (200,)) -> Tuple[bool, Any]:
+        """Issue one request, record its latency under the endpoint and return the JSON body"""
+        headers = {"Content-Type": "application/json"}
+        if token:
+            headers["Authorization"] = f"Bearer {token}"
+
+        stats = self.steps.setdefault(normalize_endpoint(method, endpoint), StepStats())
+        start = time.perf_counter()
+        try:
+            async with session.request(method, f"{self.api_url}{endpoint}", json=data,
+                                       headers=headers) as response:
+                body = await response.json(content_type=None)
+                ok = response.status in expect
+                stats.record(response.status, (time.perf_counter() - start) * 1000.0, ok)
+                return ok, body
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError):
+            stats.record(None, (time.perf_counter() - start) * 1000.0, False)
+            return False, None
+
+    async def run_user_flow(self, session: aiohttp.ClientSession) -> bool:
+        """register -> login -> profile -> discovery -> like for one virtual user"""
+        user = self.generate_user()
+
+        ok, data = await self.call(session, "POST", "/auth/register", user, expect=(201,))
+        if not ok:
+            return False
+
+        login = {"email": user["email"], "password": user["password"]}
+        ok, data = await self.call(session, "POST", "/auth/login", login)
+        if not ok:
+            return False
+        token = data["token"]
+
+        ok, _ = await self.call(session, "GET", "/users/profile", token=token)
+        if not ok:
+            return False
+
+        ok, users = await self.call(session, "GET", "/users?limit=20", token=token)
+        if not ok:
+            return False
+
+        if users:
+            target = self.rng.choice(users)
+            action = {"target_user_id": target["id"], "action": "like"}
+            ok, _ = await self.call(session, "POST", "/matches/action", action, token=token)
+        return ok
+
+    async def _virtual_user(self, session: aiohttp.ClientSession):
+        self.active_users += 1
+        self.flows_started += 1
+        try:
+            if await self.run_user_flow(session):
+                self.flows_completed += 1
+            else:
+                self.flows_failed += 1
+        finally:
+            self.active_users -= 1
+
+    async def run(self, profile: LoadProfile) -> Dict[str, Any]:
+        """Generate arrivals for the whole profile and wait for in-flight users"""
+        connector = aiohttp.TCPConnector(limit=self.pool_size)
+        timeout = aiohttp.ClientTimeout(total=self.timeout)
+        tasks = set()
+
+        async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+            loop = asyncio.get_running_loop()
+            start = loop.time()
+            while True:
+                # Thinning: draw candidates at the peak rate, keep each with rate_at(t) / peak
+                await asyncio.sleep(self.rng.expovariate(profile.rate))
+                elapsed = loop.time() - start
+                if elapsed >= profile.duration:
+                    break
+                if self.rng.random() * profile.rate > profile.rate_at(elapsed):
+                    continue
+                if self.active_users >= self.max_users:
+                    self.arrivals_dropped += 1
+                    continue
+
+                task = asyncio.create_task(self._virtual_user(session))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+
+            if tasks:
+                _, pending = await asyncio.wait(tasks, timeout=self.timeout)
+                # Flows still running past the timeout must not outlive the session
+                for task in pending:
+                    task.cancel()
+                await asyncio.gather(*pending, return_exceptions=True)
+                self.flows_cancelled += len(pending)
+            elapsed = loop.time() - start
+
+        return self.report(profile, elapsed)
+
+    def report(self, profile: LoadProfile, elapsed: float) -> Dict[str, Any]:
+        total = sum(s.count for s in self.steps.values())
+        errors = sum(s.errors for s in self.steps.values())
+        return {
+            "target_rate": profile.rate,
+            "duration": profile.duration,
+            "elapsed": elapsed,
+            "flows_started": self.flows_started,
+            "flows_completed": self.flows_completed,
+            "flows_failed": self.flows_failed,
+            "flows_cancelled": self.flows_cancelled,
+            "arrivals_dropped": self.arrivals_dropped,
+            "requests": total,
+            "error_rate": (errors / total * 100) if total else 0.0,
+            "throughput_rps": total / elapsed if elapsed > 0 else 0.0,
+            "steps": {name: stats.summary(elapsed) for name, stats in self.steps.items()}
+        }
+
+
+async def find_breaking_point(base_url: str, rates: List[float], duration: float,
+                              ramp_up: float, max_error_rate: float, max_p99_ms: float,
+                              **engine_kwargs) -> Dict[str, Any]:
+    """Step through arrival rates until the error rate or p99 latency crosses its limit"""
+    # Build every profile first so a bad rate fails before any run starts
+    profiles = [LoadProfile(rate, duration, ramp_up=ramp_up) for rate in rates]
+    runs = []
+    breaking_rate = None
+    for rate, profile in zip(rates, profiles):
+        engine = LoadEngine(base_url, **engine_kwargs)
+        result = await engine.run(profile)
+        worst_p99 = max((s["p99_ms"] for s in result["steps"].values()), default=0.0)
+        runs.append(result)
+        print(f"rate={rate:.1f}/s requests={result['requests']} "
+              f"errors={result['error_rate']:.1f}% worst_p99={worst_p99:.0f}ms")
+        if result["error_rate"] > max_error_rate or worst_p99 > max_p99_ms:
+            breaking_rate = rate
+            break
+
+    return {"breaking_rate": breaking_rate, "runs": runs}
+
+
+def parse_args(argv: List[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="RoomieSwipe asyncio load generator")
+    parser.add_argument("--base-url", default="http://localhost:3001")
+    parser.add_argument("--rate", type=float, default=10.0, help="virtual user arrivals per second")
+    parser.add_argument("--duration", type=float, default=60.0, help="run length in seconds")
+    parser.add_argument("--ramp-up", type=float, default=10.0)
+    parser.add_argument("--ramp-down", type=float, default=5.0)
+    parser.add_argument("--max-users", type=int, default=5000, help="cap on concurrent virtual users")
+    parser.add_argument("--pool-size", type=int, default=500, help="max open connections")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--step-rates", default=None,
+                        help="comma-separated rates; run each until the backend breaks")
+    parser.add_argument("--max-error-rate", type=float, default=1.0, help="percent")
+    parser.add_argument("--max-p99-ms", type=float, default=2000.0)
+    parser.add_argument("--output", default="load_test_results.json")
+    return parser.parse_args(argv)
+
+
+def main(argv: List[str] = None):
+    """Main load test execution"""
+    args = parse_args(sys.argv[1:] if argv is None else argv)
+    engine_kwargs = {"max_users": args.max_users, "pool_size": args.pool_size, "seed": args.seed}
+
+    if args.step_rates:
+        rates = [float(r) for r in args.step_rates.split(",")]
+        results = asyncio.run(find_breaking_point(args.base_url, rates, args.duration, args.ramp_up,
+                                                  args.max_error_rate, args.max_p99_ms,
+                                                  **engine_kwargs))
+        if results["breaking_rate"] is None:
+            print("🏁 Backend held up at every tested rate")
+        else:
+            print(f"⚠️  Backend broke at {results['breaking_rate']:.1f} arrivals/s")
+    else:
+        engine = LoadEngine(args.base_url, **engine_kwargs)
+        profile = LoadProfile(args.rate, args.duration, args.ramp_up, args.ramp_down)
+        results = asyncio.run(engine.run(profile))
+        print(f"🏁 {results['requests']} requests, {results['throughput_rps']:.1f} req/s, "
+              f"{results['error_rate']:.1f}% errors")
+
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+
+    print(f"\n📊 Detailed results saved to: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
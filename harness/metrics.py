@@ -0,0 +1,187 @@
+"""
+Latency histograms and per-endpoint percentile reporting for the harnesses
+"""
+
+import re
+import threading
+import time
+from typing import Dict, Any, Optional
+
+# 2^7 sub-buckets per power of two keeps every recorded value within ~0.8%
+DEFAULT_SUB_BUCKET_BITS = 7
+
+REPORTED_PERCENTILES = [("p50_ms", 50.0), ("p90_ms", 90.0), ("p99_ms", 99.0), ("p999_ms", 99.9)]
+
+ID_SEGMENT = re.compile(r"^([0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}"
+                        r"|[0-9a-fA-F]{24}|\d+)$")
+
+
+class LatencyHistogram:
+    """HDR-style log-linear histogram of latencies recorded in microseconds
+
+    Values below 2^bits are counted exactly; above that each power of two is
+    split into 2^(bits-1) equal sub-buckets, so relative error stays bounded
+    while memory grows only with the number of distinct buckets hit.
+    """
+
+    def __init__(self, sub_bucket_bits: int = DEFAULT_SUB_BUCKET_BITS):
+        self.sub_bucket_bits = sub_bucket_bits
+        self.sub_bucket_count = 1 << sub_bucket_bits
+        self.half_count = self.sub_bucket_count >> 1
+        self.counts: Dict[int, int] = {}
+        self.total_count = 0
+        self.total_us = 0
+        self.min_us: Optional[int] = None
+        self.max_us = 0
+
+    def _index_for(self, value: int) -> int:
+        if value < self.sub_bucket_count:
+            return value
+        shift = value.bit_length() - self.sub_bucket_bits
+        top = value >> shift
+        return self.sub_bucket_count + (shift - 1) * self.half_count + (top - self.half_count)
+
+    def _highest_equivalent(self, index: int) -> int:
+        if index < self.sub_bucket_count:
+            return index
+        offset = index - self.sub_bucket_count
+        shift = offset // self.half_count + 1
+        top = offset % self.half_count + self.half_count
+        return ((top + 1) << shift) - 1
+
+    def record_ms(self, elapsed_ms: float):
+        """Record one latency measured in milliseconds"""
+        value = max(0, int(round(elapsed_ms * 1000.0)))
+        index = self._index_for(value)
+        self.counts[index] = self.counts.get(index, 0) + 1
+        self.total_count += 1
+        self.total_us += value
+        self.min_us = value if self.min_us is None else min(self.min_us, value)
+        self.max_us = max(self.max_us, value)
+
+    def merge(self, other: "LatencyHistogram"):
+        """Fold another histogram with the same precision into this one"""
+        if other.sub_bucket_bits != self.sub_bucket_bits:
+            raise ValueError("Cannot merge histograms with different precision")
+        for index, count in other.counts.items():
+            self.counts[index] = self.counts.get(index, 0) + count
+        self.total_count += other.total_count
+        self.total_us += other.total_us
+        if other.min_us is not None:
+            self.min_us = other.min_us if self.min_us is None else min(self.min_us, other.min_us)
+        self.max_us = max(self.max_us, other.max_us)
+
+    def value_at_percentile(self, percentile: float) -> float:
+        """Latency in milliseconds at or below which `percentile` percent of samples fall"""
+        if self.total_count == 0:
+            return 0.0
+        target = max(1, int(percentile / 100.0 * self.total_count + 0.5))
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen >= target:
+                return min(self._highest_equivalent(index), self.max_us) / 1000.0
+        return self.max_us / 1000.0
+
+    def buckets(self):
+        """(value_ms, count) pairs in ascending order, using each bucket's upper bound"""
+        return [(min(self._highest_equivalent(i), self.max_us) / 1000.0, self.counts[i])
+                for i in sorted(self.counts)]
+
+    @property
+    def mean_ms(self) -> float:
+        return self.total_us / self.total_count / 1000.0 if self.total_count else 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "unit": "us",
+            "sub_bucket_bits": self.sub_bucket_bits,
+            "total_count": self.total_count,
+            "total_us": self.total_us,
+            "min_us": self.min_us,
+            "max_us": self.max_us,
+            "counts": {str(index): count for index, count in sorted(self.counts.items())}
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "LatencyHistogram":
+        histogram = cls(data.get("sub_bucket_bits", DEFAULT_SUB_BUCKET_BITS))
+        histogram.counts = {int(index): count for index, count in data.get("counts", {}).items()}
+        histogram.total_count = data.get("total_count", sum(histogram.counts.values()))
+        histogram.total_us = data.get("total_us", 0)
+        histogram.min_us = data.get("min_us")
+        histogram.max_us = data.get("max_us", 0)
+        return histogram
+
+
+def normalize_endpoint(method: str, endpoint: str) -> str:
+    """Group requests by route: drop the query string and collapse id path segments"""
+    path = endpoint.split("?", 1)[0]
+    segments = [":id" if ID_SEGMENT.match(segment) else segment for segment in path.split("/")]
+    return f"{method.upper()} {'/'.join(segments)}"
+
+
+class LatencyRecorder:
+    """Thread-safe per-endpoint histograms plus error counts"""
+
+    def __init__(self, sub_bucket_bits: int = DEFAULT_SUB_BUCKET_BITS):
+        self.sub_bucket_bits = sub_bucket_bits
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.histograms: Dict[str, LatencyHistogram] = {}
+            self.errors: Dict[str, int] = {}
+            self.started_at = time.time()
+
+    def record(self, method: str, endpoint: str, elapsed_ms: float, error: bool = False):
+        key = normalize_endpoint(method, endpoint)
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = LatencyHistogram(self.sub_bucket_bits)
+                self.histograms[key] = histogram
+            histogram.record_ms(elapsed_ms)
+            if error:
+                self.errors[key] = self.errors.get(key, 0) + 1
+
+    def summary(self, elapsed: float = None) -> Dict[str, Any]:
+        """Percentiles, max and throughput per endpoint, with histograms for later comparison"""
+        with self._lock:
+            if elapsed is None:
+                elapsed = time.time() - self.started_at
+            overall = LatencyHistogram(self.sub_bucket_bits)
+            endpoints = {}
+            for key in sorted(self.histograms):
+                histogram = self.histograms[key]
+                overall.merge(histogram)
+                endpoints[key] = summarize_histogram(histogram, elapsed, self.errors.get(key, 0))
+
+            return {
+                "elapsed_seconds": elapsed,
+                "overall": summarize_histogram(overall, elapsed, sum(self.errors.values())),
+                "endpoints": endpoints
+            }
+
+
+def summarize_histogram(histogram: LatencyHistogram, elapsed: float, errors: int = 0) -> Dict[str, Any]:
+    summary = {"count": histogram.total_count, "errors": errors}
+    for name, percentile in REPORTED_PERCENTILES:
+        summary[name] = histogram.value_at_percentile(percentile)
+    summary["max_ms"] = histogram.max_us / 1000.0
+    summary["mean_ms"] = histogram.mean_ms
+    summary["throughput_rps"] = histogram.total_count / elapsed if elapsed > 0 else 0.0
+    summary["histogram"] = histogram.to_dict()
+    return summary
+
+
+def print_latency_summary(summary: Dict[str, Any]):
+    """Print per-endpoint percentiles in the harnesses' console style"""
+    print("\n⏱️  Latency by endpoint (ms):")
+    print(f"{'endpoint':<40} {'count':>6} {'p50':>8} {'p90':>8} {'p99':>8} {'p99.9':>8} {'max':>8} {'rps':>7}")
+    rows = list(summary["endpoints"].items()) + [("overall", summary["overall"])]
+    for name, stats in rows:
+        print(f"{name:<40} {stats['count']:>6} {stats['p50_ms']:>8.1f} {stats['p90_ms']:>8.1f} "
+              f"{stats['p99_ms']:>8.1f} {stats['p999_ms']:>8.1f} {stats['max_ms']:>8.1f} "
+              f"{stats['throughput_rps']:>7.2f}")
@@ -0,0 +1,275 @@
+"""
+Cross-node Socket.IO delivery latency harness
+Pairs users through a mutual match, connects each side to a different API node
+and measures how long send_message takes to be acknowledged by the sender's node
+and to reach the peer through the pub/sub adapter
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import re
+import string
+import sys
+import time
+from typing import Dict, Any, Optional, List, Callable
+
+import aiohttp
+
+from .metrics import LatencyHistogram, summarize_histogram
+
+# Engine.IO "message" (4) carrying a Socket.IO EVENT (2) or ACK (3), optional ack id, JSON args
+PACKET_PATTERN = re.compile(r"^4([23])(\d*)(.*)$", re.DOTALL)
+
+
+class SocketIOClient:
+    """Just enough of the Engine.IO v4 / Socket.IO v5 protocol to drive the chat events over a websocket"""
+
+    def __init__(self, session: aiohttp.ClientSession, base_url: str, token: str):
+        self.session = session
+        self.url = re.sub(r"^http", "ws", base_url) + "/socket.io/?EIO=4&transport=websocket"
+        self.token = token
+        self.ws = None
+        self.reader = None
+        self.handlers: Dict[str, Callable] = {}
+        self.acks: Dict[int, asyncio.Future] = {}
+        self.next_ack = 0
+
+    async def connect(self):
+        self.ws = await self.session.ws_connect(self.url)
+        handshake = await self.ws.receive_str()
+        if not handshake.startswith("0"):
+            raise ConnectionError(f"Unexpected Engine.IO handshake: {handshake[:80]}")
+
+        await self.ws.send_str("40" + json.dumps({"token": self.token}))
+        reply = await self.ws.receive_str()
+        if not reply.startswith("40"):
+            raise ConnectionError(f"Socket.IO connect refused: {reply[:80]}")
+        self.reader = asyncio.create_task(self._read())
+
+    async def _read(self):
+        async for msg in self.ws:
+            if msg.type != aiohttp.WSMsgType.TEXT:
+                continue
+            if msg.data == "2":
+                await self.ws.send_str("3")
+                continue
+
+            match = PACKET_PATTERN.match(msg.data)
+            if not match:
+                continue
+            kind, ack_id, payload = match.groups()
+            args = json.loads(payload) if payload else []
+            if kind == "2" and args:
+                handler = self.handlers.get(args[0])
+                if handler:
+                    handler(*args[1:])
+            elif kind == "3" and ack_id:
+                future = self.acks.pop(int(ack_id), None)
+                if future and not future.done():
+                    future.set_result(args[0] if args else None)
+
+    def on(self, event: str, handler: Callable):
+        self.handlers[event] = handler
+
+    async def emit(self, event: str, data: Any):
+        await self.ws.send_str("42" + json.dumps([event, data]))
+
+    async def emit_with_ack(self, event: str, data: Any) -> asyncio.Future:
+        ack_id = self.next_ack
+        self.next_ack += 1
+        future = asyncio.get_running_loop().create_future()
+        self.acks[ack_id] = future
+        await self.ws.send_str(f"42{ack_id}" + json.dumps([event, data]))
+        return future
+
+    async def close(self):
+        if self.ws is not None:
+            await self.ws.close()
+        if self.reader is not None:
+            self.reader.cancel()
+
+
+class DeliveryBench:
+    """Measures ack and cross-node delivery latency for socket chat messages"""
+
+    def __init__(self, nodes: List[str], pairs: int = 20, messages: int = 50, rate: float = 5.0,
+                 timeout: float = 10.0, seed: Optional[int] = None):
+        self.nodes = nodes
+        self.pairs = pairs
+        self.messages = messages
+        self.rate = rate
+        self.timeout = timeout
+        self.rng = random.Random(seed)
+        self.histograms = {
+            "socket send_message ack": LatencyHistogram(),
+            "delivery cross-node": LatencyHistogram(),
+            "delivery same-node": LatencyHistogram()
+        }
+        self.errors = {name: 0 for name in self.histograms}
+        self.in_flight: Dict[str, Any] = {}
+        self.sent = 0
+        self.delivered = 0
+
+    def node_for(self, index: int) -> str:
+        return self.nodes[index % len(self.nodes)]
+
+    async def call(self, session: aiohttp.ClientSession, node: str, method: str, endpoint: str,
+                   data: Dict = None, token: str = None) -> Optional[Dict[str, Any]]:
+        headers = {"Authorization": f"Bearer {token}"} if token else {}
+        async with session.request(method, f"{node}/api{endpoint}", json=data, headers=headers) as response:
+            if response.status >= 400:
+                print(f"❌ {method} {endpoint} on {node}: HTTP {response.status}")
+                return None
+            return await response.json(content_type=None)
+
+    async def register(self, session: aiohttp.ClientSession, node: str) -> Optional[Dict[str, Any]]:
+        suffix = ''.join(self.rng.choices(string.ascii_lowercase + string.digits, k=10))
+        user = {
+            "name": f"Realtime User {suffix[:4]}",
+            "email": f"realtime.{suffix}@example.com",
+            "phone": "+15551234567",
+            "password": "SecurePass123!",
+            "country": "United States",
+            "nationality": "American",
+            "location": "New York, NY"
+        }
+        return await self.call(session, node, "POST", "/auth/register", user)
+
+    async def setup_pair(self, session: aiohttp.ClientSession, index: int) -> Optional[Dict[str, Any]]:
+        """Register two users and make them a mutual match"""
+        node = self.node_for(index)
+        sender, receiver = await asyncio.gather(self.register(session, node), self.register(session, node))
+        if not sender or not receiver:
+            return None
+
+        like = await self.call(session, node, "POST", "/matches/action",
+                               {"target_user_id": receiver["user"]["id"], "action": "like"}, sender["token"])
+        like_back = await self.call(session, node, "POST", "/matches/action",
+                                    {"target_user_id": sender["user"]["id"], "action": "like"}, receiver["token"])
+        if not like or not like_back:
+            return None
+
+        return {
+            "match_id": like["match_id"],
+            "sender_token": sender["token"],
+            "receiver_token": receiver["token"],
+            "sender_node": self.node_for(index),
+            "receiver_node": self.node_for(index + 1)
+        }
+
+    def on_new_message(self, payload: Dict[str, Any]):
+        entry = self.in_flight.pop(payload.get("message", ""), None)
+        if entry is None:
+            return
+        started, name = entry
+        self.histograms[name].record_ms((time.perf_counter() - started) * 1000.0)
+        self.delivered += 1
+
+    async def run_pair(self, pair: Dict[str, Any], sender: SocketIOClient):
+        """Send this pair's messages at the configured rate and record ack latency"""
+        cross = pair["sender_node"] != pair["receiver_node"]
+        delivery = "delivery cross-node" if cross else "delivery same-node"
+        ack_histogram = self.histograms["socket send_message ack"]
+
+        for _ in range(self.messages):
+            text = "bench:" + ''.join(self.rng.choices(string.ascii_letters + string.digits, k=16))
+            started = time.perf_counter()
+            self.in_flight[text] = (started, delivery)
+            self.sent += 1
+            future = await sender.emit_with_ack("send_message", {
+                "conversationId": pair["match_id"],
+                "message": text,
+                "clientId": text
+            })
+            try:
+                ack = await asyncio.wait_for(future, self.timeout)
+                if ack and not ack.get("error"):
+                    ack_histogram.record_ms((time.perf_counter() - started) * 1000.0)
+                else:
+                    self.errors["socket send_message ack"] += 1
+                    self.in_flight.pop(text, None)
+            except asyncio.TimeoutError:
+                self.errors["socket send_message ack"] += 1
+            await asyncio.sleep(self.rng.expovariate(self.rate))
+
+    async def run(self) -> Dict[str, Any]:
+        clients: List[SocketIOClient] = []
+        async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=self.timeout * 3)) as session:
+            pairs = [p for p in await asyncio.gather(*[self.setup_pair(session, i) for i in range(self.pairs)]) if p]
+            if not pairs:
+                raise RuntimeError("Could not set up any matched pairs")
+            print(f"🔗 {len(pairs)} matched pairs across {len(self.nodes)} node(s)")
+
+            senders = []
+            for pair in pairs:
+                sender = SocketIOClient(session, pair["sender_node"], pair["sender_token"])
+                receiver = SocketIOClient(session, pair["receiver_node"], pair["receiver_token"])
+                await asyncio.gather(sender.connect(), receiver.connect())
+                receiver.on("new_message", self.on_new_message)
+                await receiver.emit("join_conversation", pair["match_id"])
+                clients.extend([sender, receiver])
+                senders.append(sender)
+
+            # Room joins are local to each node; give them a moment before the first broadcast
+            await asyncio.sleep(0.5)
+
+            start = time.perf_counter()
+            await asyncio.gather(*[self.run_pair(pair, sender) for pair, sender in zip(pairs, senders)])
+
+            deadline = time.perf_counter() + self.timeout
+            while self.in_flight and time.perf_counter() < deadline:
+                await asyncio.sleep(0.05)
+            elapsed = time.perf_counter() - start
+
+            for text, (_, name) in self.in_flight.items():
+                self.errors[name] += 1
+
+            await asyncio.gather(*[client.close() for client in clients], return_exceptions=True)
+
+        return {
+            "nodes": self.nodes,
+            "pairs": len(pairs),
+            "sent": self.sent,
+            "delivered": self.delivered,
+            "lost": len(self.in_flight),
+            "elapsed": elapsed,
+            "steps": {name: summarize_histogram(histogram, elapsed, self.errors[name])
+                      for name, histogram in self.histograms.items() if histogram.total_count or self.errors[name]}
+        }
+
+
+def parse_args(argv: List[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Cross-node Socket.IO delivery latency harness")
+    parser.add_argument("--nodes", default="http://localhost:3001,http://localhost:3002",
+                        help="comma-separated API node base URLs; pairs are split across them")
+    parser.add_argument("--pairs", type=int, default=20, help="matched sender/receiver pairs")
+    parser.add_argument("--messages", type=int, default=50, help="messages per pair")
+    parser.add_argument("--rate", type=float, default=5.0, help="messages per second per pair")
+    parser.add_argument("--timeout", type=float, default=10.0)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--output", default="realtime_test_results.json")
+    return parser.parse_args(argv)
+
+
+def main(argv: List[str] = None):
+    """Main delivery latency execution"""
+    args = parse_args(sys.argv[1:] if argv is None else argv)
+    nodes = [node.strip().rstrip("/") for node in args.nodes.split(",") if node.strip()]
+    bench = DeliveryBench(nodes, args.pairs, args.messages, args.rate, args.timeout, args.seed)
+    results = asyncio.run(bench.run())
+
+    print(f"🏁 {results['sent']} sent, {results['delivered']} delivered, {results['lost']} lost")
+    for name, step in results["steps"].items():
+        print(f"   {name:<28} p50={step['p50_ms']:.1f}ms p99={step['p99_ms']:.1f}ms "
+              f"max={step['max_ms']:.1f}ms errors={step['errors']}")
+
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+
+    print(f"\n📊 Detailed results saved to: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+"""
+Parallel scenario runner for the API harnesses
+Runs each test method on its own harness instance so user/token state is
+isolated, seeds it from the scenarios it depends on, and executes
+independent scenarios concurrently on a worker pool; scenarios whose
+dependencies failed are skipped
+"""
+
+import copy
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Dict, Any, Callable, List, Tuple
+
+from .metrics import print_latency_summary
+
+DEFAULT_WORKERS = int(os.environ.get("HARNESS_WORKERS", "8"))
+
+# Harness attributes that are infrastructure rather than per-user test state
+SHARED_ATTRS = ("base_url", "api_url", "client", "test_results", "vendor_stubs")
+
+
+class Scenario:
+    """One harness test method plus the scenarios whose state it needs"""
+
+    def __init__(self, name: str, requires: Tuple[str, ...] = ()):
+        self.name = name
+        self.requires = tuple(requires)
+
+    def __repr__(self):
+        return f"Scenario({self.name!r}, requires={self.requires!r})"
+
+
+def snapshot_state(tester: Any) -> Dict[str, Any]:
+    """Deep copy of a harness instance's test state (tokens, user ids, created users)"""
+    return {key: copy.deepcopy(value) for key, value in vars(tester).items() if key not in SHARED_ATTRS}
+
+
+class ScenarioRunner:
+    """Dependency-aware concurrent executor for harness scenarios"""
+
+    def __init__(self, factory: Callable[[], Any], scenarios: List[Scenario],
+                 workers: int = DEFAULT_WORKERS):
+        self.factory = factory
+        self.scenarios = scenarios
+        self.workers = workers
+        self._validate()
+
+    def _validate(self):
+        names = [scenario.name for scenario in self.scenarios]
+        if len(set(names)) != len(names):
+            raise ValueError("Scenario names must be unique")
+        known = set(names)
+        for scenario in self.scenarios:
+            missing = [dep for dep in scenario.requires if dep not in known]
+            if missing:
+                raise ValueError(f"{scenario.name} requires unknown scenarios: {', '.join(missing)}")
+
+        # Kahn's algorithm: anything left over sits on a cycle
+        remaining = {scenario.name: set(scenario.requires) for scenario in self.scenarios}
+        while remaining:
+            ready = [name for name, deps in remaining.items() if not deps]
+            if not ready:
+                raise ValueError(f"Scenario dependency cycle among: {', '.join(sorted(remaining))}")
+            for name in ready:
+                del remaining[name]
+            for deps in remaining.values():
+                deps.difference_update(ready)
+
+    def _run_scenario(self, scenario: Scenario, seed_state: Dict[str, Any]) -> Tuple[bool, Any]:
+        tester = self.factory()
+        for key, value in seed_state.items():
+            setattr(tester, key, copy.deepcopy(value))
+
+        try:
+            passed = bool(getattr(tester, scenario.name)())
+        except Exception as e:
+            print(f"❌ FAIL {scenario.name}: Unexpected error - {str(e)}")
+            passed = False
+        return passed, tester
+
+    def run(self) -> Dict[str, Any]:
+        """Run every scenario once its dependencies have passed; skip it if one did not"""
+        start = time.time()
+        by_name = {scenario.name: scenario for scenario in self.scenarios}
+        pending = {scenario.name for scenario in self.scenarios}
+        states: Dict[str, Dict[str, Any]] = {}
+        outcomes: Dict[str, Tuple[bool, Any]] = {}
+        skipped: Dict[str, str] = {}
+        running = {}
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            while pending or running:
+                # A scenario cannot run on top of state its dependency never set up
+                for name in sorted(pending):
+                    blocked = [dep for dep in by_name[name].requires
+                               if dep in skipped or (dep in outcomes and not outcomes[dep][0])]
+                    if blocked:
+                        skipped[name] = blocked[0]
+                        pending.discard(name)
+                        print(f"⏭️  SKIP {name}: requires {blocked[0]}, which did not pass")
+
+                for name in sorted(pending):
+                    scenario = by_name[name]
+                    if all(dep in states for dep in scenario.requires):
+                        seed_state: Dict[str, Any] = {}
+                        for dep in scenario.requires:
+                            seed_state.update(states[dep])
+                        running[pool.submit(self._run_scenario, scenario, seed_state)] = name
+                        pending.discard(name)
+
+                if not running:
+                    continue
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    passed, tester = future.result()
+                    outcomes[name] = (passed, tester)
+                    if passed:
+                        states[name] = snapshot_state(tester)
+
+        elapsed = time.time() - start
+        passed = sum(1 for ok, _ in outcomes.values() if ok)
+        failed = len(outcomes) - passed
+        results = []
+        for scenario in self.scenarios:
+            if scenario.name in outcomes:
+                results.extend(outcomes[scenario.name][1].test_results)
+            else:
+                results.append({
+                    "test": scenario.name,
+                    "success": False,
+                    "skipped": True,
+                    "message": f"Skipped: requires {skipped[scenario.name]}, which did not pass",
+                    "details": None,
+                    "timestamp": time.strftime("%Y-%m-%d %H:%M:%S")
+                })
+
+        print("\n" + "=" * 60)
+        print(f"🏁 Test Results: {passed} passed, {failed} failed, {len(skipped)} skipped "
+              f"({len(self.scenarios)} scenarios on {self.workers} workers in {elapsed:.1f}s)")
+
+        client = next((tester.client for _, tester in outcomes.values()), None)
+        latency = client.recorder.summary() if client else None
+        if latency:
+            print_latency_summary(latency)
+
+        return {
+            "total_tests": len(self.scenarios),
+            "passed": passed,
+            "failed": failed,
+            "skipped": len(skipped),
+            "success_rate": (passed / len(self.scenarios)) * 100 if self.scenarios else 0.0,
+            "elapsed_seconds": elapsed,
+            "results": results,
+            "latency": latency
+        }
+
+
+class ParallelScenariosMixin:
+    """run_parallel_tests for a harness class
+
+    The class lists its test methods in SCENARIOS, a dependency graph of
+    Scenario entries: each scenario starts from the user/token state its
+    dependencies left behind, and is skipped when one of them fails.
+    """
+
+    SCENARIOS: List[Scenario] = []
+
+    def run_parallel_tests(self, workers: int = DEFAULT_WORKERS):
+        """Run independent scenarios concurrently with isolated user/token state"""
+        runner = ScenarioRunner(self.fresh_tester, self.SCENARIOS, workers)
+        return runner.run()
+
+    def fresh_tester(self):
+        """New harness for one scenario, sharing vendor stubs (if any) but no user state"""
+        tester = type(self)(self.base_url)
+        if getattr(self, "vendor_stubs", None) is not None:
+            tester.vendor_stubs = self.vendor_stubs
+        return tester
@@ -0,0 +1,552 @@
+"""
+Local stand-ins for the third-party APIs the backend calls: S3 (path-style
+object + multipart API and presigned form POSTs), SendGrid v3 mail send and Twilio Verify v2
+Each stub injects configurable latency, error rate and a throughput cap so
+upload and verification latency can be measured end to end offline
+"""
+
+import abc
+import argparse
+import base64
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from email.parser import BytesParser
+from email.policy import HTTP
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Any, Optional, List, Tuple
+from urllib.parse import urlsplit, parse_qs
+from xml.sax.saxutils import escape
+
+from .metrics import LatencyHistogram, summarize_histogram
+
+StubResponse = Tuple[int, Dict[str, str], bytes]
+
+PLACEHOLDER = re.compile(r"\{\{\s*[\w.]+\s*\}\}")
+VERIFICATION_CODE = re.compile(r"\b\d{6}\b")
+
+
+class VendorBehavior:
+    """Latency, failure and throughput-cap settings for one stub"""
+
+    def __init__(self, latency_ms: float = 0.0, jitter_ms: float = 0.0, error_rate: float = 0.0,
+                 max_rps: Optional[float] = None, seed: Optional[int] = None):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.max_rps = max_rps
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._tokens = max_rps or 0.0
+        self._refilled_at = time.monotonic()
+
+    def admit(self) -> bool:
+        """Token bucket: False once the stub is over its requests-per-second cap"""
+        if not self.max_rps:
+            return True
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.max_rps, self._tokens + (now - self._refilled_at) * self.max_rps)
+            self._refilled_at = now
+            if self._tokens >= 1.0:
+                self._tokens -= 1.0
+                return True
+            return False
+
+    def delay_seconds(self) -> float:
+        with self._lock:
+            jitter = self._rng.uniform(-self.jitter_ms, self.jitter_ms) if self.jitter_ms else 0.0
+        return max(0.0, self.latency_ms + jitter) / 1000.0
+
+    def should_fail(self) -> bool:
+        with self._lock:
+            return self._rng.random() < self.error_rate
+
+
+class VendorStub(abc.ABC):
+    """Base class: a threaded HTTP server that applies VendorBehavior before routing"""
+
+    name = "vendor"
+
+    def __init__(self, behavior: VendorBehavior = None, host: str = "127.0.0.1", port: int = 0):
+        self.behavior = behavior or VendorBehavior()
+        self.host = host
+        self.port = port
+        self.histogram = LatencyHistogram()
+        self.statuses: Dict[str, int] = {}
+        self.throttled = 0
+        self.injected_errors = 0
+        self._lock = threading.Lock()
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+        self._started_at = None
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    def start(self) -> "VendorStub":
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def _dispatch(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                body = self.rfile.read(length) if length else b""
+                status, headers, payload = stub.handle(self.command, self.path, self.headers, body)
+                self.send_response(status)
+                for key, value in headers.items():
+                    self.send_header(key, value)
+                if "Content-Length" not in headers:
+                    self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                if self.command != "HEAD":
+                    self.wfile.write(payload)
+
+            do_GET = do_PUT = do_POST = do_DELETE = do_HEAD = _dispatch
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((self.host, self.port), Handler)
+        self._server.daemon_threads = True
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(target=self._server.serve_forever, name=f"{self.name}-stub",
+                                        daemon=True)
+        self._thread.start()
+        self._started_at = time.time()
+        return self
+
+    def stop(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def handle(self, method: str, path: str, headers, body: bytes) -> StubResponse:
+        start = time.perf_counter()
+        if not self.behavior.admit():
+            with self._lock:
+                self.throttled += 1
+            response = self.throttle_response()
+        else:
+            time.sleep(self.behavior.delay_seconds())
+            if self.behavior.should_fail():
+                with self._lock:
+                    self.injected_errors += 1
+                response = self.error_response()
+            else:
+                parts = urlsplit(path)
+                query = {key: values[0] for key, values in parse_qs(parts.query, keep_blank_values=True).items()}
+                response = self.route(method, parts.path, query, headers, body)
+
+        with self._lock:
+            self.histogram.record_ms((time.perf_counter() - start) * 1000.0)
+            key = str(response[0])
+            self.statuses[key] = self.statuses.get(key, 0) + 1
+        return response
+
+    @abc.abstractmethod
+    def route(self, method: str, path: str, query: Dict[str, str], headers, body: bytes) -> StubResponse:
+        """Vendor response for a request that passed the behavior checks"""
+
+    def throttle_response(self) -> StubResponse:
+        return json_response(429, {"message": "Too many requests"})
+
+    def error_response(self) -> StubResponse:
+        return json_response(500, {"message": f"{self.name} stub injected failure"})
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            elapsed = time.time() - self._started_at if self._started_at else 0.0
+            summary = summarize_histogram(self.histogram, elapsed, self.injected_errors)
+            summary["statuses"] = dict(self.statuses)
+            summary["throttled"] = self.throttled
+            return summary
+
+
+def json_response(status: int, data: Any) -> StubResponse:
+    return status, {"Content-Type": "application/json"}, json.dumps(data).encode()
+
+
+def xml_response(status: int, body: str, headers: Dict[str, str] = None) -> StubResponse:
+    all_headers = {"Content-Type": "application/xml"}
+    all_headers.update(headers or {})
+    return status, all_headers, f'<?xml version="1.0" encoding="UTF-8"?>\n{body}'.encode()
+
+
+def s3_error(status: int, code: str, message: str) -> StubResponse:
+    return xml_response(status, f"<Error><Code>{code}</Code><Message>{escape(message)}</Message></Error>")
+
+
+class S3Stub(VendorStub):
+    """Path-style S3: PUT/GET/HEAD/DELETE objects, the multipart upload calls and
+    browser form POSTs (the policy's content-length-range is enforced, signatures are not)"""
+
+    name = "s3"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.objects: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        self.uploads: Dict[str, Dict[str, Any]] = {}
+
+    def throttle_response(self) -> StubResponse:
+        return s3_error(503, "SlowDown", "Please reduce your request rate.")
+
+    def error_response(self) -> StubResponse:
+        return s3_error(500, "InternalError", "S3 stub injected failure")
+
+    def route(self, method, path, query, headers, body) -> StubResponse:
+        bucket, _, key = path.lstrip("/").partition("/")
+        if method == "POST" and bucket and not key:
+            return self._form_upload(bucket, headers, body)
+        if not bucket or not key:
+            return s3_error(400, "InvalidRequest", "Path-style bucket/key required")
+
+        if method == "POST" and "uploads" in query:
+            upload_id = uuid.uuid4().hex
+            with self._lock:
+                self.uploads[upload_id] = {"bucket": bucket, "key": key, "parts": {},
+                                           "content_type": headers.get("Content-Type")}
+            return xml_response(200, "<InitiateMultipartUploadResult>"
+                                     f"<Bucket>{escape(bucket)}</Bucket><Key>{escape(key)}</Key>"
+                                     f"<UploadId>{upload_id}</UploadId></InitiateMultipartUploadResult>")
+
+        if method == "PUT" and "uploadId" in query:
+            with self._lock:
+                upload = self.uploads.get(query["uploadId"])
+                if upload is None:
+                    return s3_error(404, "NoSuchUpload", "Unknown upload id")
+                etag = hashlib.md5(body).hexdigest()
+                upload["parts"][int(query.get("partNumber", "1"))] = body
+            return 200, {"ETag": f'"{etag}"'}, b""
+
+        if method == "POST" and "uploadId" in query:
+            with self._lock:
+                upload = self.uploads.pop(query["uploadId"], None)
+                if upload is None:
+                    return s3_error(404, "NoSuchUpload", "Unknown upload id")
+                data = b"".join(upload["parts"][n] for n in sorted(upload["parts"]))
+                etag = self._store(bucket, key, data, upload["content_type"])
+            return xml_response(200, "<CompleteMultipartUploadResult>"
+                                     f"<Location>{self.url}/{escape(bucket)}/{escape(key)}</Location>"
+                                     f"<Bucket>{escape(bucket)}</Bucket><Key>{escape(key)}</Key>"
+                                     f'<ETag>"{etag}"</ETag></CompleteMultipartUploadResult>')
+
+        if method == "DELETE" and "uploadId" in query:
+            with self._lock:
+                self.uploads.pop(query["uploadId"], None)
+            return 204, {}, b""
+
+        if method == "PUT":
+            with self._lock:
+                etag = self._store(bucket, key, body, headers.get("Content-Type"))
+            return 200, {"ETag": f'"{etag}"'}, b""
+
+        if method in ("GET", "HEAD"):
+            with self._lock:
+                obj = self.objects.get((bucket, key))
+            if obj is None:
+                return s3_error(404, "NoSuchKey", "The specified key does not exist.")
+            return 200, {"ETag": f'"{obj["etag"]}"', "Content-Type": obj["content_type"] or "binary/octet-stream",
+                         "Content-Length": str(len(obj["data"]))}, obj["data"]
+
+        if method == "DELETE":
+            with self._lock:
+                self.objects.pop((bucket, key), None)
+            return 204, {}, b""
+
+        return s3_error(405, "MethodNotAllowed", f"{method} not supported by the S3 stub")
+
+    def _form_upload(self, bucket: str, headers: Dict[str, str], body: bytes) -> StubResponse:
+        content_type = headers.get("Content-Type", "")
+        if not content_type.startswith("multipart/form-data"):
+            return s3_error(400, "InvalidRequest", "Bucket POST requires multipart/form-data")
+        form = BytesParser(policy=HTTP).parsebytes(f"Content-Type: {content_type}\r\n\r\n".encode() + body)
+        fields = {}
+        for part in form.iter_parts():
+            fields[part.get_param("name", header="content-disposition")] = part.get_payload(decode=True)
+        if "key" not in fields or "file" not in fields:
+            return s3_error(400, "InvalidArgument", "POST requires key and file fields")
+
+        data = fields["file"]
+        try:
+            policy = json.loads(base64.b64decode(fields.get("Policy") or fields.get("policy") or b"e30="))
+        except ValueError:
+            return s3_error(400, "InvalidPolicyDocument", "Policy is not base64-encoded JSON")
+        for condition in policy.get("conditions", []):
+            if isinstance(condition, list) and condition and condition[0] == "content-length-range":
+                if len(data) > int(condition[2]):
+                    return s3_error(400, "EntityTooLarge", "Your proposed upload exceeds the maximum allowed size")
+                if len(data) < int(condition[1]):
+                    return s3_error(400, "EntityTooSmall", "Your proposed upload is smaller than the minimum allowed size")
+
+        field_type = fields.get("Content-Type")
+        with self._lock:
+            self._store(bucket, fields["key"].decode(), data, field_type.decode() if field_type else None)
+        return 204, {}, b""
+
+    def _store(self, bucket: str, key: str, data: bytes, content_type: Optional[str]) -> str:
+        etag = hashlib.md5(data).hexdigest()
+        self.objects[(bucket, key)] = {"data": data, "etag": etag, "content_type": content_type}
+        return etag
+
+
+class SendGridStub(VendorStub):
+    """SendGrid v3 /mail/send; accepted messages are kept in `messages`, one per
+    personalization with its substitutions applied, and `requests` counts API calls"""
+
+    name = "sendgrid"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.messages: List[Dict[str, Any]] = []
+        self.requests = 0
+
+    @staticmethod
+    def _substitute(text: Optional[str], substitutions: Dict[str, str]) -> Optional[str]:
+        if not text:
+            return text
+        for key, value in substitutions.items():
+            text = text.replace(key, str(value))
+        return text
+
+    def route(self, method, path, query, headers, body) -> StubResponse:
+        if method != "POST" or path.rstrip("/") != "/v3/mail/send":
+            return json_response(404, {"errors": [{"message": "Not found"}]})
+        if not headers.get("Authorization", "").startswith("Bearer "):
+            return json_response(401, {"errors": [{"message": "Missing API key"}]})
+
+        try:
+            mail = json.loads(body or b"{}")
+        except ValueError:
+            return json_response(400, {"errors": [{"message": "Invalid JSON"}]})
+
+        personalizations = mail.get("personalizations", [])
+        if not personalizations or not all(p.get("to") for p in personalizations):
+            return json_response(400, {"errors": [{"message": "personalizations.to is required"}]})
+        if len(personalizations) > 1000:
+            return json_response(400, {"errors": [{"message": "Too many personalizations"}]})
+
+        now = time.time()
+        messages = []
+        for p in personalizations:
+            substitutions = p.get("substitutions") or {}
+            messages.append({
+                "to": [to["email"] for to in p["to"]],
+                "subject": self._substitute(p.get("subject") or mail.get("subject"), substitutions),
+                "content": [dict(part, value=self._substitute(part.get("value"), substitutions))
+                            for part in mail.get("content", [])],
+                "received_at": now,
+            })
+
+        with self._lock:
+            self.requests += 1
+            self.messages.extend(messages)
+        return 202, {}, b""
+
+    def messages_to(self, email: str) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [m for m in self.messages if email in m["to"]]
+
+    @staticmethod
+    def delivery_problem(message: Dict[str, Any], expect_code: bool = False) -> Optional[str]:
+        """Why a delivered message would reach the user broken, or None: placeholders the
+        substitutions did not fill, or (with `expect_code`) no 6-digit code in the body"""
+        text = "\n".join([message.get("subject") or ""] + [part.get("value") or "" for part in message["content"]])
+        unfilled = sorted(set(PLACEHOLDER.findall(text)))
+        if unfilled:
+            return f"unfilled placeholders {', '.join(unfilled)}"
+        if expect_code and not VERIFICATION_CODE.search(text):
+            return "no 6-digit code in the body"
+        return None
+
+    def wait_for_messages(self, email: str, count: int = 1, timeout: float = 5.0) -> List[Dict[str, Any]]:
+        """Messages to `email` once at least `count` arrived (notifications are sent by a
+        queue worker after the request returns), or whatever arrived within `timeout`"""
+        deadline = time.time() + timeout
+        while True:
+            messages = self.messages_to(email)
+            if len(messages) >= count or time.time() >= deadline:
+                return messages
+            time.sleep(0.05)
+
+
+class TwilioVerifyStub(VendorStub):
+    """Twilio Verify v2 Verifications and VerificationCheck; `approve_code` passes checks"""
+
+    name = "twilio"
+
+    def __init__(self, *args, approve_code: str = "123456", **kwargs):
+        super().__init__(*args, **kwargs)
+        self.approve_code = approve_code
+        self.verifications: List[Dict[str, Any]] = []
+
+    def route(self, method, path, query, headers, body) -> StubResponse:
+        segments = path.strip("/").split("/")
+        if method != "POST" or len(segments) != 4 or segments[:2] != ["v2", "Services"]:
+            return json_response(404, {"code": 20404, "message": "The requested resource was not found"})
+
+        service_sid, resource = segments[2], segments[3]
+        form = {key: values[0] for key, values in parse_qs(body.decode()).items()}
+        to = form.get("To")
+        if not to:
+            return json_response(400, {"code": 60200, "message": "Invalid parameter: To"})
+
+        verification = {"sid": f"VE{uuid.uuid4().hex}", "service_sid": service_sid, "to": to,
+                        "channel": form.get("Channel", "sms"), "valid": False, "status": "pending"}
+
+        if resource == "Verifications":
+            with self._lock:
+                self.verifications.append(verification)
+            return json_response(201, verification)
+
+        if resource == "VerificationCheck":
+            approved = form.get("Code") == self.approve_code
+            verification.update({"valid": approved, "status": "approved" if approved else "pending"})
+            return json_response(200, verification)
+
+        return json_response(404, {"code": 20404, "message": "The requested resource was not found"})
+
+    def throttle_response(self) -> StubResponse:
+        return json_response(429, {"code": 20429, "message": "Too Many Requests"})
+
+    def verifications_to(self, phone: str) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [v for v in self.verifications if v["to"] == phone]
+
+    def wait_for_verifications(self, phone: str, count: int = 1, timeout: float = 5.0) -> List[Dict[str, Any]]:
+        """Verifications sent to `phone` once at least `count` arrived (SMS are sent by a
+        queue worker after the request returns), or whatever arrived within `timeout`"""
+        deadline = time.time() + timeout
+        while True:
+            verifications = self.verifications_to(phone)
+            if len(verifications) >= count or time.time() >= deadline:
+                return verifications
+            time.sleep(0.05)
+
+
+class VendorStubs:
+    """Starts all three stubs and exposes the environment the API server needs to use them"""
+
+    def __init__(self, s3: VendorBehavior = None, sendgrid: VendorBehavior = None,
+                 twilio: VendorBehavior = None, host: str = "127.0.0.1",
+                 ports: Tuple[int, int, int] = (0, 0, 0), bucket: str = "roomieswipe-local"):
+        self.bucket = bucket
+        self.s3 = S3Stub(s3, host, ports[0])
+        self.sendgrid = SendGridStub(sendgrid, host, ports[1])
+        self.twilio = TwilioVerifyStub(twilio, host=host, port=ports[2])
+
+    def start(self) -> "VendorStubs":
+        for stub in (self.s3, self.sendgrid, self.twilio):
+            stub.start()
+        return self
+
+    def stop(self):
+        for stub in (self.s3, self.sendgrid, self.twilio):
+            stub.stop()
+
+    def __enter__(self) -> "VendorStubs":
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def env(self) -> Dict[str, str]:
+        """Environment variables that point server/src/services at these stubs"""
+        return {
+            "AWS_S3_ENDPOINT": self.s3.url,
+            "AWS_S3_BUCKET": self.bucket,
+            "AWS_ACCESS_KEY_ID": "local-stub",
+            "AWS_SECRET_ACCESS_KEY": "local-stub",
+            "AWS_REGION": "us-east-1",
+            "SENDGRID_API_KEY": "SG.local-stub",
+            "SENDGRID_API_URL": self.sendgrid.url,
+            "VERIFIED_SENDER_EMAIL": "no-reply@roomieswipe.test",
+            "TWILIO_ACCOUNT_SID": "AC00000000000000000000000000000000",
+            "TWILIO_AUTH_TOKEN": "local-stub",
+            "TWILIO_VERIFY_SERVICE_SID": "VA00000000000000000000000000000000",
+            "TWILIO_API_URL": self.twilio.url
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        return {stub.name: stub.stats() for stub in (self.s3, self.sendgrid, self.twilio)}
+
+
+def parse_stub_args(argv: List[str]) -> argparse.Namespace:
+    """--vendor-stubs and its --stub-* options out of a harness command line; other
+    arguments are left to the harness"""
+    parser = argparse.ArgumentParser(add_help=False)
+    parser.add_argument("--vendor-stubs", action="store_true")
+    parser.add_argument("--stub-ports", default="4566,4567,4568", help="S3,SendGrid,Twilio ports")
+    parser.add_argument("--stub-latency-ms", type=float, default=0.0)
+    parser.add_argument("--stub-jitter-ms", type=float, default=0.0)
+    parser.add_argument("--stub-error-rate", type=float, default=0.0)
+    parser.add_argument("--stub-max-rps", type=float, default=None)
+    args, _ = parser.parse_known_args(argv)
+    ports = [int(port) for port in args.stub_ports.split(",")]
+    if len(ports) != 3:
+        parser.error("--stub-ports takes three comma-separated ports: S3,SendGrid,Twilio")
+    args.stub_ports = tuple(ports)
+    return args
+
+
+def start_stubs_from_argv(argv: List[str]) -> Optional[VendorStubs]:
+    """Start the stubs when a harness is run with --vendor-stubs
+
+    --stub-latency-ms, --stub-jitter-ms, --stub-error-rate and --stub-max-rps
+    apply to every stub, --stub-ports places them. The API server must be
+    started with the printed environment for its vendor calls to reach them.
+    """
+    args = parse_stub_args(argv)
+    if not args.vendor_stubs:
+        return None
+    behavior = lambda: VendorBehavior(args.stub_latency_ms, args.stub_jitter_ms, args.stub_error_rate,
+                                      args.stub_max_rps)
+    stubs = VendorStubs(behavior(), behavior(), behavior(), ports=args.stub_ports).start()
+    print("🔌 Vendor stubs running; API server environment:")
+    for key, value in stubs.env().items():
+        print(f"   {key}={value}")
+    print()
+    return stubs
+
+
+def parse_args(argv: List[str] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Run local S3/SendGrid/Twilio stand-ins")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--s3-port", type=int, default=4566)
+    parser.add_argument("--sendgrid-port", type=int, default=4567)
+    parser.add_argument("--twilio-port", type=int, default=4568)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="added to every vendor response")
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests that fail")
+    parser.add_argument("--max-rps", type=float, default=None, help="throughput cap before 429/503")
+    return parser.parse_args(argv)
+
+
+def main(argv: List[str] = None):
+    """Run the stubs in the foreground until interrupted"""
+    args = parse_args(argv)
+    behavior = lambda: VendorBehavior(args.latency_ms, args.jitter_ms, args.error_rate, args.max_rps)
+    stubs = VendorStubs(behavior(), behavior(), behavior(), args.host,
+                        (args.s3_port, args.sendgrid_port, args.twilio_port))
+
+    with stubs:
+        print("🚀 Vendor stubs running; start the API server with:")
+        for key, value in stubs.env().items():
+            print(f"export {key}={value}")
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            pass
+        print(json.dumps(stubs.stats(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -119,6 +119,10 @@ class APIClient {
     return await this.makeRequest(`/users?${queryParams}`);
   }
 
+  async getDeck(limit = 20) {
+    return await this.makeRequest(`/users/deck?limit=${limit}`);
+  }
+
   async getUserById(userId) {
     return await this.makeRequest(`/users/${userId}`);
   }
@@ -146,18 +150,53 @@ class APIClient {
     return await this.makeRequest('/matches/likes-me');
   }
 
+  async getLikesReceivedCount() {
+    return await this.makeRequest('/matches/likes-me?count_only=true');
+  }
+
   // File upload methods
   async uploadPhotos(files) {
-    const formData = new FormData();
-    files.forEach(file => {
-      formData.append('photos', file);
+    return await this.uploadDirect('photos', files);
+  }
+
+  // Upload straight to the bucket: presign the batch, POST each file with its signed
+  // form fields, then finalize. `target` is 'photos' or 'apartment_images'; the result matches the
+  // multipart upload endpoints
+  async uploadDirect(target, files, apartmentId) {
+    const { uploads } = await this.makeRequest('/upload/presign', {
+      method: 'POST',
+      body: JSON.stringify({
+        target,
+        apartment_id: apartmentId,
+        files: files.map(file => ({ filename: file.name, content_type: file.type, size: file.size })),
+      }),
     });
 
-    return await this.makeRequest('/upload/photos', {
+    const results = await Promise.all(uploads.map(async (upload, i) => {
+      try {
+        // The file has to be the last form field
+        const form = new FormData();
+        Object.entries(upload.fields).forEach(([name, value]) => form.append(name, value));
+        form.append('file', files[i]);
+        const response = await fetch(upload.upload_url, { method: upload.method, body: form });
+        return response.ok ? { key: upload.key } : { filename: upload.filename, error: `HTTP ${response.status}` };
+      } catch (error) {
+        return { filename: upload.filename, error: error.message };
+      }
+    }));
+
+    const keys = results.filter(result => result.key).map(result => result.key);
+    const failed = results.filter(result => !result.key);
+    const field = target === 'photos' ? 'photos' : 'images';
+    if (keys.length === 0) {
+      return { message: `0 ${field} uploaded successfully, ${failed.length} failed`, [field]: [], failed };
+    }
+
+    const finalized = await this.makeRequest('/upload/finalize', {
       method: 'POST',
-      headers: {}, // Remove Content-Type to let browser set it with boundary
-      body: formData,
+      body: JSON.stringify({ target, apartment_id: apartmentId, keys }),
     });
+    return { ...finalized, failed: failed.concat(finalized.failed || []) };
   }
 
   async deletePhoto(photoId) {
@@ -214,20 +253,14 @@ class APIClient {
   }
 
   async uploadApartmentImages(apartmentId, files) {
-    const formData = new FormData();
-    formData.append('apartment_id', apartmentId);
-    files.forEach(file => {
-      formData.append('apartment_images', file);
-    });
-
-    return await this.makeRequest('/upload/apartment-images', {
-      method: 'POST',
-      headers: {}, // Remove Content-Type to let browser set it with boundary
-      body: formData,
-    });
+    return await this.uploadDirect('apartment_images', files, apartmentId);
   }
 
   logout() {
+    // Revoke the token server-side; the local session ends either way
+    if (this.token) {
+      this.makeRequest('/auth/logout', { method: 'POST' }).catch(() => {});
+    }
     this.setToken(null);
   }
 }
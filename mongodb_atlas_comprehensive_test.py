@@ -9,12 +9,17 @@ import json
 import time
 import random
 import string
+import sys
 from typing import Dict, Any, Optional
 
-class MongoDBAtlasComprehensiveTester:
+from harness import get_client, build_headers, print_latency_summary
+from harness.runner import Scenario, ParallelScenariosMixin
+
+class MongoDBAtlasComprehensiveTester(ParallelScenariosMixin):
     def __init__(self, base_url: str = "http://localhost:3001"):
         self.base_url = base_url
         self.api_url = f"{base_url}/api"
+        self.client = get_client(self.api_url)
         self.auth_token = None
         self.test_user_id = None
         self.test_results = []
@@ -52,32 +57,11 @@ class MongoDBAtlasComprehensiveTester:
     
     def make_request(self, method: str, endpoint: str, data: Dict = None, 
                     headers: Dict = None) -> requests.Response:
-        """Make HTTP request with proper error handling"""
-        url = f"{self.api_url}{endpoint}"
-        
-        # Default headers
-        default_headers = {"Content-Type": "application/json"}
-        if self.auth_token:
-            default_headers["Authorization"] = f"Bearer {self.auth_token}"
-        
-        if headers:
-            default_headers.update(headers)
-        
-        try:
-            if method.upper() == "GET":
-                response = requests.get(url, headers=default_headers, timeout=30)
-            elif method.upper() == "POST":
-                response = requests.post(url, headers=default_headers, 
-                                       json=data if data else None, timeout=30)
-            elif method.upper() == "PUT":
-                response = requests.put(url, headers=default_headers, 
-                                       json=data if data else None, timeout=30)
-            else:
-                raise ValueError(f"Unsupported HTTP method: {method}")
-            
-            return response
-        except requests.exceptions.RequestException as e:
-            raise Exception(f"Request failed: {str(e)}")
+        """Make HTTP request over the shared pooled client"""
+        if method.upper() not in ("GET", "POST", "PUT"):
+            raise ValueError(f"Unsupported HTTP method: {method}")
+        default_headers = build_headers(self.auth_token, headers)
+        return self.client.request(method, endpoint, data, default_headers)
     
     def test_mongodb_atlas_connection(self):
         """Test MongoDB Atlas connection via health check"""
@@ -437,6 +421,17 @@ class MongoDBAtlasComprehensiveTester:
             self.log_test("Concurrent Operations MongoDB", False, f"Test failed: {str(e)}")
             return False
     
+    SCENARIOS = [
+        Scenario("test_mongodb_atlas_connection"),
+        Scenario("test_user_authentication_mongodb"),
+        Scenario("test_user_profile_management_mongodb", requires=("test_user_authentication_mongodb",)),
+        Scenario("test_roommate_matching_mongodb", requires=("test_user_authentication_mongodb",)),
+        Scenario("test_email_verification_mongodb", requires=("test_user_authentication_mongodb",)),
+        Scenario("test_password_reset_mongodb", requires=("test_user_authentication_mongodb",)),
+        Scenario("test_data_consistency_mongodb", requires=("test_user_authentication_mongodb",)),
+        Scenario("test_concurrent_operations_mongodb", requires=("test_user_authentication_mongodb",))
+    ]
+    
     def run_comprehensive_tests(self):
         """Run all comprehensive MongoDB Atlas tests"""
         print("🚀 Starting RoomieSwipe MongoDB Atlas Comprehensive Tests")
@@ -481,12 +476,16 @@ class MongoDBAtlasComprehensiveTester:
         else:
             print(f"❌ {failed} critical issues found. Migration needs attention.")
         
+        latency = self.client.recorder.summary()
+        print_latency_summary(latency)
+        
         return {
             "total_tests": len(tests),
             "passed": passed,
             "failed": failed,
             "success_rate": success_rate,
-            "results": self.test_results
+            "results": self.test_results,
+            "latency": latency
         }
 
 def main():
@@ -499,7 +498,10 @@ def main():
     tester = MongoDBAtlasComprehensiveTester()
     
     # Run comprehensive tests
-    results = tester.run_comprehensive_tests()
+    if "--parallel" in sys.argv[1:]:
+        results = tester.run_parallel_tests()
+    else:
+        results = tester.run_comprehensive_tests()
     
     # Save results to file
     with open('/app/mongodb_atlas_comprehensive_test_results.json', 'w') as f:
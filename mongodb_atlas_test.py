@@ -9,12 +9,17 @@ import json
 import time
 import random
 import string
+import sys
 from typing import Dict, Any, Optional
 
-class MongoDBAtlasAPITester:
+from harness import get_client, build_headers, print_latency_summary
+from harness.runner import Scenario, ParallelScenariosMixin
+
+class MongoDBAtlasAPITester(ParallelScenariosMixin):
     def __init__(self, base_url: str = "http://localhost:3001"):
         self.base_url = base_url
         self.api_url = f"{base_url}/api"
+        self.client = get_client(self.api_url)
         self.auth_token = None
         self.test_user_id = None
         self.test_results = []
@@ -70,41 +75,9 @@ class MongoDBAtlasAPITester:
     
     def make_request(self, method: str, endpoint: str, data: Dict = None, 
                     headers: Dict = None, files: Dict = None) -> requests.Response:
-        """Make HTTP request with proper error handling"""
-        url = f"{self.api_url}{endpoint}"
-        
-        # Default headers
-        default_headers = {"Content-Type": "application/json"}
-        if self.auth_token:
-            default_headers["Authorization"] = f"Bearer {self.auth_token}"
-        
-        if headers:
-            default_headers.update(headers)
-        
-        # Remove Content-Type for file uploads
-        if files:
-            default_headers.pop("Content-Type", None)
-        
-        try:
-            if method.upper() == "GET":
-                response = requests.get(url, headers=default_headers, timeout=30)
-            elif method.upper() == "POST":
-                if files:
-                    response = requests.post(url, headers=default_headers, files=files, data=data, timeout=30)
-                else:
-                    response = requests.post(url, headers=default_headers, 
-                                           json=data if data else None, timeout=30)
-            elif method.upper() == "PUT":
-                response = requests.put(url, headers=default_headers, 
-                                       json=data if data else None, timeout=30)
-            elif method.upper() == "DELETE":
-                response = requests.delete(url, headers=default_headers, timeout=30)
-            else:
-                raise ValueError(f"Unsupported HTTP method: {method}")
-            
-            return response
-        except requests.exceptions.RequestException as e:
-            raise Exception(f"Request failed: {str(e)}")
+        """Make HTTP request over the shared pooled client"""
+        default_headers = build_headers(self.auth_token, headers, files)
+        return self.client.request(method, endpoint, data, default_headers, files)
     
     def test_mongodb_connection_health(self):
         """Test MongoDB Atlas connection via health endpoint"""
@@ -566,6 +539,21 @@ class MongoDBAtlasAPITester:
             self.log_test("Route Migration Status", False, f"Request failed: {str(e)}")
             return False
     
+    SCENARIOS = [
+        Scenario("test_mongodb_connection_health"),
+        Scenario("test_user_registration_mongodb"),
+        Scenario("test_user_login_mongodb", requires=("test_user_registration_mongodb",)),
+        Scenario("test_email_verification_code_storage", requires=("test_user_registration_mongodb",)),
+        Scenario("test_phone_verification_integration", requires=("test_user_registration_mongodb",)),
+        Scenario("test_password_reset_mongodb", requires=("test_user_registration_mongodb",)),
+        Scenario("test_create_multiple_users_mongodb", requires=("test_user_registration_mongodb",)),
+        Scenario("test_mongodb_indexes_performance", requires=("test_user_registration_mongodb",)),
+        Scenario("test_data_validation_constraints"),
+        Scenario("test_concurrent_user_operations", requires=("test_create_multiple_users_mongodb",)),
+        Scenario("test_user_data_persistence_mongodb", requires=("test_user_registration_mongodb",)),
+        Scenario("test_route_migration_status", requires=("test_user_registration_mongodb",))
+    ]
+    
     def run_mongodb_atlas_tests(self):
         """Run all MongoDB Atlas integration tests"""
         print("🚀 Starting RoomieSwipe MongoDB Atlas Integration Tests")
@@ -631,12 +619,16 @@ class MongoDBAtlasAPITester:
             print("- Message routes still using SQLite instead of MongoDB")
             print("- Need to complete migration of all routes to MongoDB")
         
+        latency = self.client.recorder.summary()
+        print_latency_summary(latency)
+        
         return {
             "total_tests": len(tests),
             "passed": passed,
             "failed": failed,
             "success_rate": (passed / len(tests)) * 100,
             "results": self.test_results,
+            "latency": latency,
             "users_created": len(self.test_users)
         }
 
@@ -651,7 +643,10 @@ def main():
     tester = MongoDBAtlasAPITester()
     
     # Run all tests
-    results = tester.run_mongodb_atlas_tests()
+    if "--parallel" in sys.argv[1:]:
+        results = tester.run_parallel_tests()
+    else:
+        results = tester.run_mongodb_atlas_tests()
     
     # Save results to file
     with open('/app/mongodb_atlas_test_results.json', 'w') as f:
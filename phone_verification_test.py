@@ -9,16 +9,23 @@ import json
 import time
 import random
 import string
+import sys
 from typing import Dict, Any, Optional
 
-class PhoneVerificationTester:
+from harness import get_client, build_headers, print_latency_summary
+from harness.runner import Scenario, ParallelScenariosMixin
+from harness.vendors import start_stubs_from_argv
+
+class PhoneVerificationTester(ParallelScenariosMixin):
     def __init__(self, base_url: str = "http://localhost:3001"):
         self.base_url = base_url
         self.api_url = f"{base_url}/api"
+        self.client = get_client(self.api_url)
         self.auth_token = None
         self.test_user_id = None
         self.test_results = []
         self.test_user_data = None
+        self.vendor_stubs = None  # Local SendGrid/Twilio/S3 stand-ins, when started
         
     def log_test(self, test_name: str, success: bool, message: str, details: Any = None):
         """Log test results"""
@@ -41,7 +48,8 @@ class PhoneVerificationTester:
         return {
             "name": "Emma Rodriguez",
             "email": f"emma.rodriguez.{random_suffix}@example.com",
-            "phone": f"+15551234567",  # Fixed format for validation
+            # Unique per run so verifications reaching the Twilio stub can be told apart
+            "phone": f"+1555{random.randint(0, 9999999):07d}",
             "password": "SecurePass123!",
             "country": "United States",
             "nationality": "American",
@@ -50,32 +58,11 @@ class PhoneVerificationTester:
     
     def make_request(self, method: str, endpoint: str, data: Dict = None, 
                     headers: Dict = None) -> requests.Response:
-        """Make HTTP request with proper error handling"""
-        url = f"{self.api_url}{endpoint}"
-        
-        # Default headers
-        default_headers = {"Content-Type": "application/json"}
-        if self.auth_token:
-            default_headers["Authorization"] = f"Bearer {self.auth_token}"
-        
-        if headers:
-            default_headers.update(headers)
-        
-        try:
-            if method.upper() == "GET":
-                response = requests.get(url, headers=default_headers, timeout=30)
-            elif method.upper() == "POST":
-                response = requests.post(url, headers=default_headers, 
-                                       json=data if data else None, timeout=30)
-            elif method.upper() == "PUT":
-                response = requests.put(url, headers=default_headers, 
-                                       json=data if data else None, timeout=30)
-            else:
-                raise ValueError(f"Unsupported HTTP method: {method}")
-            
-            return response
-        except requests.exceptions.RequestException as e:
-            raise Exception(f"Request failed: {str(e)}")
+        """Make HTTP request over the shared pooled client"""
+        if method.upper() not in ("GET", "POST", "PUT"):
+            raise ValueError(f"Unsupported HTTP method: {method}")
+        default_headers = build_headers(self.auth_token, headers)
+        return self.client.request(method, endpoint, data, default_headers)
     
     def test_user_registration_with_phone(self):
         """Test user registration with phone number"""
@@ -91,6 +78,11 @@ class PhoneVerificationTester:
                     user_phone = data["user"].get("phone")
                     phone_verified = data["user"].get("phone_verified", False)
                     
+                    if self.vendor_stubs and not self.vendor_stubs.twilio.wait_for_verifications(user_phone):
+                        self.log_test("User Registration with Phone", False, 
+                                    "Registered but no verification SMS reached the Twilio stub")
+                        return False
+                    
                     self.log_test("User Registration with Phone", True, 
                                 f"User registered with phone {user_phone}, verified: {phone_verified}")
                     return True
@@ -117,12 +109,19 @@ class PhoneVerificationTester:
         
         try:
             resend_data = {"type": "phone"}
+            phone = self.test_user_data["phone"]
+            sent_before = len(self.vendor_stubs.twilio.verifications_to(phone)) if self.vendor_stubs else 0
             response = self.make_request("POST", "/auth/resend-verification", resend_data)
             
             if response.status_code == 200:
                 data = response.json()
                 if "message" in data:
                     message = data["message"]
+                    if (self.vendor_stubs and len(self.vendor_stubs.twilio.wait_for_verifications(
+                            phone, sent_before + 1)) <= sent_before):
+                        self.log_test("Phone Verification Resend", False, 
+                                    "Resend reported success but no SMS reached the Twilio stub")
+                        return False
                     if "phone" in message.lower():
                         self.log_test("Phone Verification Resend", True, 
                                     "Phone verification resend working correctly")
@@ -164,9 +163,9 @@ class PhoneVerificationTester:
             return False
         
         try:
-            # Test with a 6-digit code (should work in dev environment)
+            # Test with a 6-digit code (accepted in dev, and the Twilio stub's approve code)
             verify_data = {
-                "code": "123456",
+                "code": self.vendor_stubs.twilio.approve_code if self.vendor_stubs else "123456",
                 "type": "phone"
             }
             response = self.make_request("POST", "/auth/verify", verify_data)
@@ -184,7 +183,8 @@ class PhoneVerificationTester:
                 try:
                     error_data = response.json()
                     error_msg = error_data.get("error", "Unknown error")
-                    if "invalid" in error_msg.lower() and "code" in error_msg.lower():
+                    # The Twilio stub approves this code, so a rejection is a real failure
+                    if not self.vendor_stubs and "invalid" in error_msg.lower() and "code" in error_msg.lower():
                         self.log_test("Phone Verification with Code", True, 
                                     "Phone verification properly rejects invalid codes")
                         return True
@@ -292,6 +292,15 @@ class PhoneVerificationTester:
             self.log_test("MongoDB Phone Data Storage", False, f"Request failed: {str(e)}")
             return False
     
+    SCENARIOS = [
+        Scenario("test_user_registration_with_phone"),
+        Scenario("test_mongodb_phone_data_storage", requires=("test_user_registration_with_phone",)),
+        Scenario("test_phone_verification_resend", requires=("test_user_registration_with_phone",)),
+        Scenario("test_phone_verification_with_code", requires=("test_user_registration_with_phone",)),
+        Scenario("test_phone_verification_invalid_code", requires=("test_user_registration_with_phone",)),
+        Scenario("test_phone_verification_without_auth")
+    ]
+    
     def run_phone_verification_tests(self):
         """Run all phone verification tests"""
         print("🚀 Starting RoomieSwipe Phone Verification Tests")
@@ -330,12 +339,16 @@ class PhoneVerificationTester:
         else:
             print(f"⚠️  {failed} phone verification tests failed.")
         
+        latency = self.client.recorder.summary()
+        print_latency_summary(latency)
+        
         return {
             "total_tests": len(tests),
             "passed": passed,
             "failed": failed,
             "success_rate": (passed / len(tests)) * 100,
-            "results": self.test_results
+            "results": self.test_results,
+            "latency": latency
         }
 
 def main():
@@ -347,8 +360,19 @@ def main():
     # Initialize tester
     tester = PhoneVerificationTester()
     
+    # Serve local SendGrid/Twilio/S3 stand-ins
+    stubs = start_stubs_from_argv(sys.argv[1:])
+    tester.vendor_stubs = stubs
+    
     # Run phone verification tests
-    results = tester.run_phone_verification_tests()
+    if "--parallel" in sys.argv[1:]:
+        results = tester.run_parallel_tests()
+    else:
+        results = tester.run_phone_verification_tests()
+    
+    if stubs:
+        results["vendors"] = stubs.stats()
+        stubs.stop()
     
     # Save results to file
     with open('/app/phone_verification_test_results.json', 'w') as f:
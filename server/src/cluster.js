@@ -0,0 +1,243 @@
+const cluster = require('cluster');
+const os = require('os');
+const { monitorEventLoopDelay } = require('perf_hooks');
+const { createBroker, DEFAULT_BROKER_PORT } = require('./services/broker');
+
+// CLUSTER_WORKERS: unset or 1 runs a single process, "auto" forks one worker per core,
+// any other number forks that many workers sharing the listening socket
+const HEALTH_INTERVAL_MS = parseInt(process.env.CLUSTER_HEALTH_INTERVAL_MS) || 5000;
+const SHUTDOWN_TIMEOUT_MS = parseInt(process.env.SHUTDOWN_TIMEOUT_MS) || 30000;
+const STARTUP_TIMEOUT_MS = parseInt(process.env.CLUSTER_STARTUP_TIMEOUT_MS) || 60000;
+
+// Workers silent for this many health intervals are replaced
+const MISSED_HEALTH_LIMIT = 3;
+
+const resolveWorkerCount = () => {
+  const configured = process.env.CLUSTER_WORKERS;
+  if (!configured) return 1;
+  if (configured === 'auto') {
+    return os.availableParallelism ? os.availableParallelism() : os.cpus().length;
+  }
+  return Math.max(1, parseInt(configured) || 1);
+};
+
+// ---- Primary ----
+
+const runPrimary = async (workerCount) => {
+  const workerEnv = {};
+
+  // Workers must share Socket.IO rooms; host the pub/sub broker here unless an
+  // adapter was configured explicitly (e.g. mongo when running several hosts)
+  if (!process.env.SOCKET_ADAPTER) {
+    const port = parseInt(process.env.CLUSTER_BROKER_PORT) || DEFAULT_BROKER_PORT;
+    const broker = createBroker();
+    await new Promise((resolve, reject) => {
+      broker.once('error', reject);
+      broker.listen(port, '127.0.0.1', resolve);
+    });
+    workerEnv.SOCKET_ADAPTER = 'broker';
+    workerEnv.SOCKET_BROKER_URL = `tcp://127.0.0.1:${port}`;
+  }
+
+  // Per-process budgets (e.g. notification vendor rates) are split across the workers
+  workerEnv.CLUSTER_WORKER_COUNT = String(workerCount);
+
+  // The cluster balances connections without regard to Engine.IO sessions, so
+  // long-polling cannot stay sticky to one worker; default to websocket only
+  if (!process.env.SOCKET_TRANSPORTS) {
+    workerEnv.SOCKET_TRANSPORTS = 'websocket';
+  }
+
+  const workers = new Map(); // worker.id -> { worker, state, health, lastSeen }
+  let shuttingDown = false;
+  let restarting = false;
+  const recentCrashes = [];
+
+  const fork = () => {
+    const worker = cluster.fork(workerEnv);
+    const entry = { worker, state: 'starting', health: null, lastSeen: Date.now() };
+    workers.set(worker.id, entry);
+
+    worker.on('listening', () => {
+      entry.state = 'listening';
+      entry.lastSeen = Date.now();
+    });
+    worker.on('message', message => {
+      if (message && message.type === 'health') {
+        entry.health = message.health;
+        entry.lastSeen = Date.now();
+      }
+    });
+    return worker;
+  };
+
+  const waitForListening = (worker) => new Promise((resolve, reject) => {
+    const timer = setTimeout(() => reject(new Error(`Worker ${worker.process.pid} did not start`)), STARTUP_TIMEOUT_MS);
+    worker.once('listening', () => {
+      clearTimeout(timer);
+      resolve();
+    });
+    worker.once('exit', () => {
+      clearTimeout(timer);
+      reject(new Error(`Worker ${worker.process.pid} exited during startup`));
+    });
+  });
+
+  // Ask a worker to drain and exit, killing it if it overruns the drain timeout
+  const retire = (worker) => new Promise(resolve => {
+    const entry = workers.get(worker.id);
+    if (entry) entry.state = 'draining';
+    if (worker.isDead()) {
+      return resolve();
+    }
+    const timer = setTimeout(() => {
+      console.warn(`Worker ${worker.process.pid} did not drain in time, killing`);
+      worker.process.kill('SIGKILL');
+    }, SHUTDOWN_TIMEOUT_MS + 5000);
+    worker.once('exit', () => {
+      clearTimeout(timer);
+      resolve();
+    });
+    if (worker.isConnected()) {
+      worker.send({ type: 'shutdown' });
+    }
+  });
+
+  cluster.on('exit', (worker, code, signal) => {
+    const entry = workers.get(worker.id);
+    workers.delete(worker.id);
+    if (shuttingDown || (entry && entry.state === 'draining')) {
+      return;
+    }
+
+    // Unexpected exit: replace it, backing off when workers crash in a loop
+    console.error(`Worker ${worker.process.pid} died (${signal || code}), restarting`);
+    const now = Date.now();
+    recentCrashes.push(now);
+    while (recentCrashes.length && now - recentCrashes[0] > 60000) recentCrashes.shift();
+    setTimeout(fork, recentCrashes.length > 5 ? 5000 : 0);
+  });
+
+  // Rolling restart: bring up a replacement before draining each old worker
+  const rollingRestart = async () => {
+    if (restarting || shuttingDown) return;
+    restarting = true;
+    console.log('Rolling restart of all workers');
+    try {
+      const current = [...workers.values()].filter(entry => entry.state !== 'draining');
+      for (const entry of current) {
+        const replacement = fork();
+        await waitForListening(replacement);
+        await retire(entry.worker);
+      }
+      console.log('Rolling restart complete');
+    } catch (error) {
+      console.error('Rolling restart aborted:', error.message);
+    } finally {
+      restarting = false;
+    }
+  };
+
+  const shutdown = async (signal) => {
+    if (shuttingDown) return;
+    shuttingDown = true;
+    console.log(`Primary received ${signal}, draining ${workers.size} workers`);
+    await Promise.all([...workers.values()].map(entry => retire(entry.worker)));
+    process.exit(0);
+  };
+
+  process.on('SIGUSR2', rollingRestart);
+  process.on('SIGHUP', rollingRestart);
+  process.on('SIGTERM', () => shutdown('SIGTERM'));
+  process.on('SIGINT', () => shutdown('SIGINT'));
+
+  // Replace silent workers and share the health table with every worker
+  setInterval(() => {
+    const now = Date.now();
+    const table = [];
+    workers.forEach(entry => {
+      const silentFor = now - entry.lastSeen;
+      if (entry.state === 'listening' && silentFor > MISSED_HEALTH_LIMIT * HEALTH_INTERVAL_MS) {
+        console.error(`Worker ${entry.worker.process.pid} unresponsive for ${silentFor}ms, replacing`);
+        entry.state = 'draining';
+        entry.worker.process.kill('SIGKILL');
+        fork();
+        return;
+      }
+      table.push({ id: entry.worker.id, state: entry.state, last_seen_ms: silentFor, ...(entry.health || {}) });
+    });
+    workers.forEach(entry => {
+      if (entry.worker.isConnected()) {
+        entry.worker.send({ type: 'cluster_health', workers: table });
+      }
+    });
+  }, HEALTH_INTERVAL_MS).unref();
+
+  console.log(`Primary ${process.pid} forking ${workerCount} workers`);
+  for (let i = 0; i < workerCount; i++) {
+    fork();
+  }
+};
+
+// ---- Worker (or single process) ----
+
+const loopDelay = monitorEventLoopDelay({ resolution: 20 });
+loopDelay.enable();
+
+let clusterHealth = null;
+
+const workerHealth = (extra = {}) => {
+  const memory = process.memoryUsage();
+  return {
+    pid: process.pid,
+    worker_id: cluster.isWorker ? cluster.worker.id : null,
+    uptime_s: Math.round(process.uptime()),
+    rss_mb: Math.round(memory.rss / 1048576),
+    heap_used_mb: Math.round(memory.heapUsed / 1048576),
+    event_loop_p99_ms: Math.round(loopDelay.percentile(99) / 1e4) / 100,
+    ...extra
+  };
+};
+
+// Latest health table broadcast by the primary, or null outside cluster mode
+const getClusterHealth = () => clusterHealth;
+
+const startHealthReporting = (getExtra) => {
+  if (!cluster.isWorker) return;
+  process.on('message', message => {
+    if (message && message.type === 'cluster_health') {
+      clusterHealth = message.workers;
+    }
+  });
+  setInterval(() => {
+    process.send({ type: 'health', health: workerHealth(getExtra()) });
+    loopDelay.reset();
+  }, HEALTH_INTERVAL_MS).unref();
+};
+
+// Call `handler` once on SIGTERM/SIGINT or when the primary asks this worker to stop
+const onShutdownRequest = (handler) => {
+  let requested = false;
+  const request = (reason) => {
+    if (requested) return;
+    requested = true;
+    handler(reason);
+  };
+  process.on('SIGTERM', () => request('SIGTERM'));
+  process.on('SIGINT', () => request('SIGINT'));
+  if (cluster.isWorker) {
+    process.on('message', message => {
+      if (message && message.type === 'shutdown') request('primary');
+    });
+  }
+};
+
+module.exports = {
+  SHUTDOWN_TIMEOUT_MS,
+  resolveWorkerCount,
+  runPrimary,
+  workerHealth,
+  getClusterHealth,
+  startHealthReporting,
+  onShutdownRequest,
+};
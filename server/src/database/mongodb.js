@@ -44,11 +44,6 @@ const connectDB = async () => {
     process.exit(1);
   }
 };
-  } catch (error) {
-    console.error('MongoDB connection error:', error);
-    process.exit(1);
-  }
-};
 
 const createIndexes = async () => {
   try {
@@ -65,11 +60,39 @@ const createIndexes = async () => {
     await db.collection('matches').createIndex({ user_id: 1 });
     await db.collection('matches').createIndex({ target_user_id: 1 });
     await db.collection('matches').createIndex({ created_at: -1 });
+    await db.collection('matches').createIndex({ user_id: 1, action: 1, is_mutual: 1, created_at: -1, _id: -1 });
+    await db.collection('matches').createIndex({ target_user_id: 1, action: 1, created_at: -1, _id: -1 });
     
     // Message indexes
-    await db.collection('messages').createIndex({ match_id: 1, created_at: -1 });
+    await db.collection('messages').createIndex({ match_id: 1, created_at: -1, _id: -1 });
+    // The index above replaces { match_id, created_at }; drop it where an older deployment built it
+    await db.collection('messages').dropIndex('match_id_1_created_at_-1').catch(error => {
+      if (!['IndexNotFound', 'NamespaceNotFound'].includes(error.codeName)) throw error;
+    });
     await db.collection('messages').createIndex({ sender_id: 1 });
+
+    // Conversation summary indexes
+    await db.collection('conversations').createIndex({ user_id: 1, last_activity_at: -1, _id: -1 });
+    await db.collection('conversations').createIndex({ match_id: 1 });
+    await db.collection('conversations').createIndex({ 'other_user.id': 1 });
     
+    // Image derivative job indexes
+    await db.collection('userphotos').createIndex({ variants_status: 1 }, { sparse: true });
+    await db.collection('apartments').createIndex({ 'images.variants_status': 1 }, { sparse: true });
+
+    // Notification queue indexes
+    await db.collection('notificationjobs').createIndex({ channel: 1, status: 1, next_attempt_at: 1 });
+    await db.collection('notificationjobs').createIndex({ claim_id: 1 }, { sparse: true });
+    await db.collection('notificationdeadletters').createIndex({ dead_at: -1 });
+
+    // Token revocation indexes
+    await db.collection('tokenrevocations').createIndex({ recorded_at: 1 });
+    // Nodes used to poll on revoked_at; drop that index where it was built
+    await db.collection('tokenrevocations').dropIndex('revoked_at_1').catch(error => {
+      if (!['IndexNotFound', 'NamespaceNotFound'].includes(error.codeName)) throw error;
+    });
+    await db.collection('tokenrevocations').createIndex({ expires_at: 1 }, { expireAfterSeconds: 0 });
+
     // Verification codes indexes
     await db.collection('verification_codes').createIndex({ user_id: 1, type: 1 });
     await db.collection('verification_codes').createIndex({ expires_at: 1 }, { expireAfterSeconds: 0 });
@@ -1,22 +1,22 @@
-const jwt = require('jsonwebtoken');
+const { verifyToken, getBearerToken } = require('../services/tokens');
 
 const authenticateToken = (req, res, next) => {
-  const authHeader = req.headers['authorization'];
-  const token = authHeader && authHeader.split(' ')[1]; // Bearer TOKEN
+  const token = getBearerToken(req); // Bearer TOKEN
 
   if (!token) {
     return res.status(401).json({ error: 'Access token required' });
   }
 
-  jwt.verify(token, process.env.JWT_SECRET, (err, decoded) => {
-    if (err) {
-      return res.status(403).json({ error: 'Invalid or expired token' });
-    }
-    
-    req.userId = decoded.userId;
-    req.userRole = decoded.role;
-    next();
-  });
+  let decoded;
+  try {
+    decoded = verifyToken(token);
+  } catch (err) {
+    return res.status(403).json({ error: 'Invalid or expired token' });
+  }
+
+  req.userId = decoded.userId;
+  req.userRole = decoded.role;
+  next();
 };
 
 const requireAdmin = (req, res, next) => {
@@ -27,16 +27,16 @@ const requireAdmin = (req, res, next) => {
 };
 
 const optionalAuth = (req, res, next) => {
-  const authHeader = req.headers['authorization'];
-  const token = authHeader && authHeader.split(' ')[1];
+  const token = getBearerToken(req);
 
   if (token) {
-    jwt.verify(token, process.env.JWT_SECRET, (err, decoded) => {
-      if (!err) {
-        req.userId = decoded.userId;
-        req.userRole = decoded.role;
-      }
-    });
+    try {
+      const decoded = verifyToken(token);
+      req.userId = decoded.userId;
+      req.userRole = decoded.role;
+    } catch (err) {
+      // Invalid tokens are treated as anonymous
+    }
   }
   
   next();
@@ -30,6 +30,11 @@ const errorHandler = (err, req, res, next) => {
     error.status = 409;
   }
 
+  // Password worker pool saturated: tell clients when to come back
+  if (err.name === 'PasswordPoolBusyError') {
+    res.set('Retry-After', String(err.retryAfter));
+  }
+
   // File upload errors
   if (err.code === 'LIMIT_FILE_SIZE') {
     error.message = 'File too large';
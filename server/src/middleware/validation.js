@@ -22,7 +22,8 @@ const schemas = {
     password: Joi.string().min(8).required(),
     country: Joi.string().optional(),
     nationality: Joi.string().optional(),
-    location: Joi.string().optional()
+    location: Joi.string().optional(),
+    locale: Joi.string().max(35).optional()
   }),
 
   login: Joi.object({
@@ -39,6 +40,7 @@ const schemas = {
     gender: Joi.string().valid('male', 'female', 'non-binary', 'other', 'prefer-not-to-say').optional(),
     interests: Joi.array().items(Joi.string()).optional(),
     languages: Joi.array().items(Joi.string()).optional(),
+    locale: Joi.string().max(35).optional(),
     budget: Joi.number().min(0).optional(),
     preferred_location: Joi.string().optional(),
     move_in_date: Joi.string().optional(),
@@ -70,6 +72,29 @@ const schemas = {
     message_type: Joi.string().valid('text', 'image', 'file').default('text')
   }),
 
+  socketMessage: Joi.object({
+    conversationId: Joi.string().required(),
+    message: Joi.string().min(1).max(1000).required(),
+    recipientId: Joi.string().optional(),
+    clientId: Joi.string().max(100).optional()
+  }),
+
+  presignUploads: Joi.object({
+    target: Joi.string().valid('photos', 'apartment_images').required(),
+    apartment_id: Joi.string().when('target', { is: 'apartment_images', then: Joi.required() }),
+    files: Joi.array().items(Joi.object({
+      filename: Joi.string().max(255).required(),
+      content_type: Joi.string().valid('image/jpeg', 'image/png', 'image/gif').required(),
+      size: Joi.number().integer().min(1).required()
+    })).min(1).max(10).required()
+  }),
+
+  finalizeUploads: Joi.object({
+    target: Joi.string().valid('photos', 'apartment_images').required(),
+    apartment_id: Joi.string().when('target', { is: 'apartment_images', then: Joi.required() }),
+    keys: Joi.array().items(Joi.string().max(1024)).min(1).max(10).unique().required()
+  }),
+
   verifyCode: Joi.object({
     code: Joi.string().length(6).pattern(/^\d+$/).required(),
     type: Joi.string().valid('email', 'phone').required()
@@ -1,5 +1,20 @@
 const mongoose = require('mongoose');
 
+// Resized copies of an uploaded image and the state of the job producing them
+// (see services/images.js); shared by user photos and apartment images
+const imageVariantFields = {
+  variants: [{
+    _id: false,
+    width: { type: Number },
+    format: { type: String },
+    url: { type: String },
+    s3_key: { type: String }
+  }],
+  variants_status: { type: String, enum: ['pending', 'processing', 'ready', 'failed'] },
+  variants_attempts: { type: Number },
+  variants_claimed_at: { type: Date }
+};
+
 // User Schema
 const userSchema = new mongoose.Schema({
   _id: { type: String, required: true },
@@ -11,6 +26,8 @@ const userSchema = new mongoose.Schema({
   phone_verified: { type: Boolean, default: false },
   two_factor_enabled: { type: Boolean, default: false },
   role: { type: String, default: 'user' },
+  banned: { type: Boolean, default: false },
+  ban_reason: { type: String },
   profile_picture: { type: String },
   country: { type: String },
   nationality: { type: String },
@@ -21,6 +38,7 @@ const userSchema = new mongoose.Schema({
   bio: { type: String },
   interests: [{ type: String }],
   languages: [{ type: String }],
+  locale: { type: String }, // language of emails sent to the user (templates/email)
   budget: { type: Number },
   preferred_location: { type: String },
   move_in_date: { type: Date },
@@ -65,6 +83,7 @@ const userPhotoSchema = new mongoose.Schema({
   s3_key: { type: String },
   is_primary: { type: Boolean, default: false },
   order_index: { type: Number, default: 0 },
+  ...imageVariantFields,
   created_at: { type: Date, default: Date.now }
 });
 
@@ -106,7 +125,8 @@ const apartmentSchema = new mongoose.Schema({
   amenities: [{ type: String }],
   images: [{ 
     url: { type: String },
-    s3_key: { type: String }
+    s3_key: { type: String },
+    ...imageVariantFields
   }],
   available_from: { type: Date },
   lease_duration: { type: String },
@@ -130,11 +150,90 @@ const verificationCodeSchema = new mongoose.Schema({
   created_at: { type: Date, default: Date.now }
 });
 
+// Swipe Deck Schema (precomputed discovery queue, one document per user)
+const swipeDeckSchema = new mongoose.Schema({
+  _id: { type: String, required: true, ref: 'User' },
+  candidates: [{ type: String }],
+  refreshed_at: { type: Date, default: Date.now },
+  exhausted_until: { type: Date, default: null }
+});
+
+// Conversation Summary Schema (denormalized inbox row, one per match per participant)
+const conversationSchema = new mongoose.Schema({
+  _id: { type: String, required: true }, // `${match_id}:${user_id}`
+  user_id: { type: String, required: true, ref: 'User' },
+  match_id: { type: String, required: true, ref: 'Match' },
+  other_user: {
+    id: { type: String, ref: 'User' },
+    name: { type: String },
+    profile_picture: { type: String }
+  },
+  last_message: {
+    content: { type: String },
+    sender_id: { type: String },
+    created_at: { type: Date }
+  },
+  unread_count: { type: Number, default: 0 },
+  last_activity_at: { type: Date, required: true },
+  created_at: { type: Date, default: Date.now }
+});
+
+// Revoked JWTs: either one token by hash, or every token issued to a user before revoked_at
+const tokenRevocationSchema = new mongoose.Schema({
+  _id: { type: String, required: true },
+  token_hash: { type: String },
+  user_id: { type: String, ref: 'User' },
+  revoked_at: { type: Date, required: true },
+  recorded_at: { type: Date }, // set by the database on insert; nodes poll on it
+  expires_at: { type: Date, required: true }
+});
+
+// Outgoing email/SMS waiting for a notification worker (services/notification-queue.js)
+const notificationJobSchema = new mongoose.Schema({
+  _id: { type: String, required: true },
+  channel: { type: String, enum: ['email', 'sms'], required: true },
+  template: { type: String, required: true },
+  to: { type: String, required: true },
+  data: { type: mongoose.Schema.Types.Mixed, default: {} },
+  status: { type: String, enum: ['queued', 'sending'], default: 'queued' },
+  attempts: { type: Number, default: 0 },
+  next_attempt_at: { type: Date, default: Date.now },
+  claim_id: { type: String },
+  locked_until: { type: Date },
+  last_error: { type: String },
+  created_at: { type: Date, default: Date.now }
+});
+
+// Jobs that failed permanently or ran out of attempts
+const notificationDeadLetterSchema = new mongoose.Schema({
+  _id: { type: String, required: true }, // the job's id
+  channel: { type: String, required: true },
+  template: { type: String, required: true },
+  to: { type: String, required: true },
+  data: { type: mongoose.Schema.Types.Mixed, default: {} },
+  attempts: { type: Number, default: 0 },
+  error: { type: String },
+  created_at: { type: Date },
+  dead_at: { type: Date, default: Date.now }
+});
+
 // Create compound indexes
 userPhotoSchema.index({ user_id: 1, order_index: 1 });
 matchSchema.index({ user_id: 1, target_user_id: 1 }, { unique: true });
-messageSchema.index({ match_id: 1, created_at: -1 });
+matchSchema.index({ user_id: 1, action: 1, is_mutual: 1, created_at: -1, _id: -1 });
+matchSchema.index({ target_user_id: 1, action: 1, created_at: -1, _id: -1 });
+messageSchema.index({ match_id: 1, created_at: -1, _id: -1 });
 verificationCodeSchema.index({ expires_at: 1 }, { expireAfterSeconds: 0 });
+conversationSchema.index({ user_id: 1, last_activity_at: -1, _id: -1 });
+conversationSchema.index({ match_id: 1 });
+conversationSchema.index({ 'other_user.id': 1 });
+userPhotoSchema.index({ variants_status: 1 }, { sparse: true });
+apartmentSchema.index({ 'images.variants_status': 1 }, { sparse: true });
+notificationJobSchema.index({ channel: 1, status: 1, next_attempt_at: 1 });
+notificationJobSchema.index({ claim_id: 1 }, { sparse: true });
+notificationDeadLetterSchema.index({ dead_at: -1 });
+tokenRevocationSchema.index({ recorded_at: 1 });
+tokenRevocationSchema.index({ expires_at: 1 }, { expireAfterSeconds: 0 });
 
 // Create models
 const User = mongoose.model('User', userSchema);
@@ -143,6 +242,11 @@ const Match = mongoose.model('Match', matchSchema);
 const Message = mongoose.model('Message', messageSchema);
 const Apartment = mongoose.model('Apartment', apartmentSchema);
 const VerificationCode = mongoose.model('VerificationCode', verificationCodeSchema);
+const SwipeDeck = mongoose.model('SwipeDeck', swipeDeckSchema);
+const Conversation = mongoose.model('Conversation', conversationSchema);
+const TokenRevocation = mongoose.model('TokenRevocation', tokenRevocationSchema);
+const NotificationJob = mongoose.model('NotificationJob', notificationJobSchema);
+const NotificationDeadLetter = mongoose.model('NotificationDeadLetter', notificationDeadLetterSchema);
 
 module.exports = {
   User,
@@ -150,5 +254,10 @@ module.exports = {
   Match,
   Message,
   Apartment,
-  VerificationCode
+  VerificationCode,
+  SwipeDeck,
+  Conversation,
+  TokenRevocation,
+  NotificationJob,
+  NotificationDeadLetter
 };
\ No newline at end of file
@@ -1,6 +1,8 @@
 const express = require('express');
-const { User, Apartment, Match, Message } = require('../models');
+const { User, Apartment, Match, Message, NotificationJob, NotificationDeadLetter } = require('../models');
 const { requireAdmin } = require('../middleware/auth');
+const { revokeUserTokens } = require('../services/tokens');
+const { requeueDeadLetter } = require('../services/notification-queue');
 
 const router = express.Router();
 
@@ -143,6 +145,11 @@ router.put('/users/:id/ban', async (req, res) => {
 
     await User.findByIdAndUpdate(id, updateData);
 
+    // Sign the user out everywhere; cached tokens stop working within one revocation poll
+    if (banned) {
+      await revokeUserTokens(id);
+    }
+
     res.json({ message: banned ? 'User banned successfully' : 'User unbanned successfully' });
   } catch (error) {
     console.error('Ban user error:', error);
@@ -256,4 +263,48 @@ router.get('/activity', async (req, res) => {
   }
 });
 
+// Notifications that failed permanently or ran out of retries
+router.get('/notifications/dead-letters', async (req, res) => {
+  try {
+    const { page = 1, limit = 50 } = req.query;
+    const skip = (parseInt(page) - 1) * parseInt(limit);
+
+    const [deadLetters, total, queued] = await Promise.all([
+      NotificationDeadLetter.find()
+        .sort({ dead_at: -1 })
+        .skip(skip)
+        .limit(parseInt(limit))
+        .lean(),
+      NotificationDeadLetter.countDocuments(),
+      NotificationJob.countDocuments()
+    ]);
+
+    res.json({
+      dead_letters: deadLetters,
+      total,
+      queued,
+      page: parseInt(page),
+      pages: Math.ceil(total / parseInt(limit))
+    });
+  } catch (error) {
+    console.error('Get dead letters error:', error);
+    res.status(500).json({ error: 'Failed to get dead letters' });
+  }
+});
+
+// Send a dead-lettered notification again
+router.post('/notifications/dead-letters/:id/retry', async (req, res) => {
+  try {
+    const requeued = await requeueDeadLetter(req.params.id);
+    if (!requeued) {
+      return res.status(404).json({ error: 'Dead letter not found' });
+    }
+
+    res.json({ message: 'Notification requeued' });
+  } catch (error) {
+    console.error('Retry dead letter error:', error);
+    res.status(500).json({ error: 'Failed to requeue notification' });
+  }
+});
+
 module.exports = router;
\ No newline at end of file
@@ -3,9 +3,45 @@ const { v4: uuidv4 } = require('uuid');
 const { Apartment, User } = require('../models');
 const { validateRequest, schemas } = require('../middleware/validation');
 const { authenticateToken, optionalAuth } = require('../middleware/auth');
+const { imagePreferences, fitImage } = require('../utils/images');
+const { queueApartmentImageVariants } = require('../services/images');
 
 const router = express.Router();
 
+// Default rendered image widths for listing cards and the detail gallery
+const LISTING_IMAGE_WIDTH = 600;
+const DETAIL_IMAGE_WIDTH = 1200;
+
+// Public image list with each image swapped for the derivative that fits `imagePrefs`
+const toImageList = (images, imagePrefs) => (images || [])
+  .map(image => fitImage(image.toObject ? image.toObject() : image, imagePrefs));
+
+// Images sent by the client keep their stored derivatives (matched on s3_key); new
+// uploads are marked for the derivative pipeline. Only keys already stored on the
+// apartment or directly under its own images folder are kept, so a client cannot
+// point the pipeline at someone else's object
+const mergeImages = (incoming, apartmentId, stored = []) => {
+  const storedByKey = new Map(stored.filter(image => image.s3_key).map(image => [image.s3_key, image]));
+  const folder = `apartments/${apartmentId}/images/`;
+  return incoming.map(image => {
+    if (typeof image === 'string') {
+      return { url: image };
+    }
+    const known = image.s3_key && storedByKey.get(image.s3_key);
+    if (known) {
+      return known;
+    }
+    const url = image.original_url || image.url;
+    const key = typeof image.s3_key === 'string' ? image.s3_key : '';
+    const name = key.startsWith(folder) ? key.slice(folder.length) : '';
+    return name && !name.includes('/') ? { url, s3_key: key, variants_status: 'pending' } : { url };
+  });
+};
+
+const pendingImageKeys = (images) => images
+  .filter(image => image.variants_status === 'pending')
+  .map(image => image.s3_key);
+
 // Get all apartments (with optional filters)
 router.get('/', optionalAuth, async (req, res) => {
   try {
@@ -64,6 +100,7 @@ router.get('/', optionalAuth, async (req, res) => {
       .populate('owner_id', 'name profile_picture email');
 
     // Format response
+    const imagePrefs = imagePreferences(req, LISTING_IMAGE_WIDTH);
     const processedApartments = apartments.map(apartment => ({
       id: apartment._id,
       title: apartment.title,
@@ -77,7 +114,7 @@ router.get('/', optionalAuth, async (req, res) => {
       area: apartment.area,
       furnished: apartment.furnished,
       amenities: apartment.amenities,
-      images: apartment.images,
+      images: toImageList(apartment.images, imagePrefs),
       available_from: apartment.available_from,
       lease_duration: apartment.lease_duration,
       deposit: apartment.deposit,
@@ -119,6 +156,7 @@ router.get('/:id', optionalAuth, async (req, res) => {
       return res.status(404).json({ error: 'Apartment not found' });
     }
 
+    const imagePrefs = imagePreferences(req, DETAIL_IMAGE_WIDTH);
     res.json({
       id: apartment._id,
       title: apartment.title,
@@ -132,7 +170,7 @@ router.get('/:id', optionalAuth, async (req, res) => {
       area: apartment.area,
       furnished: apartment.furnished,
       amenities: apartment.amenities,
-      images: apartment.images,
+      images: toImageList(apartment.images, imagePrefs),
       available_from: apartment.available_from,
       lease_duration: apartment.lease_duration,
       deposit: apartment.deposit,
@@ -163,6 +201,7 @@ router.post('/', authenticateToken, async (req, res) => {
   try {
     const apartmentData = req.body;
     const apartmentId = uuidv4();
+    const images = mergeImages(apartmentData.images || [], apartmentId);
 
     const newApartment = new Apartment({
       _id: apartmentId,
@@ -178,7 +217,7 @@ router.post('/', authenticateToken, async (req, res) => {
       area: apartmentData.area,
       furnished: apartmentData.furnished || false,
       amenities: apartmentData.amenities || [],
-      images: apartmentData.images || [],
+      images,
       available_from: apartmentData.available_from,
       lease_duration: apartmentData.lease_duration,
       deposit: apartmentData.deposit,
@@ -188,6 +227,7 @@ router.post('/', authenticateToken, async (req, res) => {
     });
 
     await newApartment.save();
+    queueApartmentImageVariants(apartmentId, pendingImageKeys(images));
 
     res.status(201).json({
       message: 'Apartment created successfully',
@@ -216,9 +256,16 @@ router.put('/:id', authenticateToken, async (req, res) => {
       return res.status(403).json({ error: 'Not authorized to update this apartment' });
     }
 
+    if (Array.isArray(updates.images)) {
+      updates.images = mergeImages(updates.images, id, apartment.images.map(image => image.toObject()));
+    }
+
     // Update the apartment
     updates.updated_at = new Date();
     await Apartment.findByIdAndUpdate(id, updates);
+    if (updates.images) {
+      queueApartmentImageVariants(id, pendingImageKeys(updates.images));
+    }
 
     res.json({ message: 'Apartment updated successfully' });
   } catch (error) {
@@ -258,6 +305,7 @@ router.get('/user/my-listings', authenticateToken, async (req, res) => {
     const apartments = await Apartment.find({ owner_id: req.userId })
       .sort({ created_at: -1 });
 
+    const imagePrefs = imagePreferences(req, LISTING_IMAGE_WIDTH);
     const processedApartments = apartments.map(apartment => ({
       id: apartment._id,
       title: apartment.title,
@@ -271,7 +319,7 @@ router.get('/user/my-listings', authenticateToken, async (req, res) => {
       area: apartment.area,
       furnished: apartment.furnished,
       amenities: apartment.amenities,
-      images: apartment.images,
+      images: toImageList(apartment.images, imagePrefs),
       available_from: apartment.available_from,
       lease_duration: apartment.lease_duration,
       deposit: apartment.deposit,
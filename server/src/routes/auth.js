@@ -1,17 +1,27 @@
 const express = require('express');
-const bcrypt = require('bcryptjs');
 const jwt = require('jsonwebtoken');
 const { v4: uuidv4 } = require('uuid');
 const { User, VerificationCode } = require('../models');
 const { validateRequest, schemas } = require('../middleware/validation');
-const { sendVerificationEmail, sendVerificationSMS, verifyPhoneCode } = require('../services/notification');
+const { verifyPhoneCode, resolveEmailLocale } = require('../services/notification');
+const {
+  enqueueNotifications,
+  verificationEmailJob,
+  verificationSMSJob,
+  queueVerificationEmail,
+  queueVerificationSMS
+} = require('../services/notification-queue');
+const { hashPassword, verifyPassword, needsRehash } = require('../services/password');
+const { verifyToken, getBearerToken, revokeToken } = require('../services/tokens');
 
 const router = express.Router();
 
 // Register
-router.post('/register', validateRequest(schemas.register), async (req, res) => {
+router.post('/register', validateRequest(schemas.register), async (req, res, next) => {
   try {
     const { name, email, phone, password, country, nationality, location } = req.body;
+    // Language of the emails we send; an explicit choice wins over the browser's
+    const locale = resolveEmailLocale(req.body.locale || req.headers['accept-language']);
 
     // Check if user already exists
     const existingUser = await User.findOne({ email: email });
@@ -19,9 +29,8 @@ router.post('/register', validateRequest(schemas.register), async (req, res) =>
       return res.status(400).json({ error: 'User already exists with this email' });
     }
 
-    // Hash password
-    const saltRounds = 12;
-    const hashedPassword = await bcrypt.hash(password, saltRounds);
+    // Hash password (off the event loop)
+    const hashedPassword = await hashPassword(password);
 
     // Create user
     const userId = uuidv4();
@@ -33,7 +42,8 @@ router.post('/register', validateRequest(schemas.register), async (req, res) =>
       password_hash: hashedPassword,
       country,
       nationality,
-      location
+      location,
+      locale
     });
 
     await newUser.save();
@@ -60,12 +70,14 @@ router.post('/register', validateRequest(schemas.register), async (req, res) =>
 
     await emailVerificationCode.save();
 
-    // Send verification codes
+    // Queue verification codes; a notification worker sends them
     try {
-      await sendVerificationSMS(phone); // Twilio Verify handles code generation
-      await sendVerificationEmail(email, emailCode, name);
+      await enqueueNotifications([
+        verificationSMSJob(phone), // Twilio Verify handles code generation
+        verificationEmailJob(email, emailCode, name, 'email_verification', locale)
+      ]);
     } catch (error) {
-      console.error('Failed to send verification codes:', error);
+      console.error('Failed to queue verification codes:', error);
       // Continue anyway - user can request resend
     }
 
@@ -87,13 +99,14 @@ router.post('/register', validateRequest(schemas.register), async (req, res) =>
       user: userResponse
     });
   } catch (error) {
+    if (error.name === 'PasswordPoolBusyError') return next(error);
     console.error('Registration error:', error);
     res.status(500).json({ error: 'Registration failed' });
   }
 });
 
 // Login
-router.post('/login', validateRequest(schemas.login), async (req, res) => {
+router.post('/login', validateRequest(schemas.login), async (req, res, next) => {
   try {
     const { email, password } = req.body;
 
@@ -104,11 +117,31 @@ router.post('/login', validateRequest(schemas.login), async (req, res) => {
     }
 
     // Verify password
-    const isValidPassword = await bcrypt.compare(password, user.password_hash);
+    const isValidPassword = await verifyPassword(password, user.password_hash);
     if (!isValidPassword) {
       return res.status(401).json({ error: 'Invalid credentials' });
     }
 
+    // Banned users' tokens are revoked; do not hand them a new one
+    if (user.banned) {
+      return res.status(403).json({ error: 'Account suspended' });
+    }
+
+    // Upgrade hashes made with an older cost factor in the background; the
+    // password_hash guard keeps a concurrent password change from being overwritten
+    if (needsRehash(user.password_hash)) {
+      hashPassword(password)
+        .then(rehashed => User.updateOne(
+          { _id: user._id, password_hash: user.password_hash },
+          { password_hash: rehashed }
+        ))
+        .catch(error => {
+          if (error.name !== 'PasswordPoolBusyError') {
+            console.error('Password rehash error:', error);
+          }
+        });
+    }
+
     // Generate JWT token
     const token = jwt.sign(
       { userId: user._id, email: user.email, role: user.role },
@@ -156,23 +189,52 @@ router.post('/login', validateRequest(schemas.login), async (req, res) => {
       user: userResponse
     });
   } catch (error) {
+    if (error.name === 'PasswordPoolBusyError') return next(error);
     console.error('Login error:', error);
     res.status(500).json({ error: 'Login failed' });
   }
 });
 
+// Logout: revoke the presented token on every node
+router.post('/logout', async (req, res) => {
+  try {
+    const token = getBearerToken(req);
+
+    if (!token) {
+      return res.status(401).json({ error: 'Token required' });
+    }
+
+    try {
+      verifyToken(token);
+    } catch (err) {
+      return res.status(403).json({ error: 'Invalid or expired token' });
+    }
+
+    await revokeToken(token);
+
+    res.json({ message: 'Logged out successfully' });
+  } catch (error) {
+    console.error('Logout error:', error);
+    res.status(500).json({ error: 'Logout failed' });
+  }
+});
+
 // Verify phone/email
 router.post('/verify', validateRequest(schemas.verifyCode), async (req, res) => {
   try {
     const { code, type } = req.body;
-    const authHeader = req.headers['authorization'];
-    const token = authHeader && authHeader.split(' ')[1];
+    const token = getBearerToken(req);
 
     if (!token) {
       return res.status(401).json({ error: 'Token required' });
     }
 
-    const decoded = jwt.verify(token, process.env.JWT_SECRET);
+    let decoded;
+    try {
+      decoded = verifyToken(token);
+    } catch (err) {
+      return res.status(403).json({ error: 'Invalid or expired token' });
+    }
     const userId = decoded.userId;
 
     if (type === 'phone') {
@@ -235,14 +297,18 @@ router.post('/verify', validateRequest(schemas.verifyCode), async (req, res) =>
 router.post('/resend-verification', async (req, res) => {
   try {
     const { type } = req.body;
-    const authHeader = req.headers['authorization'];
-    const token = authHeader && authHeader.split(' ')[1];
+    const token = getBearerToken(req);
 
     if (!token) {
       return res.status(401).json({ error: 'Token required' });
     }
 
-    const decoded = jwt.verify(token, process.env.JWT_SECRET);
+    let decoded;
+    try {
+      decoded = verifyToken(token);
+    } catch (err) {
+      return res.status(403).json({ error: 'Invalid or expired token' });
+    }
     const userId = decoded.userId;
 
     const user = await User.findById(userId);
@@ -251,7 +317,7 @@ router.post('/resend-verification', async (req, res) => {
     }
 
     if (type === 'phone') {
-      await sendVerificationSMS(user.phone);
+      await queueVerificationSMS(user.phone);
     } else if (type === 'email') {
       // Generate new email verification code
       const emailCode = Math.floor(100000 + Math.random() * 900000).toString();
@@ -267,7 +333,7 @@ router.post('/resend-verification', async (req, res) => {
       });
 
       await verificationCode.save();
-      await sendVerificationEmail(user.email, emailCode, user.name);
+      await queueVerificationEmail(user.email, emailCode, user.name, 'email_verification', user.locale);
     }
 
     res.json({ message: `${type} verification code sent successfully` });
@@ -304,7 +370,7 @@ router.post('/reset-password', async (req, res) => {
     await verificationCode.save();
 
     // Send reset email
-    await sendVerificationEmail(email, resetCode, user.name, 'password_reset');
+    await queueVerificationEmail(email, resetCode, user.name, 'password_reset', user.locale);
 
     res.json({ message: 'If the email exists, a reset link has been sent' });
   } catch (error) {
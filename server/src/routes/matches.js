@@ -1,6 +1,15 @@
 const express = require('express');
 const { v4: uuidv4 } = require('uuid');
 const { User, Match } = require('../models');
+const { recordSwipe } = require('../services/deck');
+const { syncConversations } = require('../services/conversations');
+const {
+  calculateCompatibilityScore,
+  encodeCursor,
+  decodeCursor,
+  cursorFilter,
+  listPageLimit
+} = require('../utils/helpers');
 
 const router = express.Router();
 
@@ -31,6 +40,10 @@ router.post('/action', async (req, res) => {
     // Check if action already exists
     const existingMatch = await Match.findOne({ user_id, target_user_id });
     if (existingMatch) {
+      // The card should not have been queued; make sure it leaves the deck
+      recordSwipe(user_id, target_user_id).catch(error => {
+        console.error('Swipe deck update error:', error);
+      });
       return res.status(400).json({ error: 'Action already recorded for this user' });
     }
 
@@ -44,6 +57,11 @@ router.post('/action', async (req, res) => {
 
     await matchRecord.save();
 
+    // Take the card off the swiper's deck without holding up the response
+    recordSwipe(user_id, target_user_id).catch(error => {
+      console.error('Swipe deck update error:', error);
+    });
+
     // Check for mutual match if this is a like
     let isMutualMatch = false;
     if (action === 'like') {
@@ -60,6 +78,9 @@ router.post('/action', async (req, res) => {
           Match.findByIdAndUpdate(matchRecord._id, { is_mutual: true }),
           Match.findByIdAndUpdate(reverseMatch._id, { is_mutual: true })
         ]);
+
+        // Open the conversation in both inboxes
+        await syncConversations([matchRecord._id, reverseMatch._id]);
       }
     }
 
@@ -75,37 +96,68 @@ router.post('/action', async (req, res) => {
 });
 
 // Get current user's matches
+// Newest first. With ?limit or ?cursor the list is paginated: pass the X-Next-Cursor
+// response header back as ?cursor= for the next page; without either, every match is returned
 router.get('/', async (req, res) => {
   try {
     const user_id = req.userId;
+    const limit = listPageLimit(req.query);
 
-    // Get all mutual matches for the current user
-    const matches = await Match.find({
+    const filter = {
       user_id,
       action: 'like',
       is_mutual: true
-    }).sort({ created_at: -1 });
-
-    // Get matched user details
-    const matchedUsers = await Promise.all(matches.map(async (match) => {
-      const user = await User.findById(match.target_user_id)
-        .select('name age location bio interests profile_picture verification_status');
-      
-      return {
-        match_id: match._id,
-        user: {
-          id: user._id,
-          name: user.name,
-          age: user.age,
-          location: user.location,
-          bio: user.bio,
-          interests: user.interests || [],
-          profile_picture: user.profile_picture,
-          verification_status: user.verification_status
-        },
-        matched_at: match.created_at
-      };
-    }));
+    };
+
+    if (req.query.cursor) {
+      const position = decodeCursor(req.query.cursor);
+      if (!position) {
+        return res.status(400).json({ error: 'Invalid cursor' });
+      }
+      Object.assign(filter, cursorFilter(position));
+    }
+
+    // Get one page of mutual matches plus one extra to detect the next page
+    const matches = await Match.find(filter)
+      .select('target_user_id created_at')
+      .sort({ created_at: -1, _id: -1 })
+      .limit(limit === null ? 0 : limit + 1)
+      .lean();
+
+    const hasMore = limit !== null && matches.length > limit;
+    const page = hasMore ? matches.slice(0, limit) : matches;
+
+    // Get matched user details in a single query
+    const users = await User.find({ _id: { $in: page.map(match => match.target_user_id) } })
+      .select('name age location bio interests profile_picture verification_status')
+      .lean();
+    const usersById = new Map(users.map(user => [user._id, user]));
+
+    // Matches whose account has since been deleted are left out
+    const matchedUsers = page
+      .filter(match => usersById.has(match.target_user_id))
+      .map(match => {
+        const user = usersById.get(match.target_user_id);
+        return {
+          match_id: match._id,
+          user: {
+            id: user._id,
+            name: user.name,
+            age: user.age,
+            location: user.location,
+            bio: user.bio,
+            interests: user.interests || [],
+            profile_picture: user.profile_picture,
+            verification_status: user.verification_status
+          },
+          matched_at: match.created_at
+        };
+      });
+
+    if (hasMore) {
+      const last = page[page.length - 1];
+      res.set('X-Next-Cursor', encodeCursor(last.created_at, last._id));
+    }
 
     res.json(matchedUsers);
   } catch (error) {
@@ -115,44 +167,80 @@ router.get('/', async (req, res) => {
 });
 
 // Get users who liked current user
+// Paginated like GET /; ?count_only=true returns just { count } for the badge
 router.get('/likes-me', async (req, res) => {
   try {
     const target_user_id = req.userId;
 
-    // Get all users who liked the current user
-    const likes = await Match.find({
+    if (req.query.count_only === 'true') {
+      const count = await Match.countDocuments({ target_user_id, action: 'like' });
+      return res.json({ count });
+    }
+
+    const limit = listPageLimit(req.query);
+    const filter = {
       target_user_id,
       action: 'like'
-    }).sort({ created_at: -1 });
+    };
 
-    // Get user details and check if current user has also liked them
-    const likedByUsers = await Promise.all(likes.map(async (like) => {
-      const user = await User.findById(like.user_id)
-        .select('name age location bio interests profile_picture verification_status');
+    if (req.query.cursor) {
+      const position = decodeCursor(req.query.cursor);
+      if (!position) {
+        return res.status(400).json({ error: 'Invalid cursor' });
+      }
+      Object.assign(filter, cursorFilter(position));
+    }
 
-      // Check if current user has liked them back
-      const reciprocalLike = await Match.findOne({
-        user_id: target_user_id,
-        target_user_id: like.user_id,
-        action: 'like'
+    // Get one page of likes plus one extra to detect the next page
+    const likes = await Match.find(filter)
+      .select('user_id is_mutual created_at')
+      .sort({ created_at: -1, _id: -1 })
+      .limit(limit === null ? 0 : limit + 1)
+      .lean();
+
+    const hasMore = limit !== null && likes.length > limit;
+    const page = hasMore ? likes.slice(0, limit) : likes;
+    const likerIds = page.map(like => like.user_id);
+
+    // Load the likers and the current user's likes back to them as two set queries
+    const [users, reciprocalLikes] = await Promise.all([
+      User.find({ _id: { $in: likerIds } })
+        .select('name age location bio interests profile_picture verification_status')
+        .lean(),
+      Match.find({ user_id: target_user_id, target_user_id: { $in: likerIds }, action: 'like' })
+        .select('target_user_id')
+        .lean()
+    ]);
+
+    const usersById = new Map(users.map(user => [user._id, user]));
+    const likedBack = new Set(reciprocalLikes.map(like => like.target_user_id));
+
+    // Likes from accounts that have since been deleted are left out
+    const likedByUsers = page
+      .filter(like => usersById.has(like.user_id))
+      .map(like => {
+        const user = usersById.get(like.user_id);
+        return {
+          user: {
+            id: user._id,
+            name: user.name,
+            age: user.age,
+            location: user.location,
+            bio: user.bio,
+            interests: user.interests || [],
+            profile_picture: user.profile_picture,
+            verification_status: user.verification_status
+          },
+          liked_at: like.created_at,
+          is_mutual: like.is_mutual,
+          have_i_liked_back: likedBack.has(like.user_id)
+        };
       });
 
-      return {
-        user: {
-          id: user._id,
-          name: user.name,
-          age: user.age,
-          location: user.location,
-          bio: user.bio,
-          interests: user.interests || [],
-          profile_picture: user.profile_picture,
-          verification_status: user.verification_status
-        },
-        liked_at: like.created_at,
-        is_mutual: like.is_mutual,
-        have_i_liked_back: !!reciprocalLike
-      };
-    }));
+    if (hasMore) {
+      const last = page[page.length - 1];
+      res.set('X-Next-Cursor', encodeCursor(last.created_at, last._id));
+    }
 
     res.json(likedByUsers);
   } catch (error) {
@@ -191,6 +279,29 @@ router.get('/stats', async (req, res) => {
   }
 });
 
+// Get compatibility score with another user
+router.get('/compatibility/:userId', async (req, res) => {
+  try {
+    const scoringFields = 'location budget age lifestyle interests';
+    const [currentUser, otherUser] = await Promise.all([
+      User.findById(req.userId).select(scoringFields).lean(),
+      User.findById(req.params.userId).select(scoringFields).lean()
+    ]);
+
+    if (!currentUser || !otherUser) {
+      return res.status(404).json({ error: 'User not found' });
+    }
+
+    res.json({
+      user_id: otherUser._id,
+      compatibility_score: calculateCompatibilityScore(currentUser, otherUser)
+    });
+  } catch (error) {
+    console.error('Get compatibility error:', error);
+    res.status(500).json({ error: 'Failed to calculate compatibility' });
+  }
+});
+
 // Unmatch (remove mutual match)
 router.delete('/:matchId', async (req, res) => {
   try {
@@ -220,6 +331,9 @@ router.delete('/:matchId', async (req, res) => {
       targetMatch ? Match.findByIdAndUpdate(targetMatch._id, { is_mutual: false }) : Promise.resolve()
     ]);
 
+    // Drop the conversation from both inboxes
+    await syncConversations([userMatch, targetMatch].filter(Boolean).map(record => record._id));
+
     res.json({ message: 'Successfully unmatched' });
   } catch (error) {
     console.error('Unmatch error:', error);
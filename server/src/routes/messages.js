@@ -1,7 +1,9 @@
 const express = require('express');
 const { v4: uuidv4 } = require('uuid');
-const { Message, Match, User } = require('../models');
+const { Message, Match, User, Conversation } = require('../models');
 const { validateRequest, schemas } = require('../middleware/validation');
+const { decodeCursor, encodeCursor, cursorFilter, listPageLimit } = require('../utils/helpers');
+const { recordMessages, markConversationRead, syncConversations } = require('../services/conversations');
 
 const router = express.Router();
 
@@ -37,8 +39,11 @@ router.post('/', async (req, res) => {
 
     await newMessage.save();
 
-    // Get sender info for response
-    const sender = await User.findById(sender_id).select('name profile_picture');
+    // Get sender info for response and update both inbox summaries
+    const [sender] = await Promise.all([
+      User.findById(sender_id).select('name profile_picture'),
+      recordMessages([{ match, message: newMessage }])
+    ]);
 
     res.status(201).json({
       id: messageId,
@@ -58,14 +63,32 @@ router.post('/', async (req, res) => {
 });
 
 // Get messages for a match
+// Returns the newest `limit` messages, oldest first. ?before=<cursor> pages back through
+// older history and ?after=<cursor> fetches newer messages. X-Next-Cursor continues in the
+// same direction when more messages exist; X-Prev-Cursor points the other way.
+// The older ?page= is still honoured for existing clients, but skips through the chat
 router.get('/match/:matchId', async (req, res) => {
   try {
     const { matchId } = req.params;
     const userId = req.userId;
-    const { page = 1, limit = 50 } = req.query;
+    const { before, after } = req.query;
+    const limit = Math.min(parseInt(req.query.limit) || 50, 100);
+    const pageNumber = req.query.page === undefined ? 1 : parseInt(req.query.page);
+
+    if (before && after) {
+      return res.status(400).json({ error: 'Use either before or after, not both' });
+    }
+
+    if (!(pageNumber >= 1)) {
+      return res.status(400).json({ error: 'page must be a positive integer' });
+    }
+
+    if (pageNumber > 1 && (before || after)) {
+      return res.status(400).json({ error: 'Use either page or a before/after cursor, not both' });
+    }
 
     // Verify user is part of this match
-    const match = await Match.findById(matchId);
+    const match = await Match.findById(matchId).select('user_id target_user_id').lean();
     if (!match) {
       return res.status(404).json({ error: 'Match not found' });
     }
@@ -74,24 +97,50 @@ router.get('/match/:matchId', async (req, res) => {
       return res.status(403).json({ error: 'Unauthorized to access these messages' });
     }
 
-    const skip = (parseInt(page) - 1) * parseInt(limit);
+    const direction = after ? 'after' : 'before';
+    const filter = { match_id: matchId };
+    if (before || after) {
+      const position = decodeCursor(before || after);
+      if (!position) {
+        return res.status(400).json({ error: 'Invalid cursor' });
+      }
+      Object.assign(filter, cursorFilter(position, direction));
+    }
 
-    // Get messages with sender information
-    const messages = await Message.find({ match_id: matchId })
-      .sort({ created_at: -1 })
-      .skip(skip)
-      .limit(parseInt(limit));
+    // Walk the { match_id, created_at, _id } index from the cursor, one extra to detect more
+    const order = direction === 'after' ? 1 : -1;
+    const messages = await Message.find(filter)
+      .sort({ created_at: order, _id: order })
+      .skip((pageNumber - 1) * limit)
+      .limit(limit + 1)
+      .lean();
+
+    const hasMore = messages.length > limit;
+    const page = hasMore ? messages.slice(0, limit) : messages;
 
     // Get unique sender IDs
-    const senderIds = [...new Set(messages.map(msg => msg.sender_id))];
-    const senders = await User.find({ _id: { $in: senderIds } }).select('_id name profile_picture');
+    const senderIds = [...new Set(page.map(msg => msg.sender_id))];
+    const senders = await User.find({ _id: { $in: senderIds } }).select('_id name profile_picture').lean();
     const sendersMap = {};
     senders.forEach(sender => {
       sendersMap[sender._id] = sender;
     });
 
+    // Cursors are taken from the page in walk order: its far end continues, its near end goes back
+    if (page.length > 0) {
+      const first = page[0];
+      const last = page[page.length - 1];
+      if (hasMore) {
+        res.set('X-Next-Cursor', encodeCursor(last.created_at, last._id));
+      }
+      res.set('X-Prev-Cursor', encodeCursor(first.created_at, first._id));
+    }
+
+    // Show oldest messages first
+    const ordered = direction === 'after' ? page : page.reverse();
+
     // Format messages with sender info
-    const formattedMessages = messages.map(msg => ({
+    const formattedMessages = ordered.map(msg => ({
       id: msg._id,
       match_id: msg.match_id,
       sender_id: msg.sender_id,
@@ -101,7 +150,7 @@ router.get('/match/:matchId', async (req, res) => {
       message_type: msg.message_type,
       read: msg.read,
       created_at: msg.created_at
-    })).reverse(); // Show oldest messages first
+    }));
 
     res.json(formattedMessages);
   } catch (error) {
@@ -111,60 +160,51 @@ router.get('/match/:matchId', async (req, res) => {
 });
 
 // Get all conversations for current user
+// Served from the conversation summaries in last-activity order. With ?limit or ?cursor
+// the list is paginated: pass the X-Next-Cursor response header back as ?cursor= for the
+// next page; without either, every conversation is returned
 router.get('/conversations', async (req, res) => {
   try {
     const userId = req.userId;
+    const limit = listPageLimit(req.query);
+
+    const filter = { user_id: userId };
+    if (req.query.cursor) {
+      const position = decodeCursor(req.query.cursor);
+      if (!position) {
+        return res.status(400).json({ error: 'Invalid cursor' });
+      }
+      Object.assign(filter, cursorFilter(position, 'before', 'last_activity_at'));
+    }
 
-    // Get matches where user is involved
-    const matches = await Match.find({
-      $or: [
-        { user_id: userId },
-        { target_user_id: userId }
-      ],
-      is_mutual: true
-    }).sort({ created_at: -1 });
-
-    const conversations = [];
-
-    for (const match of matches) {
-      // Get the other user in the match
-      const otherUserId = match.user_id === userId ? match.target_user_id : match.user_id;
-      const otherUser = await User.findById(otherUserId).select('_id name profile_picture');
-
-      // Get last message
-      const lastMessage = await Message.findOne({ match_id: match._id })
-        .sort({ created_at: -1 });
-
-      // Get unread message count
-      const unreadCount = await Message.countDocuments({
-        match_id: match._id,
-        sender_id: { $ne: userId },
-        read: false
-      });
-
-      conversations.push({
-        match_id: match._id,
-        other_user: {
-          id: otherUser._id,
-          name: otherUser.name,
-          profile_picture: otherUser.profile_picture
-        },
-        last_message: lastMessage ? {
-          content: lastMessage.message,
-          sender_id: lastMessage.sender_id,
-          created_at: lastMessage.created_at
-        } : null,
-        unread_count: unreadCount,
-        created_at: match.created_at
-      });
-    }
-
-    // Sort by last message time or match creation time
-    conversations.sort((a, b) => {
-      const timeA = a.last_message ? new Date(a.last_message.created_at) : new Date(a.created_at);
-      const timeB = b.last_message ? new Date(b.last_message.created_at) : new Date(b.created_at);
-      return timeB - timeA;
-    });
+    const summaries = await Conversation.find(filter)
+      .sort({ last_activity_at: -1, _id: -1 })
+      .limit(limit === null ? 0 : limit + 1)
+      .lean();
+
+    const hasMore = limit !== null && summaries.length > limit;
+    const page = hasMore ? summaries.slice(0, limit) : summaries;
+
+    const conversations = page.map(summary => ({
+      match_id: summary.match_id,
+      other_user: {
+        id: summary.other_user.id,
+        name: summary.other_user.name,
+        profile_picture: summary.other_user.profile_picture
+      },
+      last_message: summary.last_message && summary.last_message.created_at ? {
+        content: summary.last_message.content,
+        sender_id: summary.last_message.sender_id,
+        created_at: summary.last_message.created_at
+      } : null,
+      unread_count: summary.unread_count,
+      created_at: summary.created_at
+    }));
+
+    if (hasMore) {
+      const last = page[page.length - 1];
+      res.set('X-Next-Cursor', encodeCursor(last.last_activity_at, last._id));
+    }
 
     res.json(conversations);
   } catch (error) {
@@ -198,6 +238,7 @@ router.put('/read/:matchId', async (req, res) => {
       },
       { read: true }
     );
+    await markConversationRead(matchId, userId);
 
     res.json({ message: 'Messages marked as read' });
   } catch (error) {
@@ -223,6 +264,9 @@ router.delete('/:messageId', async (req, res) => {
 
     await Message.findByIdAndDelete(messageId);
 
+    // The deleted message may have been the conversation's last or unread one
+    await syncConversations([message.match_id]);
+
     res.json({ message: 'Message deleted successfully' });
   } catch (error) {
     console.error('Delete message error:', error);
@@ -1,58 +1,98 @@
 const express = require('express');
 const { v4: uuidv4 } = require('uuid');
-const { UserPhoto } = require('../models');
-const { upload, uploadToS3, deleteFromS3 } = require('../services/s3');
+const { UserPhoto, Apartment } = require('../models');
+const { validateRequest, schemas } = require('../middleware/validation');
+const { createLimiter } = require('../utils/helpers');
+const { queuePhotoVariants, queueApartmentImageVariants, variantKeys } = require('../services/images');
+const {
+  s3Upload,
+  deleteFromS3,
+  generatePresignedPost,
+  headObject,
+  getObjectUrl,
+  MAX_FILE_SIZE,
+  MAX_VIDEO_SIZE
+} = require('../services/s3');
 
 const router = express.Router();
 
+// Files are streamed to S3 while the request is parsed; handlers get each file's
+// upload result as `file.s3`
+const photoUpload = s3Upload(req => `users/${req.userId}/photos`);
+const videoUpload = s3Upload(req => `users/${req.userId}/videos`, { maxFileSize: MAX_VIDEO_SIZE });
+
+// apartment_id has to arrive before the files to name their folder
+const apartmentImageUpload = s3Upload(req => {
+  const { apartment_id } = req.body;
+  return apartment_id && /^[\w-]+$/.test(apartment_id) ? `apartments/${apartment_id}/images` : null;
+});
+
 // Upload user photos
-router.post('/photos', upload.array('photos', 5), async (req, res) => {
+router.post('/photos', photoUpload.array('photos', 5), async (req, res) => {
   try {
     if (!req.files || req.files.length === 0) {
       return res.status(400).json({ error: 'No files uploaded' });
     }
 
-    const photoUrls = [];
     const failedUploads = [];
+    const uploaded = [];
 
-    // Upload files to S3 and save records to database
-    for (let i = 0; i < req.files.length; i++) {
-      const file = req.files[i];
-      const photoId = uuidv4();
-      
-      try {
-        const s3Result = await uploadToS3(file, `users/${req.userId}/photos`);
-        
-        if (s3Result.success) {
-          // Save photo record to MongoDB
-          const photoRecord = new UserPhoto({
-            _id: photoId,
+    // Files were streamed to S3, a few at a time, while the request was parsed
+    req.files.forEach((file, i) => {
+      if (file.s3 && file.s3.success) {
+        uploaded.push({
+          filename: file.originalname,
+          record: {
+            _id: uuidv4(),
             user_id: req.userId,
-            photo_url: s3Result.url,
-            s3_key: s3Result.key,
-            order_index: i
-          });
-
-          await photoRecord.save();
+            photo_url: file.s3.url,
+            s3_key: file.s3.key,
+            order_index: i,
+            variants_status: 'pending'
+          }
+        });
+      } else {
+        failedUploads.push({
+          filename: file.originalname,
+          error: file.s3 ? file.s3.error : 'Upload failed'
+        });
+      }
+    });
 
-          photoUrls.push({
-            id: photoId,
-            url: s3Result.url,
-            s3_key: s3Result.key
+    // Save every photo record in one write; a failed record only fails its own file
+    const failedWrites = new Map();
+    if (uploaded.length > 0) {
+      try {
+        await UserPhoto.insertMany(uploaded.map(entry => entry.record), { ordered: false });
+      } catch (error) {
+        if (error.writeErrors) {
+          [].concat(error.writeErrors).forEach(writeError => {
+            failedWrites.set(writeError.index, writeError.errmsg || 'Failed to save photo');
           });
         } else {
-          failedUploads.push({
-            filename: file.originalname,
-            error: s3Result.error
-          });
+          uploaded.forEach((entry, index) => failedWrites.set(index, error.message));
         }
-      } catch (error) {
+      }
+    }
+
+    const photoUrls = [];
+    uploaded.forEach((entry, index) => {
+      if (failedWrites.has(index)) {
         failedUploads.push({
-          filename: file.originalname,
-          error: error.message
+          filename: entry.filename,
+          error: failedWrites.get(index)
+        });
+      } else {
+        photoUrls.push({
+          id: entry.record._id,
+          url: entry.record.photo_url,
+          s3_key: entry.record.s3_key
         });
       }
-    }
+    });
+
+    // Thumbnails and WebP/AVIF copies are made in the background
+    queuePhotoVariants(photoUrls.map(photo => photo.id));
 
     res.json({
       message: `${photoUrls.length} photos uploaded successfully, ${failedUploads.length} failed`,
@@ -66,7 +106,7 @@ router.post('/photos', upload.array('photos', 5), async (req, res) => {
 });
 
 // Upload apartment images
-router.post('/apartment-images', upload.array('apartment_images', 10), async (req, res) => {
+router.post('/apartment-images', apartmentImageUpload.array('apartment_images', 10), async (req, res) => {
   try {
     if (!req.files || req.files.length === 0) {
       return res.status(400).json({ error: 'No files uploaded' });
@@ -80,26 +120,17 @@ router.post('/apartment-images', upload.array('apartment_images', 10), async (re
     const imageUrls = [];
     const failedUploads = [];
 
-    // Upload files to S3
+    // Files were streamed to S3, a few at a time, while the request was parsed
     for (const file of req.files) {
-      try {
-        const s3Result = await uploadToS3(file, `apartments/${apartment_id}/images`);
-        
-        if (s3Result.success) {
-          imageUrls.push({
-            url: s3Result.url,
-            s3_key: s3Result.key
-          });
-        } else {
-          failedUploads.push({
-            filename: file.originalname,
-            error: s3Result.error
-          });
-        }
-      } catch (error) {
+      if (file.s3 && file.s3.success) {
+        imageUrls.push({
+          url: file.s3.url,
+          s3_key: file.s3.key
+        });
+      } else {
         failedUploads.push({
           filename: file.originalname,
-          error: error.message
+          error: file.s3 ? file.s3.error : 'Upload failed'
         });
       }
     }
@@ -116,13 +147,13 @@ router.post('/apartment-images', upload.array('apartment_images', 10), async (re
 });
 
 // Upload video
-router.post('/video', upload.single('video'), async (req, res) => {
+router.post('/video', videoUpload.single('video'), async (req, res) => {
   try {
     if (!req.file) {
       return res.status(400).json({ error: 'No video file uploaded' });
     }
 
-    const s3Result = await uploadToS3(req.file, `users/${req.userId}/videos`);
+    const s3Result = req.file.s3;
     
     if (s3Result.success) {
       res.json({
@@ -139,6 +170,178 @@ router.post('/video', upload.single('video'), async (req, res) => {
   }
 });
 
+// Direct-to-bucket uploads: POST /presign for a batch of signed form posts, POST each
+// file to the bucket, then POST /finalize to record the ones that arrived
+
+const PRESIGN_EXPIRES_SECONDS = 15 * 60;
+const MAX_BATCH_FILES = { photos: 5, apartment_images: 10 };
+const FINALIZE_CHECK_CONCURRENCY = 5;
+const IMAGE_EXTENSIONS = { 'image/jpeg': '.jpg', 'image/png': '.png', 'image/gif': '.gif' };
+
+// Key prefix the caller may write to for `target`, or { status, error } when not allowed
+const resolveUploadTarget = async (userId, target, apartmentId) => {
+  if (target === 'photos') {
+    return { folder: `users/${userId}/photos` };
+  }
+
+  const apartment = await Apartment.findById(apartmentId).select('owner_id images').lean();
+  if (!apartment) {
+    return { status: 404, error: 'Apartment not found' };
+  }
+  if (apartment.owner_id !== userId) {
+    return { status: 403, error: 'Not authorized to upload images for this apartment' };
+  }
+  return { folder: `apartments/${apartmentId}/images`, apartment };
+};
+
+// Issue presigned POSTs for a batch of files; the bucket enforces MAX_FILE_SIZE itself,
+// so an object that is never finalized still cannot be larger than that
+router.post('/presign', validateRequest(schemas.presignUploads), async (req, res) => {
+  try {
+    const { target, apartment_id, files } = req.body;
+
+    if (files.length > MAX_BATCH_FILES[target]) {
+      return res.status(400).json({ error: `At most ${MAX_BATCH_FILES[target]} files per upload` });
+    }
+
+    const oversized = files.filter(file => file.size > MAX_FILE_SIZE);
+    if (oversized.length > 0) {
+      return res.status(413).json({ error: 'File too large', files: oversized.map(file => file.filename) });
+    }
+
+    const { folder, status, error } = await resolveUploadTarget(req.userId, target, apartment_id);
+    if (!folder) {
+      return res.status(status).json({ error });
+    }
+
+    const uploads = [];
+    for (const file of files) {
+      const key = `${folder}/${uuidv4()}${IMAGE_EXTENSIONS[file.content_type]}`;
+      const presigned = generatePresignedPost(key, PRESIGN_EXPIRES_SECONDS, {
+        contentType: file.content_type,
+        maxSize: MAX_FILE_SIZE
+      });
+      if (!presigned.success) {
+        return res.status(500).json({ error: 'Failed to prepare uploads' });
+      }
+
+      uploads.push({
+        filename: file.filename,
+        key,
+        upload_url: presigned.uploadUrl,
+        method: 'POST',
+        fields: presigned.fields
+      });
+    }
+
+    res.json({ uploads, expires_in: PRESIGN_EXPIRES_SECONDS });
+  } catch (error) {
+    console.error('Presign uploads error:', error);
+    res.status(500).json({ error: 'Failed to prepare uploads' });
+  }
+});
+
+// Check presigned uploads landed and record them in one write
+router.post('/finalize', validateRequest(schemas.finalizeUploads), async (req, res) => {
+  try {
+    const { target, apartment_id, keys } = req.body;
+
+    const { folder, apartment, status, error } = await resolveUploadTarget(req.userId, target, apartment_id);
+    if (!folder) {
+      return res.status(status).json({ error });
+    }
+
+    const failedUploads = [];
+    const owned = [];
+    keys.forEach(key => {
+      const name = key.startsWith(`${folder}/`) ? key.slice(folder.length + 1) : '';
+      if (name && !name.includes('/')) {
+        owned.push(key);
+      } else {
+        failedUploads.push({ key, error: 'Key does not belong to this upload' });
+      }
+    });
+
+    // Finalizing the same key twice returns the existing record instead of a duplicate
+    const existing = target === 'photos'
+      ? await UserPhoto.find({ user_id: req.userId, s3_key: { $in: owned } }).select('photo_url s3_key').lean()
+      : (apartment.images || []).filter(image => owned.includes(image.s3_key));
+    const recorded = new Set(existing.map(item => item.s3_key));
+
+    const check = createLimiter(FINALIZE_CHECK_CONCURRENCY);
+    const checks = await Promise.all(owned.filter(key => !recorded.has(key)).map(key => check(async () => {
+      try {
+        return { key, head: await headObject(key) };
+      } catch (error) {
+        return { key, error: error.message };
+      }
+    })));
+
+    const verified = [];
+    for (const check of checks) {
+      if (check.error) {
+        failedUploads.push({ key: check.key, error: check.error });
+      } else if (!check.head.exists) {
+        failedUploads.push({ key: check.key, error: 'Upload not found' });
+      } else if (check.head.size > MAX_FILE_SIZE) {
+        await deleteFromS3(check.key);
+        failedUploads.push({ key: check.key, error: 'File too large' });
+      } else {
+        verified.push(check.key);
+      }
+    }
+
+    if (target === 'photos') {
+      const count = await UserPhoto.countDocuments({ user_id: req.userId });
+      const photoRecords = verified.map((key, i) => ({
+        _id: uuidv4(),
+        user_id: req.userId,
+        photo_url: getObjectUrl(key),
+        s3_key: key,
+        order_index: count + i,
+        variants_status: 'pending'
+      }));
+      if (photoRecords.length > 0) {
+        await UserPhoto.insertMany(photoRecords);
+        queuePhotoVariants(photoRecords.map(photo => photo._id));
+      }
+
+      const photos = existing.concat(photoRecords).map(photo => ({
+        id: photo._id,
+        url: photo.photo_url,
+        s3_key: photo.s3_key
+      }));
+      return res.json({
+        message: `${photos.length} photos uploaded successfully, ${failedUploads.length} failed`,
+        photos,
+        failed: failedUploads
+      });
+    }
+
+    const imageRecords = verified.map(key => ({ url: getObjectUrl(key), s3_key: key }));
+    if (imageRecords.length > 0) {
+      await Apartment.updateOne(
+        { _id: apartment_id },
+        {
+          $push: { images: { $each: imageRecords.map(image => ({ ...image, variants_status: 'pending' })) } },
+          updated_at: new Date()
+        }
+      );
+      queueApartmentImageVariants(apartment_id, verified);
+    }
+
+    const images = existing.map(image => ({ url: image.url, s3_key: image.s3_key })).concat(imageRecords);
+    res.json({
+      message: `${images.length} images uploaded successfully, ${failedUploads.length} failed`,
+      images,
+      failed: failedUploads
+    });
+  } catch (error) {
+    console.error('Finalize uploads error:', error);
+    res.status(500).json({ error: 'Failed to finalize uploads' });
+  }
+});
+
 // Delete user photo
 router.delete('/photos/:photoId', async (req, res) => {
   try {
@@ -151,9 +354,9 @@ router.delete('/photos/:photoId', async (req, res) => {
       return res.status(404).json({ error: 'Photo not found' });
     }
 
-    // Delete file from S3
+    // Delete the upload and its derivatives from S3
     if (photo.s3_key) {
-      await deleteFromS3(photo.s3_key);
+      await Promise.all([photo.s3_key, ...variantKeys(photo)].map(key => deleteFromS3(key)));
     }
 
     // Delete from database
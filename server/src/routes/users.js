@@ -1,10 +1,70 @@
 const express = require('express');
-const bcrypt = require('bcryptjs');
 const { User, UserPhoto } = require('../models');
 const { validateRequest, schemas } = require('../middleware/validation');
+const { getNextCandidates } = require('../services/deck');
+const { rankCandidates, SCORING_FIELDS } = require('../utils/compatibility');
+const { updateConversationUser, removeUserConversations } = require('../services/conversations');
+const { hashPassword, verifyPassword } = require('../services/password');
+const { revokeUserTokens } = require('../services/tokens');
+const { resolveEmailLocale } = require('../services/notification');
+const { imagePreferences, fitImage } = require('../utils/images');
 
 const router = express.Router();
 
+// Limit photos per swipe card for performance
+const DISCOVERY_PHOTO_LIMIT = 5;
+
+// Default rendered width of a swipe card photo when the client sends no image_width
+const DISCOVERY_IMAGE_WIDTH = 600;
+
+// Newest matching users scored per discovery request; results are ranked by
+// compatibility within this pool, so older users outside it are not returned
+const DISCOVERY_CANDIDATE_POOL = parseInt(process.env.DISCOVERY_CANDIDATE_POOL) || 2000;
+
+// Fetch the first `perUser` photos (by order_index) for many users with a single
+// aggregation over the { user_id, order_index } index, keyed by user id
+const getPhotosByUser = async (userIds, perUser) => {
+  const photosByUser = new Map();
+  if (userIds.length === 0) {
+    return photosByUser;
+  }
+
+  const grouped = await UserPhoto.aggregate([
+    { $match: { user_id: { $in: userIds } } },
+    { $sort: { user_id: 1, order_index: 1 } },
+    {
+      $group: {
+        _id: '$user_id',
+        photos: { $push: { id: '$_id', url: '$photo_url', is_primary: '$is_primary', variants: '$variants' } }
+      }
+    },
+    { $project: { photos: { $slice: ['$photos', perUser] } } }
+  ]);
+
+  grouped.forEach(entry => {
+    photosByUser.set(entry._id, entry.photos);
+  });
+  return photosByUser;
+};
+
+// Public swipe card shape shared by discovery and the deck; photos are swapped for the
+// derivative that fits `imagePrefs`
+const toDiscoveryCard = (user, photos, imagePrefs) => ({
+  id: user._id,
+  name: user.name,
+  age: user.age,
+  nationality: user.nationality,
+  profile_picture: user.profile_picture,
+  budget: user.budget,
+  location: user.location,
+  move_in_date: user.move_in_date,
+  bio: user.bio,
+  interests: user.interests || [],
+  verification_status: user.verification_status,
+  lifestyle: user.lifestyle || {},
+  photos: (photos || []).map(photo => fitImage(photo, imagePrefs))
+});
+
 // Get current user profile
 router.get('/profile', async (req, res) => {
   try {
@@ -73,6 +133,11 @@ router.put('/profile', async (req, res) => {
     delete updateData.email;
     delete updateData.password_hash;
     delete updateData.role;
+
+    // Only locales we have email templates for
+    if ('locale' in updateData) {
+      updateData.locale = resolveEmailLocale(updateData.locale);
+    }
     
     // Set updated timestamp
     updateData.updated_at = new Date();
@@ -87,6 +152,11 @@ router.put('/profile', async (req, res) => {
       return res.status(404).json({ error: 'User not found' });
     }
 
+    // Keep the snapshot shown in other users' inboxes current
+    if ('name' in updateData || 'profile_picture' in updateData) {
+      await updateConversationUser(updatedUser);
+    }
+
     res.json({
       message: 'Profile updated successfully',
       user: updatedUser
@@ -103,7 +173,7 @@ router.put('/profile', async (req, res) => {
   }
 });
 
-// Get all users for roommate discovery (with filters)
+// Get all users for roommate discovery (with filters), best compatibility first
 router.get('/', async (req, res) => {
   try {
     const {
@@ -121,7 +191,8 @@ router.get('/', async (req, res) => {
     // Build filter query
     const filter = {
       _id: { $ne: req.userId }, // Exclude current user
-      verification_status: { $ne: 'banned' }
+      verification_status: { $ne: 'banned' },
+      banned: { $ne: true }
     };
 
     // Add filters if provided
@@ -149,38 +220,32 @@ router.get('/', async (req, res) => {
       filter.verification_status = verification_status;
     }
 
-    const users = await User.find(filter)
-      .select('-password_hash -email') // Exclude sensitive data
-      .limit(parseInt(limit))
-      .skip(parseInt(skip))
-      .sort({ created_at: -1 });
-
-    // Get photos for each user
-    const usersWithPhotos = await Promise.all(users.map(async (user) => {
-      const photos = await UserPhoto.find({ user_id: user._id })
-        .sort({ order_index: 1 })
-        .limit(5); // Limit photos for performance
-
-      return {
-        id: user._id,
-        name: user.name,
-        age: user.age,
-        nationality: user.nationality,
-        profile_picture: user.profile_picture,
-        budget: user.budget,
-        location: user.location,
-        move_in_date: user.move_in_date,
-        bio: user.bio,
-        interests: user.interests || [],
-        verification_status: user.verification_status,
-        lifestyle: user.lifestyle || {},
-        photos: photos.map(photo => ({
-          id: photo._id,
-          url: photo.photo_url,
-          is_primary: photo.is_primary
-        }))
-      };
-    }));
+    // Score the newest matching users against the caller and page through the ranking
+    const [caller, pool] = await Promise.all([
+      User.findById(req.userId).select(SCORING_FIELDS).lean(),
+      User.find(filter)
+        .select(SCORING_FIELDS)
+        .sort({ created_at: -1 })
+        .limit(DISCOVERY_CANDIDATE_POOL)
+        .lean()
+    ]);
+    const ranked = caller ? rankCandidates(caller, pool) : pool.map(candidate => ({ id: candidate._id }));
+    const start = Math.max(0, parseInt(skip) || 0);
+    const pageIds = ranked.slice(start, start + Math.max(0, parseInt(limit) || 0)).map(candidate => candidate.id);
+
+    // Full profiles and photos for the page only, one query each
+    const [users, photosByUser] = await Promise.all([
+      User.find({ _id: { $in: pageIds } })
+        .select('-password_hash -email') // Exclude sensitive data
+        .lean(),
+      getPhotosByUser(pageIds, DISCOVERY_PHOTO_LIMIT)
+    ]);
+
+    const usersById = new Map(users.map(user => [user._id, user]));
+    const imagePrefs = imagePreferences(req, DISCOVERY_IMAGE_WIDTH);
+    const usersWithPhotos = pageIds
+      .filter(id => usersById.has(id))
+      .map(id => toDiscoveryCard(usersById.get(id), photosByUser.get(id), imagePrefs));
 
     res.json(usersWithPhotos);
   } catch (error) {
@@ -189,6 +254,34 @@ router.get('/', async (req, res) => {
   }
 });
 
+// Get the next cards from the caller's precomputed swipe deck
+router.get('/deck', async (req, res) => {
+  try {
+    const limit = Math.min(parseInt(req.query.limit) || 20, 50);
+
+    const candidateIds = await getNextCandidates(req.userId, limit);
+
+    const [users, photosByUser] = await Promise.all([
+      User.find({ _id: { $in: candidateIds }, verification_status: { $ne: 'banned' }, banned: { $ne: true } })
+        .select('-password_hash -email')
+        .lean(),
+      getPhotosByUser(candidateIds, DISCOVERY_PHOTO_LIMIT)
+    ]);
+
+    // Keep deck order; accounts deleted or banned since the deck was built are skipped
+    const usersById = new Map(users.map(user => [user._id, user]));
+    const imagePrefs = imagePreferences(req, DISCOVERY_IMAGE_WIDTH);
+    const cards = candidateIds
+      .filter(id => usersById.has(id))
+      .map(id => toDiscoveryCard(usersById.get(id), photosByUser.get(id), imagePrefs));
+
+    res.json(cards);
+  } catch (error) {
+    console.error('Get deck error:', error);
+    res.status(500).json({ error: 'Failed to get swipe deck' });
+  }
+});
+
 // Get specific user by ID
 router.get('/:userId', async (req, res) => {
   try {
@@ -276,7 +369,7 @@ router.get('/search', async (req, res) => {
 });
 
 // Update password
-router.put('/password', async (req, res) => {
+router.put('/password', async (req, res, next) => {
   try {
     const { currentPassword, newPassword } = req.body;
 
@@ -291,14 +384,13 @@ router.put('/password', async (req, res) => {
     }
 
     // Verify current password
-    const isValidPassword = await bcrypt.compare(currentPassword, user.password_hash);
+    const isValidPassword = await verifyPassword(currentPassword, user.password_hash);
     if (!isValidPassword) {
       return res.status(400).json({ error: 'Current password is incorrect' });
     }
 
     // Hash new password
-    const saltRounds = 12;
-    const hashedPassword = await bcrypt.hash(newPassword, saltRounds);
+    const hashedPassword = await hashPassword(newPassword);
 
     // Update password
     await User.findByIdAndUpdate(req.userId, {
@@ -308,13 +400,14 @@ router.put('/password', async (req, res) => {
 
     res.json({ message: 'Password updated successfully' });
   } catch (error) {
+    if (error.name === 'PasswordPoolBusyError') return next(error);
     console.error('Update password error:', error);
     res.status(500).json({ error: 'Failed to update password' });
   }
 });
 
 // Delete user account
-router.delete('/', async (req, res) => {
+router.delete('/', async (req, res, next) => {
   try {
     const { password } = req.body;
 
@@ -329,7 +422,7 @@ router.delete('/', async (req, res) => {
     }
 
     // Verify password
-    const isValidPassword = await bcrypt.compare(password, user.password_hash);
+    const isValidPassword = await verifyPassword(password, user.password_hash);
     if (!isValidPassword) {
       return res.status(400).json({ error: 'Password is incorrect' });
     }
@@ -338,11 +431,14 @@ router.delete('/', async (req, res) => {
     await Promise.all([
       User.findByIdAndDelete(req.userId),
       UserPhoto.deleteMany({ user_id: req.userId }),
+      removeUserConversations(req.userId),
+      revokeUserTokens(req.userId),
       // Note: In production, you might want to anonymize rather than delete for data integrity
     ]);
 
     res.json({ message: 'Account deleted successfully' });
   } catch (error) {
+    if (error.name === 'PasswordPoolBusyError') return next(error);
     console.error('Delete account error:', error);
     res.status(500).json({ error: 'Failed to delete account' });
   }
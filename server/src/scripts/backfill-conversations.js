@@ -0,0 +1,28 @@
+// Rebuild the denormalized conversation summaries from matches and messages.
+//
+// Usage: node src/scripts/backfill-conversations.js [--batch-size=1000]
+//
+// Run once after deploying the conversation summary collection, or any time
+// the summaries are suspected to have drifted from the source collections.
+const mongoose = require('mongoose');
+require('dotenv').config();
+
+const { connectDB } = require('../database/mongodb');
+const { backfillConversations } = require('../services/conversations');
+
+if (require.main === module) {
+  const arg = process.argv.slice(2).find(value => value.startsWith('--batch-size='));
+  const batchSize = arg ? parseInt(arg.split('=')[1]) : 1000;
+  const started = Date.now();
+
+  connectDB()
+    .then(() => backfillConversations(batchSize))
+    .then(synced => {
+      console.log(`Synced conversation summaries for ${synced} matches in ${((Date.now() - started) / 1000).toFixed(1)}s`);
+      return mongoose.disconnect();
+    })
+    .catch(error => {
+      console.error('Conversation backfill failed:', error);
+      process.exit(1);
+    });
+}
@@ -0,0 +1,25 @@
+// Queue image derivatives (thumbnails and WebP/AVIF copies) for photos and apartment
+// images uploaded before the derivative pipeline existed.
+//
+// Usage: node src/scripts/backfill-image-variants.js
+//
+// This only marks the images as pending; the running API servers pick them up in
+// batches on their next image pipeline sweep.
+const mongoose = require('mongoose');
+require('dotenv').config();
+
+const { connectDB } = require('../database/mongodb');
+const { backfillImageVariants } = require('../services/images');
+
+if (require.main === module) {
+  connectDB()
+    .then(() => backfillImageVariants())
+    .then(({ photos, apartments }) => {
+      console.log(`Queued derivatives for ${photos} photos and images of ${apartments} apartments`);
+      return mongoose.disconnect();
+    })
+    .catch(error => {
+      console.error('Image derivative backfill failed:', error);
+      process.exit(1);
+    });
+}
@@ -0,0 +1,37 @@
+// Dedicated notification worker: sends queued emails and SMS without serving HTTP.
+//
+// Usage: node src/scripts/notification-worker.js
+//
+// Run any number of these alongside API servers started with NOTIFICATION_WORKER=off;
+// jobs are claimed atomically, so workers never send the same notification twice.
+const mongoose = require('mongoose');
+require('dotenv').config();
+
+const { connectDB } = require('../database/mongodb');
+const { startNotificationWorker, stopNotificationWorker } = require('../services/notification-queue');
+
+const shutdown = async (signal) => {
+  console.log(`Notification worker stopping (${signal})`);
+  try {
+    await stopNotificationWorker();
+    await mongoose.disconnect();
+    process.exit(0);
+  } catch (error) {
+    console.error('Notification worker shutdown error:', error);
+    process.exit(1);
+  }
+};
+
+if (require.main === module) {
+  connectDB()
+    .then(() => {
+      startNotificationWorker({ force: true });
+      console.log(`Notification worker running (pid ${process.pid})`);
+      process.once('SIGTERM', () => shutdown('SIGTERM'));
+      process.once('SIGINT', () => shutdown('SIGINT'));
+    })
+    .catch(error => {
+      console.error('Notification worker failed to start:', error);
+      process.exit(1);
+    });
+}
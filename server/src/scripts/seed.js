@@ -0,0 +1,418 @@
+// Bulk synthetic data seeder for benchmarking at production-like scale.
+//
+// Usage: node src/scripts/seed.js --users=1000000 [--batch-size=5000] [--seed=42] [--drop]
+//
+// Documents are generated with realistic distributions and written straight
+// into MongoDB with unordered insertMany batches, bypassing the API and its
+// per-request bcrypt cost: every seeded user shares one precomputed hash of
+// --password so harnesses and load tests can still log in as them.
+const mongoose = require('mongoose');
+const bcrypt = require('bcryptjs');
+const { v4: uuidv4 } = require('uuid');
+require('dotenv').config();
+
+const { connectDB } = require('../database/mongodb');
+const { User, UserPhoto, Match, Message, Apartment, SwipeDeck, Conversation } = require('../models');
+const { backfillConversations } = require('../services/conversations');
+
+const DEFAULTS = {
+  users: 10000,
+  batchSize: 5000,
+  concurrency: 4,
+  seed: 42,
+  password: 'SecurePass123!',
+  emailDomain: 'seed.roomieswipe.test'
+};
+
+// City weights follow a rough Zipf curve; cost scales the budget/price distributions
+const CITIES = [
+  { location: 'New York, NY', country: 'United States', weight: 20, cost: 1.6 },
+  { location: 'Los Angeles, CA', country: 'United States', weight: 12, cost: 1.4 },
+  { location: 'San Francisco, CA', country: 'United States', weight: 9, cost: 1.8 },
+  { location: 'Chicago, IL', country: 'United States', weight: 8, cost: 1.0 },
+  { location: 'Boston, MA', country: 'United States', weight: 6, cost: 1.3 },
+  { location: 'Austin, TX', country: 'United States', weight: 6, cost: 0.9 },
+  { location: 'Seattle, WA', country: 'United States', weight: 5, cost: 1.2 },
+  { location: 'Miami, FL', country: 'United States', weight: 5, cost: 1.1 },
+  { location: 'London', country: 'United Kingdom', weight: 10, cost: 1.5 },
+  { location: 'Berlin', country: 'Germany', weight: 6, cost: 0.8 },
+  { location: 'Toronto, ON', country: 'Canada', weight: 6, cost: 1.0 },
+  { location: 'Sydney', country: 'Australia', weight: 4, cost: 1.2 },
+  { location: 'Denver, CO', country: 'United States', weight: 3, cost: 0.9 }
+];
+
+const INTERESTS = [
+  'music', 'travel', 'cooking', 'fitness', 'movies', 'reading', 'hiking', 'gaming',
+  'photography', 'yoga', 'art', 'coffee', 'running', 'dancing', 'sustainability',
+  'tech', 'fashion', 'cycling', 'board games', 'volunteering', 'gardening', 'climbing'
+];
+const NATIONALITIES = ['American', 'British', 'Canadian', 'German', 'Australian', 'Indian', 'Brazilian', 'Mexican'];
+const OCCUPATIONS = ['Software Engineer', 'Student', 'Designer', 'Nurse', 'Teacher', 'Analyst', 'Marketing Manager', 'Consultant', 'Chef', 'Researcher'];
+const GENDERS = [['female', 47], ['male', 47], ['non-binary', 4], ['prefer-not-to-say', 2]];
+const LIFESTYLE = {
+  cleanliness: [['very_clean', 25], ['clean', 45], ['moderate', 25], ['relaxed', 5]],
+  noise: [['quiet', 45], ['moderate', 45], ['loud', 10]],
+  schedule: [['early_bird', 35], ['flexible', 40], ['night_owl', 25]],
+  pets: [['no_pets', 55], ['has_pets', 20], ['pet_friendly', 25]],
+  smoking: [['non_smoker', 85], ['outside_only', 10], ['smoker', 5]],
+  drinking: [['never', 20], ['socially', 65], ['regularly', 15]]
+};
+const AMENITIES = ['wifi', 'laundry', 'parking', 'gym', 'pool', 'dishwasher', 'balcony', 'elevator', 'air_conditioning'];
+
+const parseArgs = (argv) => {
+  const options = { ...DEFAULTS, drop: false, force: false };
+  argv.forEach(arg => {
+    const [key, value] = arg.replace(/^--/, '').split('=');
+    const camel = key.replace(/-([a-z])/g, (_, c) => c.toUpperCase());
+    if (!(camel in options)) {
+      throw new Error(`Unknown option --${key}`);
+    }
+    if (typeof options[camel] === 'boolean') {
+      options[camel] = value === undefined ? true : value === 'true';
+    } else if (typeof options[camel] === 'number') {
+      options[camel] = Number(value);
+    } else {
+      options[camel] = value;
+    }
+  });
+  return options;
+};
+
+// Small seeded PRNG (mulberry32) so runs are reproducible
+const createRandom = (seed) => {
+  let state = seed >>> 0;
+  const next = () => {
+    state = (state + 0x6D2B79F5) >>> 0;
+    let t = state;
+    t = Math.imul(t ^ (t >>> 15), t | 1);
+    t ^= t + Math.imul(t ^ (t >>> 7), t | 61);
+    return ((t ^ (t >>> 14)) >>> 0) / 4294967296;
+  };
+
+  const normal = (mean, sd) => {
+    const u = 1 - next();
+    const v = next();
+    return mean + sd * Math.sqrt(-2 * Math.log(u)) * Math.cos(2 * Math.PI * v);
+  };
+
+  const weighted = (entries, weightOf = (e) => e[1]) => {
+    const total = entries.reduce((sum, e) => sum + weightOf(e), 0);
+    let pick = next() * total;
+    for (const entry of entries) {
+      pick -= weightOf(entry);
+      if (pick <= 0) return entry;
+    }
+    return entries[entries.length - 1];
+  };
+
+  return {
+    next,
+    normal,
+    weighted,
+    int: (min, max) => min + Math.floor(next() * (max - min + 1)),
+    pick: (list) => list[Math.floor(next() * list.length)],
+    chance: (p) => next() < p,
+    logNormal: (median, sigma) => median * Math.exp(normal(0, sigma)),
+    // Geometric number of trials until success, mean (1 - p) / p
+    geometric: (p) => Math.floor(Math.log(1 - next()) / Math.log(1 - p)),
+    sampleWeighted: (list, count) => {
+      // Zipf-weighted sample without replacement
+      const chosen = new Set();
+      while (chosen.size < Math.min(count, list.length)) {
+        const rank = Math.floor(Math.pow(next(), 1.6) * list.length);
+        chosen.add(list[rank]);
+      }
+      return [...chosen];
+    }
+  };
+};
+
+const clamp = (value, min, max) => Math.max(min, Math.min(max, value));
+
+// Buffers documents per collection and flushes unordered batches with bounded concurrency
+class BulkWriter {
+  constructor(model, batchSize, concurrency) {
+    this.model = model;
+    this.batchSize = batchSize;
+    this.concurrency = concurrency;
+    this.buffer = [];
+    this.inFlight = new Set();
+    this.written = 0;
+    this.duplicates = 0;
+  }
+
+  async add(doc) {
+    this.buffer.push(doc);
+    if (this.buffer.length >= this.batchSize) {
+      await this.flush();
+    }
+  }
+
+  async flush() {
+    if (this.buffer.length === 0) return;
+    const batch = this.buffer;
+    this.buffer = [];
+
+    while (this.inFlight.size >= this.concurrency) {
+      await Promise.race(this.inFlight);
+    }
+
+    const write = this.model.collection.insertMany(batch, { ordered: false })
+      .then(result => {
+        this.written += result.insertedCount;
+      })
+      .catch(error => {
+        // Reciprocal likes can collide with the target's own swipe; skip those
+        if (error.code !== 11000 && !(error.writeErrors || []).every(e => e.code === 11000)) {
+          throw error;
+        }
+        this.written += error.result?.insertedCount ?? error.insertedCount ?? 0;
+        this.duplicates += (error.writeErrors || []).length;
+      })
+      .finally(() => this.inFlight.delete(write));
+    this.inFlight.add(write);
+  }
+
+  async close() {
+    await this.flush();
+    await Promise.all(this.inFlight);
+  }
+}
+
+const generateUser = (rng, userId, index, passwordHash, options, createdAt) => {
+  const city = rng.weighted(CITIES, c => c.weight);
+  const age = Math.round(clamp(rng.normal(27, 5.5), 18, 65));
+  const budget = Math.round(clamp(rng.logNormal(1100 * city.cost, 0.35), 300, 8000) / 25) * 25;
+  const lifestyle = {};
+  Object.entries(LIFESTYLE).forEach(([key, values]) => {
+    lifestyle[key] = rng.weighted(values)[0];
+  });
+
+  return {
+    _id: userId,
+    email: `user${index}@${options.emailDomain}`,
+    password_hash: passwordHash,
+    name: `Seed User ${index}`,
+    phone: `+1555${String(index % 10000000).padStart(7, '0')}`,
+    email_verified: rng.chance(0.8),
+    phone_verified: rng.chance(0.6),
+    two_factor_enabled: false,
+    role: 'user',
+    country: city.country,
+    nationality: rng.pick(NATIONALITIES),
+    location: city.location,
+    age,
+    gender: rng.weighted(GENDERS)[0],
+    occupation: rng.pick(OCCUPATIONS),
+    bio: 'Looking for a friendly, tidy roommate.',
+    interests: rng.sampleWeighted(INTERESTS, clamp(Math.round(rng.normal(5, 2)), 1, 10)),
+    languages: rng.chance(0.3) ? ['English', 'Spanish'] : ['English'],
+    budget,
+    preferred_location: city.location,
+    move_in_date: new Date(createdAt.getTime() + rng.int(7, 120) * 86400000),
+    amenities: rng.sampleWeighted(AMENITIES, rng.int(1, 4)),
+    lifestyle,
+    roommate_preferences: {
+      age_range: { min: Math.max(18, age - 6), max: age + 8 }
+    },
+    verification_status: rng.weighted([['verified', 30], ['pending', 68], ['banned', 2]])[0],
+    created_at: createdAt,
+    updated_at: createdAt
+  };
+};
+
+const seed = async (options) => {
+  if (process.env.NODE_ENV === 'production' && !options.force) {
+    throw new Error('Refusing to seed a production database without --force');
+  }
+
+  const rng = createRandom(options.seed);
+  const started = Date.now();
+  const now = Date.now();
+  const yearMs = 365 * 86400000;
+
+  console.log(`Hashing shared seed password (bcrypt cost 12)...`);
+  const passwordHash = await bcrypt.hash(options.password, 12);
+
+  if (options.drop) {
+    console.log('Dropping existing users, photos, matches, messages, apartments, decks and conversations...');
+    await Promise.all([User, UserPhoto, Match, Message, Apartment, SwipeDeck, Conversation].map(model =>
+      model.collection.deleteMany({})
+    ));
+  }
+
+  const writers = {
+    users: new BulkWriter(User, options.batchSize, options.concurrency),
+    photos: new BulkWriter(UserPhoto, options.batchSize, options.concurrency),
+    matches: new BulkWriter(Match, options.batchSize, options.concurrency),
+    messages: new BulkWriter(Message, options.batchSize, options.concurrency),
+    apartments: new BulkWriter(Apartment, options.batchSize, options.concurrency)
+  };
+  const bucketUrl = `https://${process.env.AWS_S3_BUCKET || 'roomieswipe-seed'}.s3.amazonaws.com`;
+
+  // Users, photos and apartments
+  const userIds = new Array(options.users);
+  const userCreated = new Array(options.users);
+  for (let i = 0; i < options.users; i++) {
+    const userId = uuidv4();
+    const createdAt = new Date(now - rng.next() * yearMs);
+    const user = generateUser(rng, userId, i, passwordHash, options, createdAt);
+    userIds[i] = userId;
+    userCreated[i] = createdAt.getTime();
+    await writers.users.add(user);
+
+    const photoCount = clamp(rng.geometric(0.3) + 1, 1, 6);
+    for (let p = 0; p < photoCount; p++) {
+      const photoId = uuidv4();
+      const s3Key = `users/${userId}/photos/${photoId}.jpg`;
+      await writers.photos.add({
+        _id: photoId,
+        user_id: userId,
+        photo_url: `${bucketUrl}/${s3Key}`,
+        s3_key: s3Key,
+        is_primary: p === 0,
+        order_index: p,
+        created_at: createdAt
+      });
+    }
+
+    if (rng.chance(0.12)) {
+      const city = CITIES.find(c => c.location === user.location);
+      const bedrooms = rng.weighted([[1, 35], [2, 40], [3, 18], [4, 7]])[0];
+      const apartmentId = uuidv4();
+      const imageCount = rng.int(1, 8);
+      await writers.apartments.add({
+        _id: apartmentId,
+        owner_id: userId,
+        title: `${bedrooms} bedroom in ${city.location}`,
+        description: 'Bright room in a shared apartment close to transit.',
+        address: `${rng.int(1, 999)} Seed Street`,
+        city: city.location.split(',')[0],
+        country: city.country,
+        price: Math.round(rng.logNormal(900 * city.cost * (0.7 + bedrooms * 0.3), 0.3)),
+        bedrooms,
+        bathrooms: Math.max(1, bedrooms - rng.int(0, 1)),
+        area: Math.round(rng.normal(35 + bedrooms * 25, 10)),
+        furnished: rng.chance(0.55),
+        amenities: rng.sampleWeighted(AMENITIES, rng.int(2, 6)),
+        images: Array.from({ length: imageCount }, () => {
+          const key = `apartments/${apartmentId}/images/${uuidv4()}.jpg`;
+          return { url: `${bucketUrl}/${key}`, s3_key: key };
+        }),
+        available_from: user.move_in_date,
+        lease_duration: rng.pick(['6 months', '12 months', 'flexible']),
+        deposit: rng.int(1, 2) * 500,
+        utilities_included: rng.chance(0.4),
+        pet_friendly: rng.chance(0.35),
+        smoking_allowed: rng.chance(0.1),
+        status: 'active',
+        created_at: createdAt,
+        updated_at: createdAt
+      });
+    }
+
+    if ((i + 1) % 100000 === 0) {
+      console.log(`  ${i + 1} users generated`);
+    }
+  }
+
+  // Swipes: heavy-tailed swipe counts, per-user like ratio, some reciprocated likes become mutual.
+  // A mutual like also writes the target's swipe back, so it is only made with targets whose
+  // own swipes are still to be generated; those skip the swiper, and the unique
+  // (user_id, target_user_id) index never drops half of a mutual pair
+  let mutualPairs = 0;
+  const likedBack = new Map();
+  for (let i = 0; i < options.users; i++) {
+    const userId = userIds[i];
+    const swipes = Math.min(options.users - 1, Math.round(rng.logNormal(40, 0.9)));
+    const likeRatio = clamp(rng.normal(0.35, 0.15), 0.02, 0.95);
+    const swipedBack = new Set(likedBack.get(i));
+    likedBack.delete(i);
+    const targets = new Set();
+    while (targets.size + swipedBack.size < swipes) {
+      const t = Math.floor(rng.next() * options.users);
+      if (t !== i && !swipedBack.has(t)) targets.add(t);
+    }
+
+    for (const t of targets) {
+      const targetId = userIds[t];
+      const swipedAt = new Date(Math.max(userCreated[i], userCreated[t]) +
+        rng.next() * (now - Math.max(userCreated[i], userCreated[t])));
+      const action = rng.chance(likeRatio) ? 'like' : 'dislike';
+      const mutual = action === 'like' && t > i && rng.chance(0.5);
+      const matchId = uuidv4();
+
+      await writers.matches.add({
+        _id: matchId,
+        user_id: userId,
+        target_user_id: targetId,
+        action,
+        is_mutual: mutual,
+        created_at: swipedAt
+      });
+
+      if (!mutual) continue;
+
+      mutualPairs++;
+      if (!likedBack.has(t)) likedBack.set(t, []);
+      likedBack.get(t).push(i);
+      await writers.matches.add({
+        _id: uuidv4(),
+        user_id: targetId,
+        target_user_id: userId,
+        action: 'like',
+        is_mutual: true,
+        created_at: new Date(swipedAt.getTime() + rng.next() * 86400000)
+      });
+
+      // Chat length: many matches never talk, the rest follow a long tail
+      if (rng.chance(0.4)) continue;
+      const length = clamp(Math.round(rng.logNormal(8, 1.1)), 1, 500);
+      let sentAt = swipedAt.getTime() + rng.next() * 3 * 86400000;
+      for (let m = 0; m < length && sentAt < now; m++) {
+        const fromSwiper = rng.chance(0.5);
+        await writers.messages.add({
+          _id: uuidv4(),
+          match_id: matchId,
+          sender_id: fromSwiper ? userId : targetId,
+          message: `Seed message ${m + 1}`,
+          message_type: 'text',
+          read: m < length - 2 || rng.chance(0.5),
+          created_at: new Date(sentAt)
+        });
+        sentAt += rng.logNormal(20 * 60000, 1.5);
+      }
+    }
+
+    if ((i + 1) % 100000 === 0) {
+      console.log(`  ${i + 1} users' swipes generated`);
+    }
+  }
+
+  await Promise.all(Object.values(writers).map(writer => writer.close()));
+
+  console.log('Building conversation summaries...');
+  const conversations = await backfillConversations(options.batchSize);
+
+  const seconds = (Date.now() - started) / 1000;
+  console.log(`Seeded in ${seconds.toFixed(1)}s:`);
+  Object.entries(writers).forEach(([name, writer]) => {
+    const skipped = writer.duplicates ? ` (${writer.duplicates} duplicate swipes skipped)` : '';
+    console.log(`  ${name}: ${writer.written}${skipped}`);
+  });
+  console.log(`  mutual pairs: ${mutualPairs}`);
+  console.log(`  conversation summaries: ${conversations * 2} (${conversations} matches)`);
+};
+
+if (require.main === module) {
+  const options = parseArgs(process.argv.slice(2));
+  connectDB()
+    .then(() => seed(options))
+    .then(() => mongoose.disconnect())
+    .catch(error => {
+      console.error('Seeding failed:', error);
+      process.exit(1);
+    });
+}
+
+module.exports = { seed, createRandom };
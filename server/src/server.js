@@ -1,4 +1,6 @@
 const express = require('express');
+const cluster = require('cluster');
+const mongoose = require('mongoose');
 const cors = require('cors');
 const helmet = require('helmet');
 const compression = require('compression');
@@ -19,6 +21,21 @@ const adminRoutes = require('./routes/admin');
 const { connectDB } = require('./database/mongodb');
 const { authenticateToken } = require('./middleware/auth');
 const { errorHandler } = require('./middleware/errorHandler');
+const { sendMessage, canJoinConversation, flushMessages } = require('./services/chat');
+const { attachAdapter } = require('./services/realtime');
+const { passwordPoolStats } = require('./services/password');
+const { verifyToken, startRevocationSync, tokenCacheStats } = require('./services/tokens');
+const { startImagePipeline } = require('./services/images');
+const { startNotificationWorker, stopNotificationWorker, notificationWorkerStats } = require('./services/notification-queue');
+const {
+  SHUTDOWN_TIMEOUT_MS,
+  resolveWorkerCount,
+  runPrimary,
+  workerHealth,
+  getClusterHealth,
+  startHealthReporting,
+  onShutdownRequest
+} = require('./cluster');
 
 const app = express();
 const server = createServer(app);
@@ -27,11 +44,21 @@ const allowedOrigins = (process.env.FRONTEND_URLS || process.env.FRONTEND_URL ||
   .split(',')
   .map((o) => o.trim())
   .filter(Boolean);
+// Sticky sessions: with several nodes, long-polling requests must keep reaching the node
+// that owns the session. SOCKET_STICKY_COOKIE sets a cookie a load balancer can pin on;
+// SOCKET_TRANSPORTS=websocket removes the need for affinity altogether
 const io = new Server(server, {
   cors: {
     origin: allowedOrigins,
     methods: ["GET", "POST"],
+    credentials: Boolean(process.env.SOCKET_STICKY_COOKIE),
   },
+  transports: (process.env.SOCKET_TRANSPORTS || 'polling,websocket').split(',').map((t) => t.trim()),
+  cookie: process.env.SOCKET_STICKY_COOKIE ? {
+    name: process.env.SOCKET_STICKY_COOKIE,
+    httpOnly: true,
+    sameSite: 'lax',
+  } : false,
 });
 
 const PORT = process.env.PORT || 3001;
@@ -43,6 +70,35 @@ const limiter = rateLimit({
   message: 'Too many requests from this IP, please try again later.'
 });
 
+// Track in-flight requests so shutdown can drain them; while draining, ask clients
+// not to reuse the connection
+let inFlight = 0;
+let draining = false;
+app.use((req, res, next) => {
+  inFlight++;
+  let finished = false;
+  const done = () => {
+    if (!finished) {
+      finished = true;
+      inFlight--;
+    }
+  };
+  res.on('finish', done);
+  res.on('close', done);
+  if (draining) {
+    res.set('Connection', 'close');
+  }
+  next();
+});
+
+// Per-worker metrics reported by /api/health and to the cluster primary
+const healthExtras = () => ({
+  in_flight: inFlight,
+  password_pool: passwordPoolStats(),
+  token_cache: tokenCacheStats(),
+  notifications: notificationWorkerStats()
+});
+
 // Middleware
 app.use(helmet());
 app.use(compression());
@@ -51,6 +107,7 @@ app.use(limiter);
 app.use(cors({
   origin: allowedOrigins,
   credentials: true,
+  exposedHeaders: ['X-Next-Cursor', 'X-Prev-Cursor'],
 }));
 app.use(express.json({ limit: '10mb' }));
 app.use(express.urlencoded({ extended: true, limit: '10mb' }));
@@ -67,9 +124,21 @@ app.use('/api/messages', authenticateToken, messageRoutes);
 app.use('/api/upload', authenticateToken, uploadRoutes);
 app.use('/api/admin', authenticateToken, adminRoutes);
 
-// Health check endpoint
+// Health check endpoint (503 while draining so load balancers stop routing here)
 app.get('/api/health', (req, res) => {
-  res.json({ status: 'OK', timestamp: new Date().toISOString() });
+  res.status(draining ? 503 : 200).json({
+    status: draining ? 'DRAINING' : 'OK',
+    timestamp: new Date().toISOString(),
+    worker: workerHealth(healthExtras())
+  });
+});
+
+// Health of every worker as last reported to the cluster primary
+app.get('/api/health/cluster', (req, res) => {
+  res.json({
+    timestamp: new Date().toISOString(),
+    workers: getClusterHealth() || [workerHealth(healthExtras())]
+  });
 });
 
 // Socket.IO for real-time messaging
@@ -79,9 +148,8 @@ io.use((socket, next) => {
     return next(new Error('Authentication error'));
   }
   
-  const jwt = require('jsonwebtoken');
   try {
-    const decoded = jwt.verify(token, process.env.JWT_SECRET);
+    const decoded = verifyToken(token);
     socket.userId = decoded.userId;
     next();
   } catch (err) {
@@ -95,29 +163,54 @@ io.on('connection', (socket) => {
   // Join user to their personal room
   socket.join(`user_${socket.userId}`);
   
-  // Handle joining conversation rooms
-  socket.on('join_conversation', (conversationId) => {
-    socket.join(`conversation_${conversationId}`);
+  // Handle joining conversation rooms; only the match's participants may listen in
+  socket.on('join_conversation', async (conversationId, ack) => {
+    const reply = typeof ack === 'function' ? ack : () => {};
+    try {
+      if (!(await canJoinConversation(socket.userId, conversationId))) {
+        return reply({ error: 'Unauthorized to join this conversation' });
+      }
+      socket.join(`conversation_${conversationId}`);
+      reply({ joined: conversationId });
+    } catch (error) {
+      console.error('Socket join conversation error:', error);
+      reply({ error: 'Failed to join conversation' });
+    }
   });
   
-  // Handle sending messages
-  socket.on('send_message', (data) => {
-    const { conversationId, message, recipientId } = data;
-    
-    // Broadcast to conversation room
-    socket.to(`conversation_${conversationId}`).emit('new_message', {
-      conversationId,
-      message,
-      senderId: socket.userId,
-      timestamp: new Date().toISOString()
-    });
-    
-    // Send notification to recipient
-    socket.to(`user_${recipientId}`).emit('message_notification', {
-      senderId: socket.userId,
-      conversationId,
-      preview: message.substring(0, 50)
-    });
+  // Handle sending messages: persist, acknowledge with the stored id, then fan out.
+  // conversationId is the match id; the recipient is resolved from the match
+  socket.on('send_message', async (data, ack) => {
+    const reply = typeof ack === 'function' ? ack : () => {};
+    try {
+      const result = await sendMessage(socket.userId, data);
+      if (result.error) {
+        return reply({ error: result.error, clientId: data && data.clientId });
+      }
+
+      const { message, recipientId } = result;
+      reply({ id: message._id, clientId: data.clientId, created_at: message.created_at });
+
+      // Broadcast to conversation room
+      socket.to(`conversation_${message.match_id}`).emit('new_message', {
+        id: message._id,
+        conversationId: message.match_id,
+        message: message.message,
+        senderId: socket.userId,
+        timestamp: message.created_at.toISOString()
+      });
+
+      // Send notification to recipient
+      socket.to(`user_${recipientId}`).emit('message_notification', {
+        senderId: socket.userId,
+        conversationId: message.match_id,
+        messageId: message._id,
+        preview: message.message.substring(0, 50)
+      });
+    } catch (error) {
+      console.error('Socket send message error:', error);
+      reply({ error: 'Failed to send message', clientId: data && data.clientId });
+    }
   });
   
   // Handle typing indicators
@@ -148,14 +241,57 @@ app.use('*', (req, res) => {
   res.status(404).json({ error: 'Route not found' });
 });
 
+// Stop accepting connections, let in-flight requests finish, flush queued chat
+// writes, finish the notification batch in hand and close the database before exiting
+async function shutdown(reason) {
+  draining = true;
+  console.log(`Process ${process.pid} draining (${reason}), ${inFlight} requests in flight`);
+
+  const forceExit = setTimeout(() => {
+    console.warn(`Drain timed out with ${inFlight} requests in flight`);
+    if (server.closeAllConnections) server.closeAllConnections();
+    process.exit(1);
+  }, SHUTDOWN_TIMEOUT_MS);
+  forceExit.unref();
+
+  try {
+    const closed = new Promise(resolve => server.close(resolve));
+    if (server.closeIdleConnections) server.closeIdleConnections();
+    io.disconnectSockets(true);
+    await closed;
+    await flushMessages();
+    await stopNotificationWorker();
+    await mongoose.disconnect();
+    process.exit(0);
+  } catch (error) {
+    console.error('Shutdown error:', error);
+    process.exit(1);
+  }
+}
+
 // Initialize database and start server
 async function startServer() {
   try {
     await connectDB();
     console.log('Database connected successfully');
-    
+
+    // Share rooms and broadcasts with the other API nodes
+    await attachAdapter(io);
+
+    // Logouts and bans recorded by any node
+    await startRevocationSync();
+
+    // Resume image derivative jobs left pending or failed
+    startImagePipeline();
+
+    // Send queued emails and SMS unless dedicated workers do (NOTIFICATION_WORKER=off)
+    startNotificationWorker();
+
+    onShutdownRequest(shutdown);
+    startHealthReporting(healthExtras);
+
     server.listen(PORT, '0.0.0.0', () => {
-      console.log(`Server running on port ${PORT}`);
+      console.log(`Server running on port ${PORT}${cluster.isWorker ? ` (worker ${process.pid})` : ''}`);
       console.log(`Environment: ${process.env.NODE_ENV}`);
       console.log(`CORS allowed origins: ${allowedOrigins.join(', ')}`);
     });
@@ -165,6 +301,15 @@ async function startServer() {
   }
 }
 
-startServer();
+// CLUSTER_WORKERS forks workers that share the listening socket (see cluster.js)
+const workerCount = resolveWorkerCount();
+if (workerCount > 1 && cluster.isPrimary) {
+  runPrimary(workerCount).catch(error => {
+    console.error('Failed to start cluster:', error);
+    process.exit(1);
+  });
+} else {
+  startServer();
+}
 
-module.exports = { app, io };
\ No newline at end of file
+module.exports = { app, io };
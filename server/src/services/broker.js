@@ -0,0 +1,205 @@
+// Minimal pub/sub broker used as a local stand-in for Redis/Mongo when running several
+// API nodes on one machine or in tests.
+//
+// Usage: node src/services/broker.js [--port=6390] [--host=127.0.0.1]
+//
+// Frames are newline-delimited JSON over TCP. Clients send
+// { op: 'subscribe' | 'unsubscribe', channel } and { op: 'publish', channel, payload };
+// the broker forwards { channel, payload } to every subscriber of the channel,
+// including the publisher. Buffers survive the round trip (see reviveBuffers).
+const net = require('net');
+const { EventEmitter } = require('events');
+
+const DEFAULT_BROKER_PORT = 6390;
+
+// JSON.stringify turns a Buffer into { type: 'Buffer', data: [...] }; turn it back
+const reviveBuffers = (key, value) => {
+  if (value && value.type === 'Buffer' && Array.isArray(value.data)) {
+    return Buffer.from(value.data);
+  }
+  return value;
+};
+
+// Split a TCP stream into JSON frames
+const onFrames = (socket, handler) => {
+  let buffered = '';
+  socket.setEncoding('utf8');
+  socket.on('data', chunk => {
+    buffered += chunk;
+    let newline = buffered.indexOf('\n');
+    while (newline !== -1) {
+      const line = buffered.slice(0, newline);
+      buffered = buffered.slice(newline + 1);
+      if (line) {
+        try {
+          handler(JSON.parse(line, reviveBuffers), line);
+        } catch (error) {
+          console.error('Broker frame error:', error.message);
+        }
+      }
+      newline = buffered.indexOf('\n');
+    }
+  });
+};
+
+const createBroker = () => {
+  const subscribers = new Map(); // channel -> Set of sockets
+  const stats = { connections: 0, published: 0, delivered: 0 };
+
+  const server = net.createServer(socket => {
+    stats.connections++;
+    const channels = new Set();
+    socket.setNoDelay(true);
+
+    onFrames(socket, frame => {
+      if (frame.op === 'subscribe') {
+        if (!subscribers.has(frame.channel)) subscribers.set(frame.channel, new Set());
+        subscribers.get(frame.channel).add(socket);
+        channels.add(frame.channel);
+      } else if (frame.op === 'unsubscribe') {
+        const set = subscribers.get(frame.channel);
+        if (set) set.delete(socket);
+        channels.delete(frame.channel);
+      } else if (frame.op === 'publish') {
+        stats.published++;
+        const set = subscribers.get(frame.channel);
+        if (!set) return;
+        const out = JSON.stringify({ channel: frame.channel, payload: frame.payload }) + '\n';
+        set.forEach(subscriber => {
+          stats.delivered++;
+          subscriber.write(out);
+        });
+      }
+    });
+
+    const cleanup = () => {
+      channels.forEach(channel => {
+        const set = subscribers.get(channel);
+        if (!set) return;
+        set.delete(socket);
+        if (set.size === 0) subscribers.delete(channel);
+      });
+      channels.clear();
+    };
+    socket.on('close', cleanup);
+    socket.on('error', cleanup);
+  });
+
+  server.stats = stats;
+  return server;
+};
+
+// Reconnecting broker client. Publishes while disconnected are dropped, as with Redis pub/sub
+class BrokerClient extends EventEmitter {
+  constructor(url) {
+    super();
+    const parsed = new URL(url);
+    this.host = parsed.hostname;
+    this.port = parseInt(parsed.port) || DEFAULT_BROKER_PORT;
+    this.handlers = new Map(); // channel -> handler
+    this.socket = null;
+    this.connected = false;
+    this.closed = false;
+    this.retryDelay = 100;
+    this.dropped = 0;
+  }
+
+  connect() {
+    return new Promise((resolve, reject) => {
+      const socket = net.connect({ host: this.host, port: this.port });
+      socket.setNoDelay(true);
+      let settled = false;
+
+      socket.on('connect', () => {
+        this.socket = socket;
+        this.connected = true;
+        this.retryDelay = 100;
+        this.handlers.forEach((handler, channel) => this.send({ op: 'subscribe', channel }));
+        this.emit('connect');
+        settled = true;
+        resolve(this);
+      });
+
+      onFrames(socket, frame => {
+        const handler = this.handlers.get(frame.channel);
+        if (handler) handler(frame.payload);
+      });
+
+      socket.on('error', error => {
+        if (!settled) {
+          settled = true;
+          reject(error);
+        } else {
+          this.emit('error', error);
+        }
+      });
+
+      socket.on('close', () => {
+        const wasConnected = this.connected;
+        this.connected = false;
+        this.socket = null;
+        if (wasConnected && !this.closed) {
+          this.emit('disconnect');
+          this.reconnect();
+        }
+      });
+    });
+  }
+
+  reconnect() {
+    setTimeout(() => {
+      if (this.closed) return;
+      this.connect().catch(() => {
+        this.retryDelay = Math.min(this.retryDelay * 2, 5000);
+        this.reconnect();
+      });
+    }, this.retryDelay);
+  }
+
+  send(frame) {
+    if (!this.connected) {
+      this.dropped++;
+      return false;
+    }
+    return this.socket.write(JSON.stringify(frame) + '\n');
+  }
+
+  subscribe(channel, handler) {
+    this.handlers.set(channel, handler);
+    this.send({ op: 'subscribe', channel });
+  }
+
+  unsubscribe(channel) {
+    this.handlers.delete(channel);
+    this.send({ op: 'unsubscribe', channel });
+  }
+
+  publish(channel, payload) {
+    return this.send({ op: 'publish', channel, payload });
+  }
+
+  close() {
+    this.closed = true;
+    if (this.socket) this.socket.end();
+  }
+}
+
+if (require.main === module) {
+  const args = Object.fromEntries(process.argv.slice(2).map(arg => arg.replace(/^--/, '').split('=')));
+  const port = parseInt(args.port) || DEFAULT_BROKER_PORT;
+  const host = args.host || '127.0.0.1';
+  const broker = createBroker();
+  broker.listen(port, host, () => {
+    console.log(`Pub/sub broker listening on tcp://${host}:${port}`);
+  });
+  setInterval(() => {
+    const { connections, published, delivered } = broker.stats;
+    console.log(`Broker: ${connections} connections, ${published} published, ${delivered} delivered`);
+  }, 60000).unref();
+}
+
+module.exports = {
+  createBroker,
+  BrokerClient,
+  DEFAULT_BROKER_PORT,
+};
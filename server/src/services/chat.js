@@ -0,0 +1,143 @@
+const { v4: uuidv4 } = require('uuid');
+const { Match, Message } = require('../models');
+const { schemas } = require('../middleware/validation');
+const { recordMessages } = require('./conversations');
+
+// Match participants cached per match id; unmatching does not change who is in a
+// match, so a short TTL only bounds memory and the window after a deleted match
+const MEMBERSHIP_TTL_MS = parseInt(process.env.CHAT_MEMBERSHIP_TTL_MS) || 5 * 60 * 1000;
+const MEMBERSHIP_CACHE_SIZE = parseInt(process.env.CHAT_MEMBERSHIP_CACHE_SIZE) || 50000;
+
+// Messages are written in batches of up to CHAT_BATCH_SIZE, waiting at most CHAT_FLUSH_MS
+const CHAT_BATCH_SIZE = parseInt(process.env.CHAT_BATCH_SIZE) || 64;
+const CHAT_FLUSH_MS = parseInt(process.env.CHAT_FLUSH_MS) || 5;
+
+const membership = new Map();
+
+// { _id, user_id, target_user_id } for a match, or null when it does not exist.
+// The cache is an LRU: hits move to the back of the Map, evictions take the front
+const getMatchMembers = async (matchId) => {
+  const cached = membership.get(matchId);
+  if (cached && cached.expires > Date.now()) {
+    membership.delete(matchId);
+    membership.set(matchId, cached);
+    return cached.match;
+  }
+
+  const match = await Match.findById(matchId).select('user_id target_user_id').lean();
+  if (!match) {
+    membership.delete(matchId);
+    return null;
+  }
+
+  // Map keeps insertion order, so the first key is the least recently used
+  membership.delete(matchId);
+  if (membership.size >= MEMBERSHIP_CACHE_SIZE) {
+    membership.delete(membership.keys().next().value);
+  }
+  membership.set(matchId, { match, expires: Date.now() + MEMBERSHIP_TTL_MS });
+  return match;
+};
+
+let pending = [];
+let flushTimer = null;
+
+// Write every queued message with one unordered insert, then update the conversation
+// summaries; each sender's promise settles with its own write result
+const flushMessages = async () => {
+  clearTimeout(flushTimer);
+  flushTimer = null;
+  const batch = pending;
+  pending = [];
+  if (batch.length === 0) {
+    return;
+  }
+
+  const failed = new Map();
+  try {
+    await Message.collection.insertMany(batch.map(entry => entry.message), { ordered: false });
+  } catch (error) {
+    const writeErrors = error.writeErrors ? [].concat(error.writeErrors) : null;
+    if (!writeErrors) {
+      batch.forEach(entry => entry.reject(error));
+      return;
+    }
+    writeErrors.forEach(writeError => failed.set(writeError.index, writeError));
+  }
+
+  const stored = batch.filter((entry, index) => !failed.has(index));
+  batch.forEach((entry, index) => {
+    if (failed.has(index)) {
+      entry.reject(new Error(failed.get(index).errmsg || 'Failed to store message'));
+    } else {
+      entry.resolve(entry.message);
+    }
+  });
+
+  try {
+    await recordMessages(stored);
+  } catch (error) {
+    console.error('Conversation summary update error:', error);
+  }
+};
+
+const enqueueMessage = (match, message) => {
+  return new Promise((resolve, reject) => {
+    pending.push({ match, message, resolve, reject });
+    if (pending.length >= CHAT_BATCH_SIZE) {
+      flushMessages();
+    } else if (!flushTimer) {
+      flushTimer = setTimeout(flushMessages, CHAT_FLUSH_MS);
+    }
+  });
+};
+
+const isMatchMember = (match, userId) =>
+  match.user_id === userId || match.target_user_id === userId;
+
+// Validate, authorize and persist a message sent over the socket.
+// Resolves to { message, recipientId } or { error } for the sender's ack
+const sendMessage = async (senderId, data) => {
+  const { error } = schemas.socketMessage.validate(data || {});
+  if (error) {
+    return { error: error.details[0].message };
+  }
+
+  const match = await getMatchMembers(data.conversationId);
+  if (!match) {
+    return { error: 'Match not found' };
+  }
+  if (!isMatchMember(match, senderId)) {
+    return { error: 'Unauthorized to send message to this match' };
+  }
+
+  const message = await enqueueMessage(match, {
+    _id: uuidv4(),
+    match_id: match._id,
+    sender_id: senderId,
+    message: data.message,
+    message_type: 'text',
+    read: false,
+    created_at: new Date()
+  });
+
+  return {
+    message,
+    recipientId: match.user_id === senderId ? match.target_user_id : match.user_id
+  };
+};
+
+// Whether the user may join the match's conversation room
+const canJoinConversation = async (userId, matchId) => {
+  if (typeof matchId !== 'string') {
+    return false;
+  }
+  const match = await getMatchMembers(matchId);
+  return Boolean(match) && isMatchMember(match, userId);
+};
+
+module.exports = {
+  sendMessage,
+  canJoinConversation,
+  flushMessages,
+};
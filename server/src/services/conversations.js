@@ -0,0 +1,175 @@
+const { User, Match, Message, Conversation } = require('../models');
+
+// Conversation summaries are keyed per match and per participant
+const conversationId = (matchId, userId) => `${matchId}:${userId}`;
+
+const otherParticipant = (match, userId) => {
+  return match.user_id === userId ? match.target_user_id : match.user_id;
+};
+
+// Recompute the summaries for these matches from the source collections. Used when a
+// match becomes mutual, is unmatched, or loses a message, and for backfills. Summaries
+// for matches that are no longer mutual (or whose users are gone) are removed
+const syncConversations = async (matchIds) => {
+  if (matchIds.length === 0) {
+    return;
+  }
+
+  const matches = await Match.find({ _id: { $in: matchIds }, is_mutual: true })
+    .select('user_id target_user_id created_at')
+    .lean();
+  const mutualIds = matches.map(match => match._id);
+  const userIds = [...new Set(matches.flatMap(match => [match.user_id, match.target_user_id]))];
+
+  const [users, lastMessages, unreadCounts] = await Promise.all([
+    User.find({ _id: { $in: userIds } }).select('name profile_picture').lean(),
+    Message.aggregate([
+      { $match: { match_id: { $in: mutualIds } } },
+      { $sort: { match_id: 1, created_at: -1 } },
+      {
+        $group: {
+          _id: '$match_id',
+          content: { $first: '$message' },
+          sender_id: { $first: '$sender_id' },
+          created_at: { $first: '$created_at' }
+        }
+      }
+    ]),
+    Message.aggregate([
+      { $match: { match_id: { $in: mutualIds }, read: false } },
+      { $group: { _id: { match_id: '$match_id', sender_id: '$sender_id' }, count: { $sum: 1 } } }
+    ])
+  ]);
+
+  const usersById = new Map(users.map(user => [user._id, user]));
+  const lastByMatch = new Map(lastMessages.map(entry => [entry._id, entry]));
+  const unread = new Map(unreadCounts.map(entry => [
+    `${entry._id.match_id}:${entry._id.sender_id}`, entry.count
+  ]));
+
+  const operations = [];
+  const live = new Set();
+  matches.forEach(match => {
+    if (!usersById.has(match.user_id) || !usersById.has(match.target_user_id)) {
+      return;
+    }
+    live.add(match._id);
+
+    const last = lastByMatch.get(match._id);
+    [match.user_id, match.target_user_id].forEach(userId => {
+      const other = usersById.get(otherParticipant(match, userId));
+      const summary = {
+        user_id: userId,
+        match_id: match._id,
+        other_user: { id: other._id, name: other.name, profile_picture: other.profile_picture },
+        unread_count: unread.get(`${match._id}:${other._id}`) || 0,
+        last_activity_at: last ? last.created_at : match.created_at,
+        created_at: match.created_at
+      };
+      if (last) {
+        summary.last_message = { content: last.content, sender_id: last.sender_id, created_at: last.created_at };
+      }
+
+      operations.push({
+        updateOne: {
+          filter: { _id: conversationId(match._id, userId) },
+          update: last ? { $set: summary } : { $set: summary, $unset: { last_message: 1 } },
+          upsert: true
+        }
+      });
+    });
+  });
+
+  const stale = matchIds.filter(matchId => !live.has(matchId));
+  if (stale.length > 0) {
+    operations.push({ deleteMany: { filter: { match_id: { $in: stale } } } });
+  }
+
+  if (operations.length > 0) {
+    await Conversation.bulkWrite(operations, { ordered: false });
+  }
+};
+
+// Apply newly stored messages to both participants' summaries.
+// `entries` is a list of { match, message } with match holding user_id/target_user_id
+const recordMessages = async (entries) => {
+  const operations = [];
+  entries.forEach(({ match, message }) => {
+    const lastMessage = {
+      content: message.message,
+      sender_id: message.sender_id,
+      created_at: message.created_at
+    };
+    const recipientId = otherParticipant(match, message.sender_id);
+
+    // Only move last_message forward, so concurrent sends cannot roll it back
+    [message.sender_id, recipientId].forEach(userId => {
+      operations.push({
+        updateOne: {
+          filter: {
+            _id: conversationId(match._id, userId),
+            last_activity_at: { $lte: message.created_at }
+          },
+          update: { $set: { last_message: lastMessage, last_activity_at: message.created_at } }
+        }
+      });
+    });
+
+    operations.push({
+      updateOne: {
+        filter: { _id: conversationId(match._id, recipientId) },
+        update: { $inc: { unread_count: 1 } }
+      }
+    });
+  });
+
+  if (operations.length > 0) {
+    await Conversation.bulkWrite(operations, { ordered: false });
+  }
+};
+
+const markConversationRead = async (matchId, userId) => {
+  await Conversation.updateOne({ _id: conversationId(matchId, userId) }, { $set: { unread_count: 0 } });
+};
+
+// Refresh the snapshot of a user shown in other people's inboxes
+const updateConversationUser = async (user) => {
+  await Conversation.updateMany(
+    { 'other_user.id': user._id },
+    { $set: { 'other_user.name': user.name, 'other_user.profile_picture': user.profile_picture } }
+  );
+};
+
+const removeUserConversations = async (userId) => {
+  await Conversation.deleteMany({ $or: [{ user_id: userId }, { 'other_user.id': userId }] });
+};
+
+// Rebuild summaries for every mutual match, `batchSize` matches at a time
+const backfillConversations = async (batchSize = 1000) => {
+  let synced = 0;
+  let batch = [];
+  const cursor = Match.find({ is_mutual: true }).select('_id').lean().cursor();
+
+  for await (const match of cursor) {
+    batch.push(match._id);
+    if (batch.length >= batchSize) {
+      await syncConversations(batch);
+      synced += batch.length;
+      batch = [];
+    }
+  }
+  if (batch.length > 0) {
+    await syncConversations(batch);
+    synced += batch.length;
+  }
+  return synced;
+};
+
+module.exports = {
+  syncConversations,
+  recordMessages,
+  markConversationRead,
+  updateConversationUser,
+  removeUserConversations,
+  backfillConversations,
+};
@@ -0,0 +1,165 @@
+const { User, Match, SwipeDeck } = require('../models');
+const { rankCandidates, SCORING_FIELDS } = require('../utils/compatibility');
+
+// Candidates kept queued per user, and the level below which a background top-up starts
+const DECK_SIZE = parseInt(process.env.DECK_SIZE) || 200;
+const DECK_LOW_WATERMARK = parseInt(process.env.DECK_LOW_WATERMARK) || 50;
+
+// Decks older than this are rebuilt from scratch so new sign-ups and bans are picked up
+const DECK_MAX_AGE_MS = (parseInt(process.env.DECK_MAX_AGE_MINUTES) || 360) * 60 * 1000;
+
+// Newest eligible users considered per refill; the best `limit` of them by
+// compatibility with the deck owner are queued
+const DECK_CANDIDATE_POOL = parseInt(process.env.DECK_CANDIDATE_POOL) || 2000;
+
+// A top-up that finds fewer unseen users than it asked for marks the deck exhausted, and
+// it is not topped up again for this long (max-age rebuilds still run)
+const DECK_EXHAUSTED_COOLDOWN_MS = (parseInt(process.env.DECK_EXHAUSTED_COOLDOWN_MINUTES) || 15) * 60 * 1000;
+
+// In-flight refills per user so concurrent requests share one rebuild
+const refills = new Map();
+
+const isExhausted = (deck) =>
+  Boolean(deck.exhausted_until) && new Date(deck.exhausted_until).getTime() > Date.now();
+
+// Ranked ids of users the caller could be shown, skipping everyone in `exclude`
+const findCandidates = async (userId, exclude, limit) => {
+  if (limit <= 0) {
+    return [];
+  }
+
+  const [user, pool] = await Promise.all([
+    User.findById(userId).select(SCORING_FIELDS).lean(),
+    User.find({
+      _id: { $nin: exclude },
+      verification_status: { $ne: 'banned' },
+      banned: { $ne: true }
+    })
+      .select(SCORING_FIELDS)
+      .sort({ created_at: -1 })
+      .limit(Math.max(limit, DECK_CANDIDATE_POOL))
+      .lean()
+  ]);
+
+  if (!user) {
+    return pool.slice(0, limit).map(candidate => candidate._id);
+  }
+
+  return rankCandidates(user, pool).slice(0, limit).map(candidate => candidate.id);
+};
+
+// Fill the user's deck up to DECK_SIZE. Tops up the existing queue unless `rebuild`
+// is set, in which case the queue is recomputed from the user's Match records
+const refillDeck = (userId, { rebuild = false } = {}) => {
+  if (refills.has(userId)) {
+    return refills.get(userId);
+  }
+
+  const refill = (async () => {
+    const [swiped, deck] = await Promise.all([
+      Match.distinct('target_user_id', { user_id: userId }),
+      rebuild ? null : SwipeDeck.findById(userId).lean()
+    ]);
+
+    const queued = deck ? deck.candidates : [];
+    const wanted = DECK_SIZE - queued.length;
+    const fresh = await findCandidates(userId, [userId, ...swiped, ...queued], wanted);
+    const exhaustedUntil = fresh.length < wanted ? new Date(Date.now() + DECK_EXHAUSTED_COOLDOWN_MS) : null;
+
+    if (deck) {
+      if (fresh.length > 0 || exhaustedUntil) {
+        // $addToSet: refills are only shared within a process, so another cluster worker
+        // may be topping up the same deck with the same candidates
+        const update = { $set: { exhausted_until: exhaustedUntil } };
+        if (fresh.length > 0) {
+          update.$addToSet = { candidates: { $each: fresh } };
+        }
+        await SwipeDeck.updateOne({ _id: userId }, update);
+      }
+    } else {
+      await SwipeDeck.updateOne(
+        { _id: userId },
+        { $set: { candidates: fresh, refreshed_at: new Date(), exhausted_until: exhaustedUntil } },
+        { upsert: true }
+      );
+    }
+
+    // A swipe saved after the Match.distinct above ran its $pull before these cards were
+    // pushed; swipes are saved before their $pull, so re-checking now catches all of them
+    if (fresh.length > 0) {
+      const swipedSince = await Match.distinct('target_user_id', {
+        user_id: userId,
+        target_user_id: { $in: fresh }
+      });
+      if (swipedSince.length > 0) {
+        await SwipeDeck.updateOne({ _id: userId }, { $pull: { candidates: { $in: swipedSince } } });
+      }
+    }
+  })().finally(() => {
+    refills.delete(userId);
+  });
+
+  refills.set(userId, refill);
+  return refill;
+};
+
+const refillInBackground = (userId, options) => {
+  refillDeck(userId, options).catch(error => {
+    console.error('Swipe deck refill error:', error);
+  });
+};
+
+// Read the next `limit` candidate ids off the front of the user's deck with a single
+// primary-key lookup. Builds the deck on first use and schedules top-ups as it drains
+const getNextCandidates = async (userId, limit) => {
+  const readDeck = async () => {
+    const [deck] = await SwipeDeck.aggregate([
+      { $match: { _id: userId } },
+      {
+        $project: {
+          candidates: { $slice: ['$candidates', limit] },
+          remaining: { $size: '$candidates' },
+          refreshed_at: 1,
+          exhausted_until: 1
+        }
+      }
+    ]);
+    return deck;
+  };
+
+  let deck = await readDeck();
+  if (!deck) {
+    await refillDeck(userId, { rebuild: true });
+    deck = await readDeck();
+    if (!deck) {
+      return [];
+    }
+  }
+
+  if (Date.now() - new Date(deck.refreshed_at).getTime() > DECK_MAX_AGE_MS) {
+    refillInBackground(userId, { rebuild: true });
+  } else if (deck.remaining < DECK_LOW_WATERMARK && !isExhausted(deck)) {
+    refillInBackground(userId);
+  }
+
+  return deck.candidates;
+};
+
+// Drop a swiped user from the deck and top it up if it is running low
+const recordSwipe = async (userId, targetUserId) => {
+  const deck = await SwipeDeck.findOneAndUpdate(
+    { _id: userId },
+    { $pull: { candidates: targetUserId } },
+    { new: true, projection: { candidates: 1, exhausted_until: 1 } }
+  ).lean();
+
+  if (deck && deck.candidates.length < DECK_LOW_WATERMARK && !isExhausted(deck)) {
+    refillInBackground(userId);
+  }
+};
+
+module.exports = {
+  getNextCandidates,
+  recordSwipe,
+  refillDeck,
+};
@@ -0,0 +1,195 @@
+const { UserPhoto, Apartment } = require('../models');
+const { getObject, putObject, headObject, MAX_FILE_SIZE } = require('./s3');
+const { createLimiter } = require('../utils/helpers');
+
+// Every uploaded photo and apartment image gets resized copies at these widths in each
+// format, stored next to the upload as <name>_w<width>.<format>
+const IMAGE_VARIANT_WIDTHS = (process.env.IMAGE_VARIANT_WIDTHS || '150,600,1200')
+  .split(',').map(width => parseInt(width)).filter(Boolean).sort((a, b) => a - b);
+const IMAGE_VARIANT_FORMATS = (process.env.IMAGE_VARIANT_FORMATS || 'webp,avif')
+  .split(',').map(format => format.trim()).filter(Boolean);
+
+// Images resized at once per process, and how often pending or failed jobs are picked up
+const IMAGE_PIPELINE_CONCURRENCY = parseInt(process.env.IMAGE_PIPELINE_CONCURRENCY) || 2;
+const IMAGE_SWEEP_INTERVAL_MS = parseInt(process.env.IMAGE_SWEEP_INTERVAL_MS) || 60000;
+const IMAGE_SWEEP_BATCH = 50;
+
+// A job is retried until it has failed this often; a claim older than the timeout is
+// assumed to belong to a process that died
+const IMAGE_MAX_ATTEMPTS = 3;
+const IMAGE_CLAIM_TIMEOUT_MS = 10 * 60 * 1000;
+
+const FORMAT_OPTIONS = {
+  webp: { quality: 80 },
+  avif: { quality: 50 }
+};
+
+const runJob = createLimiter(IMAGE_PIPELINE_CONCURRENCY);
+const queued = new Set();
+let sweepTimer = null;
+
+// Filter for images whose derivatives may be (re)generated now; used on photos and,
+// inside $elemMatch, on apartment images
+const claimable = () => ({
+  $or: [
+    { variants_status: 'pending' },
+    { variants_status: 'failed', variants_attempts: { $lt: IMAGE_MAX_ATTEMPTS } },
+    { variants_status: 'processing', variants_claimed_at: { $lt: new Date(Date.now() - IMAGE_CLAIM_TIMEOUT_MS) } }
+  ]
+});
+
+// Resize the object at `key` to every configured width and format and store the results
+const generateVariants = async (key) => {
+  const sharp = require('sharp');
+
+  // Uploads are capped at MAX_FILE_SIZE; check before pulling the object into memory
+  const head = await headObject(key);
+  if (!head.exists) {
+    throw new Error('Source image not found');
+  }
+  if (head.size > MAX_FILE_SIZE) {
+    throw new Error(`Source image is ${head.size} bytes, over the ${MAX_FILE_SIZE} byte limit`);
+  }
+  const source = await getObject(key);
+
+  const metadata = await sharp(source).metadata();
+  // EXIF orientations 5-8 are rotated by 90 degrees
+  const sourceWidth = metadata.orientation >= 5 ? metadata.height : metadata.width;
+
+  // Never enlarge: widths past the source collapse into one copy at the source width
+  const widths = [...new Set(IMAGE_VARIANT_WIDTHS.map(width => Math.min(width, sourceWidth)))];
+  const baseKey = key.replace(/\.[^./]+$/, '');
+
+  const variants = [];
+  for (const width of widths) {
+    const resized = sharp(source).rotate().resize({ width, withoutEnlargement: true });
+    for (const format of IMAGE_VARIANT_FORMATS) {
+      const body = await resized.clone().toFormat(format, FORMAT_OPTIONS[format] || {}).toBuffer();
+      const variantKey = `${baseKey}_w${width}.${format}`;
+      const result = await putObject(variantKey, body, `image/${format}`);
+      if (!result.success) {
+        throw new Error(result.error);
+      }
+      variants.push({ width, format, url: result.url, s3_key: variantKey });
+    }
+  }
+  return variants;
+};
+
+const processPhoto = async (photoId) => {
+  const photo = await UserPhoto.findOneAndUpdate(
+    { _id: photoId, s3_key: { $ne: null }, ...claimable() },
+    { variants_status: 'processing', variants_claimed_at: new Date() },
+    { new: true }
+  ).select('s3_key').lean();
+  if (!photo) {
+    return;
+  }
+
+  try {
+    const variants = await generateVariants(photo.s3_key);
+    await UserPhoto.updateOne({ _id: photoId }, { variants, variants_status: 'ready' });
+  } catch (error) {
+    console.error(`Image derivatives failed for photo ${photoId}:`, error.message);
+    await UserPhoto.updateOne({ _id: photoId }, { variants_status: 'failed', $inc: { variants_attempts: 1 } });
+  }
+};
+
+const processApartmentImage = async (apartmentId, key) => {
+  const claimed = await Apartment.updateOne(
+    { _id: apartmentId, images: { $elemMatch: { s3_key: key, ...claimable() } } },
+    { $set: { 'images.$.variants_status': 'processing', 'images.$.variants_claimed_at': new Date() } }
+  );
+  if (claimed.modifiedCount === 0) {
+    return;
+  }
+
+  try {
+    const variants = await generateVariants(key);
+    await Apartment.updateOne(
+      { _id: apartmentId, 'images.s3_key': key },
+      { $set: { 'images.$.variants': variants, 'images.$.variants_status': 'ready' } }
+    );
+  } catch (error) {
+    console.error(`Image derivatives failed for apartment ${apartmentId} image ${key}:`, error.message);
+    await Apartment.updateOne(
+      { _id: apartmentId, 'images.s3_key': key },
+      { $set: { 'images.$.variants_status': 'failed' }, $inc: { 'images.$.variants_attempts': 1 } }
+    );
+  }
+};
+
+const enqueue = (id, job) => {
+  if (queued.has(id)) return;
+  queued.add(id);
+  runJob(job)
+    .catch(error => console.error('Image pipeline error:', error))
+    .finally(() => queued.delete(id));
+};
+
+// Generate derivatives for freshly saved photos (records must have variants_status 'pending')
+const queuePhotoVariants = (photoIds) => {
+  photoIds.forEach(photoId => enqueue(`photo:${photoId}`, () => processPhoto(photoId)));
+};
+
+// Same for apartment images, identified by their S3 keys
+const queueApartmentImageVariants = (apartmentId, keys) => {
+  keys.forEach(key => enqueue(`apartment:${apartmentId}:${key}`, () => processApartmentImage(apartmentId, key)));
+};
+
+// Pick up jobs that were never started, failed, or were abandoned by a dead process
+const sweepImageVariants = async () => {
+  const [photos, apartments] = await Promise.all([
+    UserPhoto.find({ s3_key: { $ne: null }, ...claimable() }).select('_id').limit(IMAGE_SWEEP_BATCH).lean(),
+    Apartment.find({ images: { $elemMatch: claimable() } })
+      .select('images.s3_key images.variants_status images.variants_attempts images.variants_claimed_at')
+      .limit(IMAGE_SWEEP_BATCH)
+      .lean()
+  ]);
+
+  queuePhotoVariants(photos.map(photo => photo._id));
+  apartments.forEach(apartment => {
+    const keys = apartment.images
+      .filter(image => image.s3_key && ['pending', 'failed', 'processing'].includes(image.variants_status))
+      .map(image => image.s3_key);
+    queueApartmentImageVariants(apartment._id, keys);
+  });
+};
+
+const startImagePipeline = () => {
+  if (sweepTimer) return;
+  const sweep = () => {
+    sweepImageVariants().catch(error => console.error('Image pipeline sweep error:', error));
+  };
+  sweepTimer = setInterval(sweep, IMAGE_SWEEP_INTERVAL_MS);
+  sweepTimer.unref();
+  sweep();
+};
+
+// Queue derivatives for images uploaded before the pipeline existed
+const backfillImageVariants = async () => {
+  const [photos, apartments] = await Promise.all([
+    UserPhoto.updateMany(
+      { s3_key: { $ne: null }, variants_status: { $exists: false } },
+      { variants_status: 'pending' }
+    ),
+    Apartment.updateMany(
+      { images: { $elemMatch: { s3_key: { $ne: null }, variants_status: { $exists: false } } } },
+      { $set: { 'images.$[image].variants_status': 'pending' } },
+      { arrayFilters: [{ 'image.s3_key': { $ne: null }, 'image.variants_status': { $exists: false } }] }
+    )
+  ]);
+  return { photos: photos.modifiedCount, apartments: apartments.modifiedCount };
+};
+
+// S3 keys of every derivative, for deleting them along with the upload
+const variantKeys = (image) => (image.variants || []).map(variant => variant.s3_key).filter(Boolean);
+
+module.exports = {
+  queuePhotoVariants,
+  queueApartmentImageVariants,
+  sweepImageVariants,
+  startImagePipeline,
+  backfillImageVariants,
+  variantKeys,
+};
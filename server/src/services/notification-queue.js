@@ -0,0 +1,393 @@
+const { v4: uuidv4 } = require('uuid');
+const { NotificationJob, NotificationDeadLetter } = require('../models');
+const { buildEmail, sendEmailBatch, sendVerificationSMS } = require('./notification');
+
+// Emails and SMS are written to the notificationjobs collection and sent by workers, so
+// requests never wait on SendGrid or Twilio. NOTIFICATION_WORKER=inline (default) runs a
+// worker in every API process; "off" leaves sending to dedicated processes started with
+// `npm run notifications:worker`
+const NOTIFICATION_WORKER = process.env.NOTIFICATION_WORKER || 'inline';
+const NOTIFICATION_POLL_MS = parseInt(process.env.NOTIFICATION_POLL_MS) || 500;
+
+// Emails claimed per round; jobs with the same content share one SendGrid request
+// (up to 1000 personalizations). SMS go out one request per job
+const NOTIFICATION_BATCH_SIZE = Math.min(1000, parseInt(process.env.NOTIFICATION_BATCH_SIZE) || 500);
+const SMS_BATCH_SIZE = 20;
+
+// Retries back off exponentially from RETRY_BASE_MS up to RETRY_MAX_MS; after
+// NOTIFICATION_MAX_ATTEMPTS a job moves to the dead-letter collection
+const NOTIFICATION_MAX_ATTEMPTS = parseInt(process.env.NOTIFICATION_MAX_ATTEMPTS) || 6;
+const RETRY_BASE_MS = 5000;
+const RETRY_MAX_MS = 60 * 60 * 1000;
+
+// A claimed job is picked up again if its worker has not finished it by then
+const CLAIM_LEASE_MS = 2 * 60 * 1000;
+
+// Requests per second to each vendor from this host's API. The inline worker runs in
+// every cluster worker, so each paces at its share (CLUSTER_WORKER_COUNT is set by the
+// cluster primary). Limiters are per process: dedicated worker processes and other
+// hosts each add their own rate, so divide the vendor's limit between them
+const VENDOR_RATE_SHARE = Math.max(1, parseInt(process.env.CLUSTER_WORKER_COUNT) || 1);
+const VENDOR_RATES = {
+  email: (parseFloat(process.env.SENDGRID_RATE_PER_SEC) || 10) / VENDOR_RATE_SHARE,
+  sms: (parseFloat(process.env.TWILIO_RATE_PER_SEC) || 5) / VENDOR_RATE_SHARE
+};
+
+// Deleting sent jobs is retried this many times; jobs left behind are sent again
+// once their claim lapses
+const COMPLETE_ATTEMPTS = 3;
+
+const sleep = (ms) => new Promise(resolve => setTimeout(resolve, ms));
+
+// Spaces requests evenly at `perSecond`; pause() holds everything back after a 429
+class RateLimiter {
+  constructor(perSecond) {
+    this.interval = 1000 / perSecond;
+    this.next = 0;
+    this.pausedUntil = 0;
+  }
+
+  async take() {
+    const now = Date.now();
+    const at = Math.max(now, this.next, this.pausedUntil);
+    this.next = at + this.interval;
+    if (at > now) {
+      await sleep(at - now);
+    }
+  }
+
+  pause(ms) {
+    this.pausedUntil = Math.max(this.pausedUntil, Date.now() + ms);
+  }
+}
+
+const limiters = {
+  email: new RateLimiter(VENDOR_RATES.email),
+  sms: new RateLimiter(VENDOR_RATES.sms)
+};
+
+const stats = { sent: 0, requests: 0, retried: 0, dead_lettered: 0 };
+
+// ---- Producers ----
+
+let wake = () => {};
+
+// Persist notifications for the workers; `notifications` are { channel, template, to, data }
+const enqueueNotifications = async (notifications) => {
+  const now = new Date();
+  const jobs = notifications.map(notification => ({
+    _id: uuidv4(),
+    channel: notification.channel,
+    template: notification.template,
+    to: notification.to,
+    data: notification.data || {},
+    status: 'queued',
+    attempts: 0,
+    next_attempt_at: now,
+    created_at: now
+  }));
+  await NotificationJob.collection.insertMany(jobs, { ordered: false });
+  wake();
+  return jobs.map(job => job._id);
+};
+
+const verificationEmailJob = (email, code, name, type = 'email_verification', locale) => ({
+  channel: 'email',
+  template: type,
+  to: email,
+  data: { code, name, locale }
+});
+
+// Twilio Verify generates the code itself
+const verificationSMSJob = (phone) => ({ channel: 'sms', template: 'verification_sms', to: phone });
+
+const queueVerificationEmail = (email, code, name, type, locale) => enqueueNotifications([verificationEmailJob(email, code, name, type, locale)]);
+
+const queueVerificationSMS = (phone) => enqueueNotifications([verificationSMSJob(phone)]);
+
+const queueNotificationEmail = (email, subject, content, name, locale) => enqueueNotifications([{
+  channel: 'email',
+  template: 'notification',
+  to: email,
+  data: { subject, content, name, locale }
+}]);
+
+// ---- Workers ----
+
+// HTTP status of a SendGrid (ResponseError.code) or Twilio (RestException.status) error
+const errorStatus = (error) => {
+  if (typeof error.status === 'number') return error.status;
+  if (typeof error.code === 'number' && error.code >= 100 && error.code < 600) return error.code;
+  return null;
+};
+
+// Network errors, throttling and 5xx are worth retrying; other 4xx will fail again
+const classifyError = (error) => {
+  const status = errorStatus(error);
+  const headers = (error.response && error.response.headers) || error.headers || {};
+  const retryAfter = parseInt(headers['retry-after']);
+  return {
+    status,
+    retryable: !error.permanent && (!status || status === 429 || status >= 500),
+    retryAfterMs: retryAfter > 0 ? retryAfter * 1000 : 0
+  };
+};
+
+const backoffMs = (attempts, retryAfterMs) => {
+  const ceiling = Math.min(RETRY_MAX_MS, RETRY_BASE_MS * 2 ** (attempts - 1));
+  return Math.max(retryAfterMs, ceiling / 2 + Math.random() * ceiling / 2);
+};
+
+// Claim up to `limit` due jobs (or jobs whose previous claim lapsed) for this worker
+const claimJobs = async (channel, limit) => {
+  const now = new Date();
+  const due = {
+    channel,
+    $or: [
+      { status: 'queued', next_attempt_at: { $lte: now } },
+      { status: 'sending', locked_until: { $lt: now } }
+    ]
+  };
+  const candidates = await NotificationJob.find(due).sort({ next_attempt_at: 1 }).limit(limit).select('_id').lean();
+  if (candidates.length === 0) {
+    return [];
+  }
+
+  const claimId = uuidv4();
+  await NotificationJob.updateMany(
+    { _id: { $in: candidates.map(job => job._id) }, ...due },
+    { status: 'sending', claim_id: claimId, locked_until: new Date(now.getTime() + CLAIM_LEASE_MS) }
+  );
+  return NotificationJob.find({ claim_id: claimId }).lean();
+};
+
+// Remove jobs the vendor accepted. Called outside the send's try so a database error
+// here is never mistaken for a failed send and retried straight away
+const completeJobs = async (jobs) => {
+  stats.sent += jobs.length;
+  for (let attempt = 1; ; attempt++) {
+    try {
+      await NotificationJob.deleteMany({ _id: { $in: jobs.map(job => job._id) } });
+      return;
+    } catch (error) {
+      if (attempt >= COMPLETE_ATTEMPTS) {
+        console.error(`Could not complete ${jobs.length} sent notification(s); they will be resent when their claim lapses:`, error);
+        return;
+      }
+      await sleep(500 * attempt);
+    }
+  }
+};
+
+// Schedule a retry for each job, or dead-letter it when the error is permanent or it
+// has no attempts left
+const failJobs = async (jobs, error) => {
+  const { retryable, retryAfterMs } = classifyError(error);
+  const message = error.message || String(error);
+  const now = Date.now();
+
+  const retries = [];
+  const dead = [];
+  jobs.forEach(job => {
+    const attempts = job.attempts + 1;
+    if (retryable && attempts < NOTIFICATION_MAX_ATTEMPTS) {
+      retries.push({
+        updateOne: {
+          filter: { _id: job._id },
+          update: {
+            $set: { status: 'queued', attempts, next_attempt_at: new Date(now + backoffMs(attempts, retryAfterMs)), last_error: message },
+            $unset: { claim_id: '', locked_until: '' }
+          }
+        }
+      });
+    } else {
+      dead.push({
+        _id: job._id,
+        channel: job.channel,
+        template: job.template,
+        to: job.to,
+        data: job.data,
+        attempts,
+        error: message,
+        created_at: job.created_at,
+        dead_at: new Date(now)
+      });
+    }
+  });
+
+  if (retries.length > 0) {
+    await NotificationJob.bulkWrite(retries, { ordered: false });
+    stats.retried += retries.length;
+  }
+  if (dead.length > 0) {
+    console.error(`Dead-lettering ${dead.length} ${jobs[0].channel} notification(s): ${message}`);
+    await NotificationDeadLetter.bulkWrite(dead.map(letter => ({
+      replaceOne: { filter: { _id: letter._id }, replacement: letter, upsert: true }
+    })), { ordered: false });
+    await NotificationJob.deleteMany({ _id: { $in: dead.map(letter => letter._id) } });
+    stats.dead_lettered += dead.length;
+  }
+};
+
+const sendEmailGroup = async (email, jobs) => {
+  await limiters.email.take();
+  stats.requests++;
+  try {
+    await sendEmailBatch(email, jobs.map(job => ({
+      email: job.to,
+      substitutions: { name: job.data.name || '', code: job.data.code || '' }
+    })));
+  } catch (error) {
+    const { status, retryAfterMs } = classifyError(error);
+    if (status === 429) {
+      limiters.email.pause(retryAfterMs || RETRY_BASE_MS);
+    }
+
+    // One bad address rejects the whole request; send the rest one by one to isolate it
+    if (jobs.length > 1 && status >= 400 && status < 500 && status !== 429) {
+      for (const job of jobs) {
+        await sendEmailGroup(email, [job]);
+      }
+      return;
+    }
+    await failJobs(jobs, error);
+    return;
+  }
+  await completeJobs(jobs);
+};
+
+const processEmailJobs = async (jobs) => {
+  // Jobs rendering to the same subject and body (same template, locale and shared data)
+  // go out in one request
+  const groups = new Map();
+  for (const job of jobs) {
+    let email;
+    try {
+      email = buildEmail(job.template, job.data);
+    } catch (error) {
+      error.permanent = true;
+      await failJobs([job], error);
+      continue;
+    }
+    const key = `${email.subject}\u0000${email.html}`;
+    if (!groups.has(key)) {
+      groups.set(key, { email, jobs: [] });
+    }
+    groups.get(key).jobs.push(job);
+  }
+
+  for (const { email, jobs: group } of groups.values()) {
+    for (let i = 0; i < group.length; i += NOTIFICATION_BATCH_SIZE) {
+      await sendEmailGroup(email, group.slice(i, i + NOTIFICATION_BATCH_SIZE));
+    }
+  }
+};
+
+const processSMSJobs = async (jobs) => {
+  for (const job of jobs) {
+    await limiters.sms.take();
+    stats.requests++;
+    try {
+      await sendVerificationSMS(job.to);
+    } catch (error) {
+      const { status, retryAfterMs } = classifyError(error);
+      if (status === 429) {
+        limiters.sms.pause(retryAfterMs || RETRY_BASE_MS);
+      }
+      await failJobs([job], error);
+      continue;
+    }
+    await completeJobs([job]);
+  }
+};
+
+const CHANNELS = {
+  email: { limit: NOTIFICATION_BATCH_SIZE, process: processEmailJobs },
+  sms: { limit: SMS_BATCH_SIZE, process: processSMSJobs }
+};
+
+let loops = null;
+let stopping = false;
+const idlers = new Set();
+
+// Wait for the poll interval, cut short by wake()
+const idle = () => new Promise(resolve => {
+  const done = () => {
+    clearTimeout(timer);
+    idlers.delete(done);
+    resolve();
+  };
+  const timer = setTimeout(done, NOTIFICATION_POLL_MS);
+  idlers.add(done);
+});
+
+const runChannel = async (channel) => {
+  const { limit, process: processJobs } = CHANNELS[channel];
+  while (!stopping) {
+    let claimed = 0;
+    try {
+      const jobs = await claimJobs(channel, limit);
+      claimed = jobs.length;
+      if (claimed > 0) {
+        await processJobs(jobs);
+      }
+    } catch (error) {
+      console.error(`Notification worker (${channel}) error:`, error);
+    }
+    // A full batch means more are probably waiting
+    if (claimed < limit && !stopping) {
+      await idle();
+    }
+  }
+};
+
+const startNotificationWorker = ({ force = false } = {}) => {
+  if (loops || (!force && NOTIFICATION_WORKER === 'off')) return;
+  stopping = false;
+  wake = () => idlers.forEach(done => done());
+  loops = Promise.all(Object.keys(CHANNELS).map(runChannel));
+};
+
+// Finish the batches in hand and stop polling
+const stopNotificationWorker = async () => {
+  if (!loops) return;
+  stopping = true;
+  wake();
+  await loops;
+  loops = null;
+  wake = () => {};
+};
+
+const notificationWorkerStats = () => ({ running: Boolean(loops), ...stats });
+
+// Put a dead letter back on the queue with a fresh set of attempts
+const requeueDeadLetter = async (id) => {
+  const letter = await NotificationDeadLetter.findById(id).lean();
+  if (!letter) {
+    return false;
+  }
+  await NotificationJob.create({
+    _id: letter._id,
+    channel: letter.channel,
+    template: letter.template,
+    to: letter.to,
+    data: letter.data,
+    created_at: letter.created_at
+  });
+  await NotificationDeadLetter.deleteOne({ _id: id });
+  wake();
+  return true;
+};
+
+module.exports = {
+  enqueueNotifications,
+  verificationEmailJob,
+  verificationSMSJob,
+  queueVerificationEmail,
+  queueVerificationSMS,
+  queueNotificationEmail,
+  startNotificationWorker,
+  stopNotificationWorker,
+  notificationWorkerStats,
+  requeueDeadLetter,
+};
@@ -1,73 +1,80 @@
+const path = require('path');
 const sgMail = require('@sendgrid/mail');
 const twilio = require('twilio');
+const { escapeHtml, loadEmailTemplates } = require('./templates');
 
 // SendGrid configuration
 if (process.env.SENDGRID_API_KEY) {
   sgMail.setApiKey(process.env.SENDGRID_API_KEY);
 }
 
+// SENDGRID_API_URL / TWILIO_API_URL point at local stand-ins (see harness/vendors.py)
+if (process.env.SENDGRID_API_URL) {
+  sgMail.client.setDefaultRequest('baseUrl', process.env.SENDGRID_API_URL);
+}
+
 // Twilio configuration  
 const twilioClient = process.env.TWILIO_ACCOUNT_SID && process.env.TWILIO_AUTH_TOKEN 
   ? twilio(process.env.TWILIO_ACCOUNT_SID, process.env.TWILIO_AUTH_TOKEN)
   : null;
 
-const sendVerificationEmail = async (email, code, name, type = 'email_verification') => {
-  try {
-    let subject, html;
-
-    if (type === 'email_verification') {
-      subject = 'Verify your email - RoomieSwipe';
-      html = `
-        <div style="font-family: Arial, sans-serif; max-width: 600px; margin: 0 auto;">
-          <h2 style="color: #F97316;">Welcome to RoomieSwipe, ${name}!</h2>
-          <p>Thank you for signing up. Please verify your email address by entering the following code:</p>
-          <div style="background-color: #f8f9fa; padding: 20px; text-align: center; margin: 20px 0;">
-            <h1 style="color: #F97316; font-size: 32px; margin: 0; letter-spacing: 5px;">${code}</h1>
-          </div>
-          <p>This code will expire in 10 minutes.</p>
-          <p>If you didn't create an account with RoomieSwipe, please ignore this email.</p>
-          <hr style="margin: 30px 0;">
-          <p style="color: #666; font-size: 12px;">
-            This email was sent by RoomieSwipe. Please do not reply to this email.
-          </p>
-        </div>
-      `;
-    } else if (type === 'password_reset') {
-      subject = 'Reset your password - RoomieSwipe';
-      html = `
-        <div style="font-family: Arial, sans-serif; max-width: 600px; margin: 0 auto;">
-          <h2 style="color: #F97316;">Password Reset Request</h2>
-          <p>Hi ${name},</p>
-          <p>You requested to reset your password. Please use the following code:</p>
-          <div style="background-color: #f8f9fa; padding: 20px; text-align: center; margin: 20px 0;">
-            <h1 style="color: #F97316; font-size: 32px; margin: 0; letter-spacing: 5px;">${code}</h1>
-          </div>
-          <p>This code will expire in 30 minutes.</p>
-          <p>If you didn't request a password reset, please ignore this email.</p>
-          <hr style="margin: 30px 0;">
-          <p style="color: #666; font-size: 12px;">
-            This email was sent by RoomieSwipe. Please do not reply to this email.
-          </p>
-        </div>
-      `;
-    }
+if (twilioClient && process.env.TWILIO_API_URL) {
+  twilioClient.verify.baseUrl = process.env.TWILIO_API_URL;
+}
 
-    const msg = {
-      to: email,
-      from: {
-        email: process.env.VERIFIED_SENDER_EMAIL,
-        name: 'RoomieSwipe'
-      },
-      subject,
-      html,
-    };
-
-    if (process.env.SENDGRID_API_KEY) {
-      await sgMail.send(msg);
-    } else {
-      console.log(`[DEV] Email verification code for ${email}: ${code}`);
-    }
-    
+const SENDER = {
+  email: process.env.VERIFIED_SENDER_EMAIL,
+  name: 'RoomieSwipe'
+};
+
+// Templates are compiled once, here, from templates/email/<locale>/<name>.html. Values
+// that differ per recipient stay in the body as {{name}} / {{code}} and are filled in by
+// SendGrid substitutions, so one request can carry a whole batch of recipients (see
+// notification-queue.js); everything else is rendered into the shared body
+const RECIPIENT_KEYS = ['name', 'code'];
+const emailTemplates = loadEmailTemplates(path.join(__dirname, '../templates/email'), {
+  defaultLocale: process.env.EMAIL_DEFAULT_LOCALE || 'en',
+  recipientKeys: RECIPIENT_KEYS
+});
+
+// Supported email locale for a locale tag or Accept-Language header
+const resolveEmailLocale = (requested) => emailTemplates.resolveLocale(requested);
+
+// { subject, html } shared by every recipient of an email in `data.locale`
+const buildEmail = (template, data = {}) => emailTemplates.render(template, data.locale, data);
+
+// Keys stay bare: @sendgrid/mail wraps each substitution key in its substitutionWrappers
+// (default {{ }}) when it serializes a personalization, matching the {{key}} left in
+// the body. The values land in HTML bodies and are escaped like any other {{key}}
+const substitutionTags = (values = {}) => Object.fromEntries(
+  Object.entries(values).map(([key, value]) => [key, escapeHtml(value)])
+);
+
+// Send one email to many recipients in a single SendGrid request. `recipients` are
+// { email, substitutions } with the values for the template's placeholders
+const sendEmailBatch = async ({ subject, html }, recipients) => {
+  if (!process.env.SENDGRID_API_KEY) {
+    recipients.forEach(recipient => {
+      const values = Object.entries(recipient.substitutions || {}).map(([key, value]) => `${key}=${value}`).join(' ');
+      console.log(`[DEV] Email "${subject}" for ${recipient.email}: ${values}`);
+    });
+    return;
+  }
+
+  await sgMail.send({
+    from: SENDER,
+    subject,
+    html,
+    personalizations: recipients.map(recipient => ({
+      to: [{ email: recipient.email }],
+      substitutions: substitutionTags(recipient.substitutions)
+    }))
+  });
+};
+
+const sendVerificationEmail = async (email, code, name, type = 'email_verification', locale) => {
+  try {
+    await sendEmailBatch(buildEmail(type, { locale }), [{ email, substitutions: { name, code } }]);
     console.log(`Verification email sent to ${email}`);
   } catch (error) {
     console.error('Failed to send verification email:', error);
@@ -112,37 +119,9 @@ const verifyPhoneCode = async (phone, code) => {
   }
 };
 
-const sendNotificationEmail = async (email, subject, content, name) => {
+const sendNotificationEmail = async (email, subject, content, name, locale) => {
   try {
-    const html = `
-      <div style="font-family: Arial, sans-serif; max-width: 600px; margin: 0 auto;">
-        <h2 style="color: #F97316;">Hi ${name}!</h2>
-        <div style="margin: 20px 0;">
-          ${content}
-        </div>
-        <hr style="margin: 30px 0;">
-        <p style="color: #666; font-size: 12px;">
-          This email was sent by RoomieSwipe. You can manage your notification preferences in your account settings.
-        </p>
-      </div>
-    `;
-
-    const msg = {
-      to: email,
-      from: {
-        email: process.env.VERIFIED_SENDER_EMAIL,
-        name: 'RoomieSwipe'
-      },
-      subject: `${subject} - RoomieSwipe`,
-      html,
-    };
-
-    if (process.env.SENDGRID_API_KEY) {
-      await sgMail.send(msg);
-    } else {
-      console.log(`[DEV] Notification email for ${email}: ${subject}`);
-    }
-    
+    await sendEmailBatch(buildEmail('notification', { subject, content, locale }), [{ email, substitutions: { name } }]);
     console.log(`Notification email sent to ${email}`);
   } catch (error) {
     console.error('Failed to send notification email:', error);
@@ -151,6 +130,10 @@ const sendNotificationEmail = async (email, subject, content, name) => {
 };
 
 module.exports = {
+  resolveEmailLocale,
+  buildEmail,
+  substitutionTags,
+  sendEmailBatch,
   sendVerificationEmail,
   sendVerificationSMS,
   verifyPhoneCode,
@@ -0,0 +1,15 @@
+// worker_threads entry for the password pool (see ./password.js). bcryptjs is pure
+// JavaScript, so the synchronous calls here only block this thread
+const { parentPort } = require('worker_threads');
+const bcrypt = require('bcryptjs');
+
+parentPort.on('message', ({ id, op, password, hash, cost }) => {
+  const started = process.hrtime.bigint();
+  try {
+    const result = op === 'hash' ? bcrypt.hashSync(password, cost) : bcrypt.compareSync(password, hash);
+    const ms = Number(process.hrtime.bigint() - started) / 1e6;
+    parentPort.postMessage({ id, result, ms });
+  } catch (error) {
+    parentPort.postMessage({ id, error: error.message });
+  }
+});
@@ -0,0 +1,196 @@
+const path = require('path');
+const os = require('os');
+const { Worker } = require('worker_threads');
+const bcrypt = require('bcryptjs');
+
+// Cost factor for new hashes; logins transparently upgrade hashes made with another cost
+const BCRYPT_COST = parseInt(process.env.BCRYPT_COST) || 12;
+
+// Threads per process and how many operations may wait for one before callers get a 503.
+// The default splits the spare cores between cluster workers (CLUSTER_WORKER_COUNT is set
+// by the cluster primary) so N workers do not each start their own full pool
+const CLUSTER_WORKER_COUNT = Math.max(1, parseInt(process.env.CLUSTER_WORKER_COUNT) || 1);
+const PASSWORD_POOL_SIZE = parseInt(process.env.PASSWORD_POOL_SIZE)
+  || Math.max(1, Math.floor(Math.min(4, os.cpus().length - 1) / CLUSTER_WORKER_COUNT));
+const PASSWORD_QUEUE_LIMIT = parseInt(process.env.PASSWORD_QUEUE_LIMIT) || 64;
+
+// Recent operation durations kept for the percentile metrics
+const TIMING_WINDOW = 1024;
+
+class PasswordPoolBusyError extends Error {
+  constructor(retryAfter) {
+    super('Server is busy, please retry shortly');
+    this.name = 'PasswordPoolBusyError';
+    this.status = 503;
+    this.retryAfter = retryAfter;
+  }
+}
+
+class TimingWindow {
+  constructor(size) {
+    this.samples = new Float64Array(size);
+    this.count = 0;
+  }
+
+  record(ms) {
+    this.samples[this.count % this.samples.length] = ms;
+    this.count++;
+  }
+
+  summary() {
+    const filled = Math.min(this.count, this.samples.length);
+    if (filled === 0) {
+      return { count: 0, mean_ms: 0, p50_ms: 0, p99_ms: 0 };
+    }
+    const sorted = Array.from(this.samples.subarray(0, filled)).sort((a, b) => a - b);
+    const at = (p) => sorted[Math.min(filled - 1, Math.floor(p * filled))];
+    const mean = sorted.reduce((sum, value) => sum + value, 0) / filled;
+    return {
+      count: this.count,
+      mean_ms: Math.round(mean * 10) / 10,
+      p50_ms: Math.round(at(0.5) * 10) / 10,
+      p99_ms: Math.round(at(0.99) * 10) / 10
+    };
+  }
+}
+
+class PasswordPool {
+  constructor(size, queueLimit) {
+    this.size = size;
+    this.queueLimit = queueLimit;
+    this.workers = [];
+    this.idle = [];
+    this.queue = [];
+    this.nextId = 0;
+    this.rejected = 0;
+    this.failed = 0;
+    this.timings = { hash: new TimingWindow(TIMING_WINDOW), compare: new TimingWindow(TIMING_WINDOW) };
+    this.waits = new TimingWindow(TIMING_WINDOW);
+  }
+
+  spawn() {
+    const worker = new Worker(path.join(__dirname, 'password-worker.js'));
+    worker.task = null;
+
+    worker.on('message', ({ id, result, error, ms }) => {
+      const task = worker.task;
+      worker.task = null;
+      if (task && task.id === id) {
+        if (error) {
+          this.failed++;
+          task.reject(new Error(error));
+        } else {
+          this.timings[task.op].record(ms);
+          task.resolve(result);
+        }
+      }
+      this.release(worker);
+    });
+
+    // A crashed thread fails its task and is replaced
+    worker.on('error', error => {
+      console.error('Password worker error:', error);
+    });
+    worker.on('exit', () => {
+      this.workers = this.workers.filter(w => w !== worker);
+      this.idle = this.idle.filter(w => w !== worker);
+      if (worker.task) {
+        this.failed++;
+        worker.task.reject(new Error('Password worker exited'));
+        worker.task = null;
+      }
+      if (this.workers.length < this.size) {
+        this.release(this.spawn());
+      }
+    });
+
+    // Idle threads must not keep the process alive during shutdown
+    worker.unref();
+    this.workers.push(worker);
+    return worker;
+  }
+
+  start() {
+    if (this.workers.length > 0) return;
+    for (let i = 0; i < this.size; i++) {
+      this.idle.push(this.spawn());
+    }
+  }
+
+  release(worker) {
+    const next = this.queue.shift();
+    if (next) {
+      this.dispatch(worker, next);
+    } else {
+      this.idle.push(worker);
+    }
+  }
+
+  dispatch(worker, task) {
+    worker.task = task;
+    this.waits.record(Date.now() - task.queuedAt);
+    worker.postMessage({ id: task.id, op: task.op, password: task.password, hash: task.hash, cost: task.cost });
+  }
+
+  // Rough seconds until the queue drains, for Retry-After
+  retryAfter() {
+    const perOperation = this.timings.hash.summary().mean_ms || 250;
+    return Math.max(1, Math.ceil((this.queue.length * perOperation) / this.size / 1000));
+  }
+
+  run(op, fields) {
+    this.start();
+    return new Promise((resolve, reject) => {
+      const task = { id: this.nextId++, op, ...fields, resolve, reject, queuedAt: Date.now() };
+      const worker = this.idle.pop();
+      if (worker) {
+        this.dispatch(worker, task);
+      } else if (this.queue.length >= this.queueLimit) {
+        this.rejected++;
+        reject(new PasswordPoolBusyError(this.retryAfter()));
+      } else {
+        this.queue.push(task);
+      }
+    });
+  }
+
+  stats() {
+    return {
+      size: this.size,
+      busy: this.workers.length - this.idle.length,
+      queued: this.queue.length,
+      queue_limit: this.queueLimit,
+      rejected: this.rejected,
+      failed: this.failed,
+      hash: this.timings.hash.summary(),
+      compare: this.timings.compare.summary(),
+      queue_wait: this.waits.summary()
+    };
+  }
+}
+
+const pool = new PasswordPool(PASSWORD_POOL_SIZE, PASSWORD_QUEUE_LIMIT);
+
+const hashPassword = (password) => pool.run('hash', { password, cost: BCRYPT_COST });
+
+const verifyPassword = (password, hash) => pool.run('compare', { password, hash });
+
+// True when a stored hash was made with a different cost than BCRYPT_COST
+const needsRehash = (hash) => {
+  try {
+    return bcrypt.getRounds(hash) !== BCRYPT_COST;
+  } catch (error) {
+    return false;
+  }
+};
+
+const passwordPoolStats = () => pool.stats();
+
+module.exports = {
+  BCRYPT_COST,
+  PasswordPoolBusyError,
+  hashPassword,
+  verifyPassword,
+  needsRehash,
+  passwordPoolStats,
+};
@@ -0,0 +1,84 @@
+const mongoose = require('mongoose');
+const { BrokerClient } = require('./broker');
+
+// Socket.IO rooms live in process memory by default, so with more than one API node a
+// broadcast only reaches sockets on the node that sent it. SOCKET_ADAPTER selects how
+// nodes share broadcasts:
+//   memory - single node (default)
+//   broker - the local pub/sub stand-in from ./broker.js at SOCKET_BROKER_URL
+//   mongo  - @socket.io/mongo-adapter over a capped collection in the app database
+const SOCKET_ADAPTER = process.env.SOCKET_ADAPTER || 'memory';
+const SOCKET_BROKER_URL = process.env.SOCKET_BROKER_URL || 'tcp://127.0.0.1:6390';
+const SOCKET_ADAPTER_COLLECTION = process.env.SOCKET_ADAPTER_COLLECTION || 'socket_io_adapter_events';
+
+// Cluster adapter over the broker: every node subscribes to the namespace channel for
+// broadcasts and to its own response channel for fetchSockets()/serverSideEmit() replies
+const createBrokerAdapter = (client, opts = {}) => {
+  const { ClusterAdapterWithHeartbeat } = require('socket.io-adapter');
+
+  class BrokerAdapter extends ClusterAdapterWithHeartbeat {
+    constructor(nsp) {
+      super(nsp, opts);
+      this.channel = `socket.io#${nsp.name}#`;
+      this.responseChannel = `${this.channel}${this.uid}#`;
+      client.subscribe(this.channel, message => this.onMessage(message));
+      client.subscribe(this.responseChannel, response => this.onResponse(response));
+    }
+
+    doPublish(message) {
+      client.publish(this.channel, message);
+      return Promise.resolve('');
+    }
+
+    doPublishResponse(requesterUid, response) {
+      client.publish(`${this.channel}${requesterUid}#`, response);
+      return Promise.resolve();
+    }
+
+    close() {
+      super.close();
+      client.unsubscribe(this.channel);
+      client.unsubscribe(this.responseChannel);
+    }
+  }
+
+  return nsp => new BrokerAdapter(nsp);
+};
+
+const createMongoAdapter = async () => {
+  const { createAdapter } = require('@socket.io/mongo-adapter');
+  const db = mongoose.connection.db;
+  try {
+    await db.createCollection(SOCKET_ADAPTER_COLLECTION, { capped: true, size: 1e6 });
+  } catch (error) {
+    if (error.codeName !== 'NamespaceExists') throw error;
+  }
+  return createAdapter(db.collection(SOCKET_ADAPTER_COLLECTION), { addCreatedAtField: true });
+};
+
+// Attach the configured adapter to `io`. Must run after the database connects (for
+// mongo) and before the server starts accepting connections
+const attachAdapter = async (io) => {
+  if (SOCKET_ADAPTER === 'memory') {
+    return;
+  }
+
+  if (SOCKET_ADAPTER === 'broker') {
+    const client = new BrokerClient(SOCKET_BROKER_URL);
+    await client.connect();
+    client.on('disconnect', () => console.warn('Socket.IO broker connection lost, reconnecting...'));
+    client.on('error', error => console.error('Socket.IO broker error:', error.message));
+    io.adapter(createBrokerAdapter(client));
+  } else if (SOCKET_ADAPTER === 'mongo') {
+    io.adapter(await createMongoAdapter());
+  } else {
+    throw new Error(`Unknown SOCKET_ADAPTER "${SOCKET_ADAPTER}" (expected memory, broker or mongo)`);
+  }
+
+  console.log(`Socket.IO using ${SOCKET_ADAPTER} adapter`);
+};
+
+module.exports = {
+  attachAdapter,
+  createBrokerAdapter,
+};
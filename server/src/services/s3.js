@@ -2,6 +2,8 @@ const AWS = require('aws-sdk');
 const multer = require('multer');
 const { v4: uuidv4 } = require('uuid');
 const path = require('path');
+const { Transform } = require('stream');
+const { createLimiter } = require('../utils/helpers');
 
 // Configure AWS
 AWS.config.update({
@@ -10,31 +12,43 @@ AWS.config.update({
   region: process.env.AWS_REGION
 });
 
-const s3 = new AWS.S3();
+// AWS_S3_ENDPOINT points uploads at a local S3-compatible stand-in (see harness/vendors.py)
+const s3 = new AWS.S3(process.env.AWS_S3_ENDPOINT ? {
+  endpoint: process.env.AWS_S3_ENDPOINT,
+  s3ForcePathStyle: true
+} : {});
 
-// Configure multer for memory storage
-const storage = multer.memoryStorage();
+// Uploads stream through to S3 multipart uploads: each file is cut into parts of
+// S3_PART_SIZE bytes with at most S3_PART_CONCURRENCY parts buffered and in flight,
+// so a request holds roughly S3_PART_SIZE * S3_PART_CONCURRENCY bytes whatever the file size
+const S3_PART_SIZE = Math.max(5 * 1024 * 1024, parseInt(process.env.S3_PART_SIZE) || 0); // S3 minimum is 5MB
+const S3_PART_CONCURRENCY = parseInt(process.env.S3_PART_CONCURRENCY) || 4;
 
-const upload = multer({
-  storage: storage,
-  limits: {
-    fileSize: 10 * 1024 * 1024, // 10MB limit
-  },
-  fileFilter: (req, file, cb) => {
-    // Allow images and videos
-    const allowedTypes = /jpeg|jpg|png|gif|mp4|mov|avi/;
-    const extName = allowedTypes.test(path.extname(file.originalname).toLowerCase());
-    const mimeType = allowedTypes.test(file.mimetype);
-
-    if (mimeType && extName) {
-      return cb(null, true);
-    } else {
-      cb(new Error('Only images and videos are allowed'));
-    }
+// Files of one request uploaded at the same time. multer hands over the next file as
+// soon as the previous one's bytes are read, so without a bound every file of a batch
+// would be in flight at once; with it peak memory per request is about
+// S3_FILE_CONCURRENCY * S3_PART_SIZE * S3_PART_CONCURRENCY
+const S3_FILE_CONCURRENCY = parseInt(process.env.S3_FILE_CONCURRENCY) || 3;
+
+const MAX_FILE_SIZE = 10 * 1024 * 1024; // 10MB limit
+const MAX_VIDEO_SIZE = parseInt(process.env.MAX_VIDEO_SIZE) || 500 * 1024 * 1024;
+
+const fileFilter = (req, file, cb) => {
+  // Allow images and videos
+  const allowedTypes = /jpeg|jpg|png|gif|mp4|mov|avi/;
+  const extName = allowedTypes.test(path.extname(file.originalname).toLowerCase());
+  const mimeType = allowedTypes.test(file.mimetype);
+
+  if (mimeType && extName) {
+    return cb(null, true);
+  } else {
+    cb(new Error('Only images and videos are allowed'));
   }
-});
+};
 
-const uploadToS3 = async (file, folder = 'general') => {
+// `file` carries either a `buffer` or a readable `stream` as its body; `onStart`
+// receives the managed upload so callers can abort it
+const uploadToS3 = async (file, folder = 'general', { onStart } = {}) => {
   try {
     const fileExtension = path.extname(file.originalname);
     const fileName = `${folder}/${uuidv4()}${fileExtension}`;
@@ -42,12 +56,16 @@ const uploadToS3 = async (file, folder = 'general') => {
     const params = {
       Bucket: process.env.AWS_S3_BUCKET,
       Key: fileName,
-      Body: file.buffer,
+      Body: file.stream || file.buffer,
       ContentType: file.mimetype,
       ACL: 'public-read'
     };
 
-    const result = await s3.upload(params).promise();
+    const request = s3.upload(params, { partSize: S3_PART_SIZE, queueSize: S3_PART_CONCURRENCY });
+    if (onStart) {
+      onStart(request);
+    }
+    const result = await request.promise();
     
     return {
       success: true,
@@ -63,6 +81,69 @@ const uploadToS3 = async (file, folder = 'general') => {
   }
 };
 
+// multer storage engine that streams each file to S3 under `folder(req, file)`.
+// Handled files get `s3` (the uploadToS3 result) and `size`; a failed upload is
+// reported on the file rather than failing the whole request
+class S3StreamStorage {
+  constructor(folder) {
+    this.folder = folder;
+  }
+
+  _handleFile(req, file, cb) {
+    const folder = this.folder(req, file);
+    if (!folder) {
+      file.stream.resume();
+      return cb(null, { s3: { success: false, error: 'Upload destination is missing; send form fields before files' }, size: 0 });
+    }
+
+    // Later files wait for a slot, holding back the request stream meanwhile
+    if (!req.s3UploadLimiter) {
+      req.s3UploadLimiter = createLimiter(S3_FILE_CONCURRENCY);
+    }
+
+    req.s3UploadLimiter(() => {
+      let size = 0;
+      const body = new Transform({
+        transform(chunk, encoding, next) {
+          size += chunk.length;
+          next(null, chunk);
+        }
+      });
+
+      // Over the size limit multer rejects the request; don't keep a truncated object
+      let request = null;
+      file.stream.once('limit', () => request && request.abort());
+
+      file.stream.pipe(body);
+      const source = { originalname: file.originalname, mimetype: file.mimetype, stream: body };
+      return uploadToS3(source, folder, { onStart: started => { request = started; } })
+        .then(result => {
+          // Drain whatever a failed upload left unread so the next file can be parsed
+          file.stream.unpipe(body);
+          file.stream.resume();
+          cb(null, { s3: result, size });
+        });
+    });
+  }
+
+  _removeFile(req, file, cb) {
+    if (!file.s3 || !file.s3.success) {
+      return cb(null);
+    }
+    deleteFromS3(file.s3.key).then(() => cb(null));
+  }
+}
+
+// multer instance streaming to S3; `folder(req, file)` returns the key prefix, or
+// null when the request has not supplied enough to build one
+const s3Upload = (folder, { maxFileSize = MAX_FILE_SIZE } = {}) => multer({
+  storage: new S3StreamStorage(folder),
+  limits: {
+    fileSize: maxFileSize
+  },
+  fileFilter
+});
+
 const deleteFromS3 = async (key) => {
   try {
     const params = {
@@ -81,13 +162,19 @@ const deleteFromS3 = async (key) => {
   }
 };
 
-const generatePresignedUrl = (key, expires = 3600) => {
+// Presigned PUT for uploading straight to the bucket; a signed content type must be
+// sent back as the Content-Type header, together with `x-amz-acl: public-read`
+const generatePresignedUrl = (key, expires = 3600, { contentType } = {}) => {
   try {
     const params = {
       Bucket: process.env.AWS_S3_BUCKET,
       Key: key,
-      Expires: expires
+      Expires: expires,
+      ACL: 'public-read'
     };
+    if (contentType) {
+      params.ContentType = contentType;
+    }
 
     const url = s3.getSignedUrl('putObject', params);
     return {
@@ -104,9 +191,98 @@ const generatePresignedUrl = (key, expires = 3600) => {
   }
 };
 
+// Presigned browser POST for uploading straight to the bucket. Unlike a presigned PUT,
+// the signed policy carries a content-length-range, so S3 itself rejects bodies over
+// `maxSize`. The client posts `fields` followed by the file as multipart/form-data
+const generatePresignedPost = (key, expires = 3600, { contentType, maxSize = MAX_FILE_SIZE } = {}) => {
+  try {
+    const fields = { key, acl: 'public-read' };
+    if (contentType) {
+      fields['Content-Type'] = contentType;
+    }
+
+    const post = s3.createPresignedPost({
+      Bucket: process.env.AWS_S3_BUCKET,
+      Expires: expires,
+      Fields: fields,
+      Conditions: [['content-length-range', 1, maxSize]]
+    });
+    return {
+      success: true,
+      uploadUrl: post.url,
+      fields: post.fields,
+      key: key
+    };
+  } catch (error) {
+    console.error('Presigned POST error:', error);
+    return {
+      success: false,
+      error: error.message
+    };
+  }
+};
+
+// Whole object body as a Buffer
+const getObject = async (key) => {
+  const result = await s3.getObject({ Bucket: process.env.AWS_S3_BUCKET, Key: key }).promise();
+  return result.Body;
+};
+
+// Store a generated object under an exact key; for immutable outputs such as image derivatives
+const putObject = async (key, body, contentType) => {
+  try {
+    await s3.putObject({
+      Bucket: process.env.AWS_S3_BUCKET,
+      Key: key,
+      Body: body,
+      ContentType: contentType,
+      CacheControl: 'public, max-age=31536000, immutable',
+      ACL: 'public-read'
+    }).promise();
+    return { success: true, url: getObjectUrl(key), key };
+  } catch (error) {
+    console.error('S3 put error:', error);
+    return {
+      success: false,
+      error: error.message
+    };
+  }
+};
+
+// { exists, size, contentType } for an object, without downloading it
+const headObject = async (key) => {
+  try {
+    const result = await s3.headObject({ Bucket: process.env.AWS_S3_BUCKET, Key: key }).promise();
+    return { exists: true, size: result.ContentLength, contentType: result.ContentType };
+  } catch (error) {
+    if (error.code === 'NotFound' || error.statusCode === 404) {
+      return { exists: false };
+    }
+    throw error;
+  }
+};
+
+// Public URL of an object, matching the Location an upload would report
+const getObjectUrl = (key) => {
+  const bucket = process.env.AWS_S3_BUCKET;
+  const endpoint = s3.endpoint;
+  const encodedKey = key.split('/').map(encodeURIComponent).join('/');
+  if (process.env.AWS_S3_ENDPOINT) {
+    return `${endpoint.protocol}//${endpoint.host}/${bucket}/${encodedKey}`;
+  }
+  return `${endpoint.protocol}//${bucket}.${endpoint.host}/${encodedKey}`;
+};
+
 module.exports = {
-  upload,
+  MAX_FILE_SIZE,
+  MAX_VIDEO_SIZE,
+  s3Upload,
   uploadToS3,
   deleteFromS3,
-  generatePresignedUrl
+  generatePresignedUrl,
+  generatePresignedPost,
+  headObject,
+  getObject,
+  putObject,
+  getObjectUrl
 };
\ No newline at end of file
@@ -0,0 +1,153 @@
+const fs = require('fs');
+const path = require('path');
+
+// A small precompiled template engine for emails. Each template is split once, when
+// it is loaded, into static text and placeholders:
+//   {{key}}   - value HTML-escaped
+//   {{{key}}} - value inserted as-is (for trusted HTML such as notification bodies)
+// Rendering then only concatenates the pre-split segments with the values.
+const PLACEHOLDER = /\{\{\{\s*([\w.]+)\s*\}\}\}|\{\{\s*([\w.]+)\s*\}\}/g;
+
+const ESCAPES = {
+  '&': '&amp;',
+  '<': '&lt;',
+  '>': '&gt;',
+  '"': '&quot;',
+  "'": '&#39;'
+};
+const NEEDS_ESCAPE = /[&<>"']/;
+const ESCAPE_CHARS = /[&<>"']/g;
+
+const escapeHtml = (value) => {
+  const text = value == null ? '' : String(value);
+  return NEEDS_ESCAPE.test(text) ? text.replace(ESCAPE_CHARS, char => ESCAPES[char]) : text;
+};
+
+const rawValue = (value) => (value == null ? '' : String(value));
+
+// Compile `source` into a render(data) function.
+//   escape - false for plain-text output (subjects), where {{key}} is not escaped
+//   keep   - placeholders left in the output as {{key}} for a later per-recipient
+//            substitution pass (SendGrid substitutions); those values must be escaped
+//            by whoever substitutes them, so {{{key}}} is not allowed for them
+const compileTemplate = (source, { escape = true, keep = [], name = 'template' } = {}) => {
+  const statics = [''];
+  const slots = [];
+
+  let last = 0;
+  for (const match of source.matchAll(PLACEHOLDER)) {
+    const raw = match[1] !== undefined;
+    const key = raw ? match[1] : match[2];
+    statics[statics.length - 1] += source.slice(last, match.index);
+    last = match.index + match[0].length;
+
+    if (keep.includes(key)) {
+      if (raw || !escape) {
+        throw new Error(`${name}: per-recipient value "${key}" may only appear as {{${key}}} in HTML`);
+      }
+      statics[statics.length - 1] += `{{${key}}}`;
+      continue;
+    }
+    slots.push({ key, write: raw || !escape ? rawValue : escapeHtml });
+    statics.push('');
+  }
+  statics[statics.length - 1] += source.slice(last);
+
+  if (slots.length === 0) {
+    const text = statics[0];
+    return () => text;
+  }
+
+  return (data = {}) => {
+    let out = statics[0];
+    for (let i = 0; i < slots.length; i++) {
+      out += slots[i].write(data[slots[i].key]) + statics[i + 1];
+    }
+    return out;
+  };
+};
+
+// Email templates live in <dir>/<locale>/<name>.html: a "Subject: ..." line, a blank
+// line, then the HTML body
+const parseEmailFile = (file) => {
+  const source = fs.readFileSync(file, 'utf8');
+  const match = source.match(/^Subject:[ \t]*(.*)\r?\n\r?\n([\s\S]*)$/);
+  if (!match) {
+    throw new Error(`${file}: expected a "Subject:" line followed by a blank line`);
+  }
+  return { subject: match[1].trim(), html: match[2] };
+};
+
+// Load and compile every email template under `dir`. Every template must exist in
+// `defaultLocale`; other locales may translate any subset of them
+const loadEmailTemplates = (dir, { defaultLocale = 'en', recipientKeys = [] } = {}) => {
+  const templates = new Map();
+  const locales = fs.readdirSync(dir, { withFileTypes: true })
+    .filter(entry => entry.isDirectory())
+    .map(entry => entry.name)
+    .sort();
+
+  if (!locales.includes(defaultLocale)) {
+    throw new Error(`No email templates for the default locale "${defaultLocale}" in ${dir}`);
+  }
+
+  for (const locale of locales) {
+    const files = fs.readdirSync(path.join(dir, locale)).filter(file => file.endsWith('.html'));
+    for (const file of files) {
+      const name = path.basename(file, '.html');
+      const label = `${locale}/${file}`;
+      const { subject, html } = parseEmailFile(path.join(dir, locale, file));
+      templates.set(`${locale}/${name}`, {
+        subject: compileTemplate(subject, { escape: false, keep: recipientKeys, name: label }),
+        html: compileTemplate(html, { keep: recipientKeys, name: label })
+      });
+    }
+  }
+
+  templates.forEach((template, key) => {
+    const name = key.slice(key.indexOf('/') + 1);
+    if (!templates.has(`${defaultLocale}/${name}`)) {
+      throw new Error(`Email template "${key}" has no ${defaultLocale} version`);
+    }
+  });
+
+  // Best supported locale for a locale tag or Accept-Language header ("es-MX,es;q=0.9"),
+  // matching on the primary language; the default when nothing matches
+  const resolveLocale = (requested) => {
+    if (!requested) {
+      return defaultLocale;
+    }
+    const tags = String(requested).split(',')
+      .map(part => {
+        const [tag, ...params] = part.trim().split(';');
+        const q = params.map(param => param.trim()).find(param => param.startsWith('q='));
+        return { tag: tag.trim().toLowerCase(), q: q ? parseFloat(q.slice(2)) : 1 };
+      })
+      .filter(({ tag, q }) => tag && q > 0)
+      .sort((a, b) => b.q - a.q);
+
+    for (const { tag } of tags) {
+      if (locales.includes(tag)) return tag;
+      const language = tag.split(/[-_]/)[0];
+      if (locales.includes(language)) return language;
+    }
+    return defaultLocale;
+  };
+
+  // { subject, html } for template `name` in `locale` (falling back to the default)
+  const render = (name, locale, data = {}) => {
+    const template = templates.get(`${locale}/${name}`) || templates.get(`${defaultLocale}/${name}`);
+    if (!template) {
+      throw new Error(`Unknown email template "${name}"`);
+    }
+    return { subject: template.subject(data), html: template.html(data) };
+  };
+
+  return { locales, defaultLocale, resolveLocale, render };
+};
+
+module.exports = {
+  escapeHtml,
+  compileTemplate,
+  loadEmailTemplates,
+};
@@ -0,0 +1,151 @@
+const crypto = require('crypto');
+const jwt = require('jsonwebtoken');
+const { v4: uuidv4 } = require('uuid');
+const { TokenRevocation } = require('../models');
+
+// Verified claims are cached per token until the token's own `exp`, so the HMAC check
+// runs once per token per process instead of once per request
+const TOKEN_CACHE_SIZE = parseInt(process.env.TOKEN_CACHE_SIZE) || 20000;
+
+// How often each process picks up revocations written by the others
+const TOKEN_REVOCATION_POLL_MS = parseInt(process.env.TOKEN_REVOCATION_POLL_MS) || 5000;
+
+// Tokens are issued for 7 days; a revocation older than that cannot match a live token
+const TOKEN_MAX_AGE_MS = 7 * 24 * 60 * 60 * 1000;
+
+const verified = new Map(); // token hash -> { claims, expires }
+const revokedTokens = new Map(); // token hash -> expiry (ms)
+const revokedUsers = new Map(); // user id -> revoked_at (ms); older tokens are rejected
+
+let hits = 0;
+let misses = 0;
+let lastRecordedAt = null; // newest recorded_at seen (database clock, ms); null before the first sync
+let syncTimer = null;
+
+const hashToken = (token) => crypto.createHash('sha256').update(token).digest('base64url');
+
+const isRevoked = (key, claims) => {
+  if (revokedTokens.has(key)) return true;
+  const revokedAt = revokedUsers.get(claims.userId);
+  return revokedAt !== undefined && (claims.iat || 0) * 1000 <= revokedAt;
+};
+
+// Claims for a valid, unrevoked token; throws the jsonwebtoken error otherwise
+const verifyToken = (token) => {
+  const key = hashToken(token);
+  const now = Date.now();
+  let entry = verified.get(key);
+
+  if (entry && entry.expires > now) {
+    hits++;
+    verified.delete(key);
+  } else {
+    misses++;
+    const claims = jwt.verify(token, process.env.JWT_SECRET);
+    entry = { claims, expires: claims.exp ? claims.exp * 1000 : now + TOKEN_MAX_AGE_MS };
+    verified.delete(key);
+    if (verified.size >= TOKEN_CACHE_SIZE) {
+      verified.delete(verified.keys().next().value);
+    }
+  }
+  // Map keeps insertion order, so re-inserting marks the entry most recently used
+  verified.set(key, entry);
+
+  if (isRevoked(key, entry.claims)) {
+    throw new jwt.JsonWebTokenError('Token revoked');
+  }
+  return entry.claims;
+};
+
+// Bearer token from an Authorization header, or null
+const getBearerToken = (req) => {
+  const authHeader = req.headers['authorization'];
+  return (authHeader && authHeader.split(' ')[1]) || null;
+};
+
+const applyRevocation = (revocation) => {
+  if (revocation.token_hash) {
+    revokedTokens.set(revocation.token_hash, new Date(revocation.expires_at).getTime());
+    verified.delete(revocation.token_hash);
+  }
+  if (revocation.user_id) {
+    const revokedAt = new Date(revocation.revoked_at).getTime();
+    revokedUsers.set(revocation.user_id, Math.max(revokedAt, revokedUsers.get(revocation.user_id) || 0));
+  }
+};
+
+// recorded_at is stamped by the database so every node polls against one clock
+const recordRevocation = async (revocation) => {
+  applyRevocation(revocation);
+  await TokenRevocation.updateOne(
+    { _id: uuidv4() },
+    { $setOnInsert: revocation, $currentDate: { recorded_at: true } },
+    { upsert: true }
+  );
+};
+
+// Revoke a single token (logout)
+const revokeToken = (token) => {
+  const claims = jwt.decode(token) || {};
+  const expiresAt = claims.exp ? new Date(claims.exp * 1000) : new Date(Date.now() + TOKEN_MAX_AGE_MS);
+  return recordRevocation({ token_hash: hashToken(token), revoked_at: new Date(), expires_at: expiresAt });
+};
+
+// Revoke every token issued to a user so far (ban, account deletion)
+const revokeUserTokens = (userId) => {
+  const now = Date.now();
+  return recordRevocation({ user_id: userId, revoked_at: new Date(now), expires_at: new Date(now + TOKEN_MAX_AGE_MS) });
+};
+
+const syncRevocations = async () => {
+  // Poll from the newest recorded_at already seen rather than the local clock, so skew
+  // between nodes cannot skip revocations; overlap it by a second so inserts that became
+  // visible out of order are not missed. The first sync loads everything still stored
+  const filter = lastRecordedAt === null ? {} : { recorded_at: { $gte: new Date(lastRecordedAt - 1000) } };
+  const revocations = await TokenRevocation.find(filter).lean();
+  let newest = lastRecordedAt || 0;
+  revocations.forEach(revocation => {
+    applyRevocation(revocation);
+    if (revocation.recorded_at) {
+      newest = Math.max(newest, new Date(revocation.recorded_at).getTime());
+    }
+  });
+  lastRecordedAt = newest;
+
+  const now = Date.now();
+
+  revokedTokens.forEach((expires, key) => {
+    if (expires <= now) revokedTokens.delete(key);
+  });
+  revokedUsers.forEach((revokedAt, userId) => {
+    if (revokedAt <= now - TOKEN_MAX_AGE_MS) revokedUsers.delete(userId);
+  });
+};
+
+// Load outstanding revocations and keep polling for new ones. Call after connecting
+const startRevocationSync = async () => {
+  if (syncTimer) return;
+  await syncRevocations();
+  syncTimer = setInterval(() => {
+    syncRevocations().catch(error => console.error('Token revocation sync error:', error));
+  }, TOKEN_REVOCATION_POLL_MS);
+  syncTimer.unref();
+};
+
+const tokenCacheStats = () => ({
+  size: verified.size,
+  capacity: TOKEN_CACHE_SIZE,
+  hits,
+  misses,
+  revoked_tokens: revokedTokens.size,
+  revoked_users: revokedUsers.size
+});
+
+module.exports = {
+  verifyToken,
+  getBearerToken,
+  revokeToken,
+  revokeUserTokens,
+  startRevocationSync,
+  tokenCacheStats,
+};
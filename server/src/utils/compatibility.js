@@ -0,0 +1,224 @@
+// Batch compatibility scoring
+// Profiles are encoded once into compact numeric features (interned location ids,
+// lifestyle enum codes, interest bitsets) so one user can be scored against thousands
+// of candidates with integer compares and popcounts instead of string work per pair
+
+const LIFESTYLE_KEYS = ['smoking', 'pets', 'cleanliness', 'noise', 'guests'];
+
+// Profile fields encodeProfiles reads; select these when loading users to score
+const SCORING_FIELDS = 'location budget age lifestyle interests';
+
+const FLAG_LIFESTYLE = 1;
+const FLAG_INTERESTS = 2;
+
+// Interning tables live on each batch and are dropped with it, so user-supplied strings
+// never accumulate; ids start at 1 so 0 means "not set" and only compare within a batch
+const intern = (table, value) => {
+  let id = table.get(value);
+  if (id === undefined) {
+    id = table.size + 1;
+    table.set(value, id);
+  }
+  return id;
+};
+
+const internLocation = (batch, location) => {
+  const key = location.toLowerCase();
+  let id = batch.locationIds.get(key);
+  if (id === undefined) {
+    id = batch.locationNames.length;
+    batch.locationIds.set(key, id);
+    batch.locationNames.push(key);
+  }
+  return id;
+};
+
+// Substring relation between two interned locations, computed once per pair. Ids are
+// below locationNames.length, which is fixed once the batch is encoded, so the pair
+// key is unique
+const locationsOverlap = (batch, a, b) => {
+  const names = batch.locationNames;
+  const key = a < b ? a * names.length + b : b * names.length + a;
+  let overlap = batch.locationContainment.get(key);
+  if (overlap === undefined) {
+    overlap = names[a].includes(names[b]) || names[b].includes(names[a]);
+    batch.locationContainment.set(key, overlap);
+  }
+  return overlap;
+};
+
+const parseField = (value) => {
+  if (typeof value !== 'string') return value;
+  try {
+    return JSON.parse(value);
+  } catch (e) {
+    return null;
+  }
+};
+
+const popcount = (word) => {
+  word = word - ((word >>> 1) & 0x55555555);
+  word = (word & 0x33333333) + ((word >>> 2) & 0x33333333);
+  return (((word + (word >>> 4)) & 0x0F0F0F0F) * 0x01010101) >>> 24;
+};
+
+// Interest ids as listed (duplicates kept, since each one counts towards the shared
+// total as in the original scoring) plus a bitset of the distinct ones
+const encodeInterests = (batch, interests) => {
+  const ids = Int32Array.from(interests, interest => intern(batch.interestIds, interest));
+  const words = new Uint32Array(ids.length ? (Math.max(...ids) >>> 5) + 1 : 0);
+  ids.forEach(id => {
+    words[id >>> 5] |= 1 << (id & 31);
+  });
+  return { ids, words };
+};
+
+// Columnar feature batch for a list of user documents. Rows are only comparable with
+// rows of the same batch, so encode everyone who will be scored together in one call
+const encodeProfiles = (users) => {
+  const size = users.length;
+  const batch = {
+    size,
+    ids: new Array(size),
+    location: new Int32Array(size),
+    budget: new Float64Array(size),
+    age: new Float64Array(size),
+    flags: new Uint8Array(size),
+    lifestyle: new Int32Array(size * LIFESTYLE_KEYS.length),
+    interests: new Array(size),
+    locationIds: new Map(),
+    locationNames: [null],
+    locationContainment: new Map(),
+    interestIds: new Map(),
+    lifestyleIds: LIFESTYLE_KEYS.map(() => new Map())
+  };
+
+  users.forEach((user, i) => {
+    batch.ids[i] = user._id;
+    batch.location[i] = user.location ? internLocation(batch, user.location) : 0;
+    batch.budget[i] = user.budget || 0;
+    batch.age[i] = user.age || 0;
+
+    const lifestyle = user.lifestyle ? parseField(user.lifestyle) : null;
+    if (lifestyle) {
+      batch.flags[i] |= FLAG_LIFESTYLE;
+      LIFESTYLE_KEYS.forEach((key, k) => {
+        if (lifestyle[key]) {
+          batch.lifestyle[i * LIFESTYLE_KEYS.length + k] = intern(batch.lifestyleIds[k], lifestyle[key]);
+        }
+      });
+    }
+
+    const interests = user.interests ? parseField(user.interests) : null;
+    if (Array.isArray(interests)) {
+      batch.flags[i] |= FLAG_INTERESTS;
+      batch.interests[i] = encodeInterests(batch, interests);
+    }
+  });
+
+  return batch;
+};
+
+// Score row `i` of the batch against row `j` (0-100, same weights as before:
+// location 30, budget 25, lifestyle 20, age 15, interests 10)
+const scorePair = (batch, i, j) => {
+  let score = 0;
+  let factors = 0;
+
+  const locationA = batch.location[i];
+  const locationB = batch.location[j];
+  if (locationA && locationB) {
+    if (locationA === locationB) {
+      score += 30;
+    } else if (locationsOverlap(batch, locationA, locationB)) {
+      score += 20;
+    }
+    factors += 30;
+  }
+
+  const budgetA = batch.budget[i];
+  const budgetB = batch.budget[j];
+  if (budgetA && budgetB) {
+    score += Math.max(0, 1 - Math.abs(budgetA - budgetB) / Math.max(budgetA, budgetB)) * 25;
+    factors += 25;
+  }
+
+  const ageA = batch.age[i];
+  const ageB = batch.age[j];
+  if (ageA && ageB) {
+    score += Math.max(0, 1 - Math.abs(ageA - ageB) / 20) * 15;
+    factors += 15;
+  }
+
+  if (batch.flags[i] & batch.flags[j] & FLAG_LIFESTYLE) {
+    let matches = 0;
+    let total = 0;
+    const offsetA = i * LIFESTYLE_KEYS.length;
+    const offsetB = j * LIFESTYLE_KEYS.length;
+    for (let k = 0; k < LIFESTYLE_KEYS.length; k++) {
+      const valueA = batch.lifestyle[offsetA + k];
+      const valueB = batch.lifestyle[offsetB + k];
+      if (valueA && valueB) {
+        total++;
+        if (valueA === valueB) matches++;
+      }
+    }
+    if (total > 0) {
+      score += (matches / total) * 20;
+    }
+    factors += 20;
+  }
+
+  if (batch.flags[i] & batch.flags[j] & FLAG_INTERESTS) {
+    const idsA = batch.interests[i].ids;
+    const wordsA = batch.interests[i].words;
+    const wordsB = batch.interests[j].words;
+    let common = 0;
+    for (let n = 0; n < idsA.length; n++) {
+      const w = idsA[n] >>> 5;
+      if (w < wordsB.length && (wordsB[w] >>> (idsA[n] & 31)) & 1) common++;
+    }
+    const shared = Math.min(wordsA.length, wordsB.length);
+    let union = 0;
+    for (let w = 0; w < shared; w++) {
+      union += popcount(wordsA[w] | wordsB[w]);
+    }
+    const longer = wordsA.length > wordsB.length ? wordsA : wordsB;
+    for (let w = shared; w < longer.length; w++) {
+      union += popcount(longer[w]);
+    }
+    if (union > 0) {
+      score += (common / union) * 10;
+    }
+    factors += 10;
+  }
+
+  const finalScore = factors > 0 ? Math.round((score / factors) * 100) : 50;
+  return Math.max(0, Math.min(100, finalScore));
+};
+
+// Scores of one user against every candidate, in candidate order
+const scoreCandidates = (user, candidates) => {
+  const batch = encodeProfiles([user, ...candidates]);
+  const scores = new Uint8Array(candidates.length);
+  for (let j = 0; j < candidates.length; j++) {
+    scores[j] = scorePair(batch, 0, j + 1);
+  }
+  return scores;
+};
+
+// Candidate ids ordered by descending compatibility; ties keep the incoming order
+const rankCandidates = (user, candidates) => {
+  const scores = scoreCandidates(user, candidates);
+  const order = Array.from(scores.keys());
+  order.sort((x, y) => scores[y] - scores[x] || x - y);
+  return order.map(index => ({ id: candidates[index]._id, score: scores[index] }));
+};
+
+module.exports = {
+  SCORING_FIELDS,
+  encodeProfiles,
+  scorePair,
+  scoreCandidates,
+  rankCandidates,
+};
@@ -1,4 +1,5 @@
 const crypto = require('crypto');
+const { encodeProfiles, scorePair } = require('./compatibility');
 
 // Generate random verification code
 const generateVerificationCode = (length = 6) => {
@@ -52,87 +53,9 @@ const isValidEmail = (email) => {
 };
 
 // Calculate compatibility score between two users
+// Use rankCandidates / scoreCandidates from ./compatibility when scoring many users
 const calculateCompatibilityScore = (user1, user2) => {
-  let score = 0;
-  let factors = 0;
-
-  // Location compatibility (30% weight)
-  if (user1.location && user2.location) {
-    if (user1.location.toLowerCase() === user2.location.toLowerCase()) {
-      score += 30;
-    } else if (user1.location.toLowerCase().includes(user2.location.toLowerCase()) ||
-               user2.location.toLowerCase().includes(user1.location.toLowerCase())) {
-      score += 20;
-    }
-    factors += 30;
-  }
-
-  // Budget compatibility (25% weight)
-  if (user1.budget && user2.budget) {
-    const budgetDiff = Math.abs(user1.budget - user2.budget);
-    const maxBudget = Math.max(user1.budget, user2.budget);
-    const budgetCompatibility = Math.max(0, 1 - (budgetDiff / maxBudget));
-    score += budgetCompatibility * 25;
-    factors += 25;
-  }
-
-  // Age compatibility (15% weight)
-  if (user1.age && user2.age) {
-    const ageDiff = Math.abs(user1.age - user2.age);
-    const ageCompatibility = Math.max(0, 1 - (ageDiff / 20)); // 20 year max difference
-    score += ageCompatibility * 15;
-    factors += 15;
-  }
-
-  // Lifestyle compatibility (20% weight)
-  if (user1.lifestyle && user2.lifestyle) {
-    try {
-      const lifestyle1 = typeof user1.lifestyle === 'string' ? JSON.parse(user1.lifestyle) : user1.lifestyle;
-      const lifestyle2 = typeof user2.lifestyle === 'string' ? JSON.parse(user2.lifestyle) : user2.lifestyle;
-      
-      let lifestyleMatches = 0;
-      let lifestyleTotal = 0;
-
-      const lifestyleKeys = ['smoking', 'pets', 'cleanliness', 'noise', 'guests'];
-      lifestyleKeys.forEach(key => {
-        if (lifestyle1[key] && lifestyle2[key]) {
-          lifestyleTotal++;
-          if (lifestyle1[key] === lifestyle2[key]) {
-            lifestyleMatches++;
-          }
-        }
-      });
-
-      if (lifestyleTotal > 0) {
-        score += (lifestyleMatches / lifestyleTotal) * 20;
-      }
-      factors += 20;
-    } catch (e) {
-      // Invalid JSON, skip lifestyle compatibility
-    }
-  }
-
-  // Interests compatibility (10% weight)
-  if (user1.interests && user2.interests) {
-    try {
-      const interests1 = typeof user1.interests === 'string' ? JSON.parse(user1.interests) : user1.interests;
-      const interests2 = typeof user2.interests === 'string' ? JSON.parse(user2.interests) : user2.interests;
-      
-      const commonInterests = interests1.filter(interest => interests2.includes(interest));
-      const totalInterests = new Set([...interests1, ...interests2]).size;
-      
-      if (totalInterests > 0) {
-        score += (commonInterests.length / totalInterests) * 10;
-      }
-      factors += 10;
-    } catch (e) {
-      // Invalid JSON, skip interests compatibility
-    }
-  }
-
-  // Normalize score
-  const finalScore = factors > 0 ? Math.round((score / factors) * 100) : 50;
-  return Math.max(0, Math.min(100, finalScore));
+  return scorePair(encodeProfiles([user1, user2]), 0, 1);
 };
 
 // Paginate results
@@ -153,6 +76,67 @@ const paginate = (page, limit, totalCount) => {
   };
 };
 
+// Opaque keyset cursor over (timestamp, _id)
+const encodeCursor = (timestamp, id) => {
+  return Buffer.from(`${new Date(timestamp).getTime()}:${id}`).toString('base64url');
+};
+
+// Returns { timestamp, _id } or null when the cursor is malformed
+const decodeCursor = (cursor) => {
+  if (typeof cursor !== 'string') return null;
+  const decoded = Buffer.from(cursor, 'base64url').toString();
+  const separator = decoded.indexOf(':');
+  const timestamp = parseInt(decoded.slice(0, separator));
+  const id = decoded.slice(separator + 1);
+  if (separator < 1 || !Number.isFinite(timestamp) || !id) return null;
+  return { timestamp: new Date(timestamp), _id: id };
+};
+
+// Query fragment selecting documents strictly before (older than) or after a decoded
+// cursor, ordered on `field` then _id
+const cursorFilter = (position, direction = 'before', field = 'created_at') => {
+  const op = direction === 'after' ? '$gt' : '$lt';
+  return {
+    $or: [
+      { [field]: { [op]: position.timestamp } },
+      { [field]: position.timestamp, _id: { [op]: position._id } }
+    ]
+  };
+};
+
+// Page size for a keyset-paginated list, or null when the request sends neither ?limit
+// nor ?cursor. Those lists returned every row before they were paginated, so clients
+// that never asked for pages still get the whole list
+const listPageLimit = (query, defaultLimit = 50, maxLimit = 100) => {
+  if (query.limit === undefined && query.cursor === undefined) return null;
+  return Math.min(parseInt(query.limit) || defaultLimit, maxLimit);
+};
+
+// Returns run(task) that starts at most `limit` of the async tasks at a time and
+// resolves/rejects with each task's own result
+const createLimiter = (limit) => {
+  let active = 0;
+  const waiting = [];
+
+  const next = () => {
+    if (active >= limit || waiting.length === 0) return;
+    active++;
+    const { task, resolve, reject } = waiting.shift();
+    Promise.resolve()
+      .then(task)
+      .then(resolve, reject)
+      .finally(() => {
+        active--;
+        next();
+      });
+  };
+
+  return (task) => new Promise((resolve, reject) => {
+    waiting.push({ task, resolve, reject });
+    next();
+  });
+};
+
 module.exports = {
   generateVerificationCode,
   generateSecureToken,
@@ -161,5 +145,10 @@ module.exports = {
   formatPhoneNumber,
   isValidEmail,
   calculateCompatibilityScore,
-  paginate
+  paginate,
+  encodeCursor,
+  decodeCursor,
+  cursorFilter,
+  listPageLimit,
+  createLimiter
 };
\ No newline at end of file
@@ -0,0 +1,50 @@
+// Picking the image derivative that fits a response (see services/images.js).
+//
+// Clients describe what they will render with query parameters:
+//   image_width  - rendered width in device pixels (CSS width * devicePixelRatio)
+//   image_format - supported formats in order of preference, e.g. "avif,webp"
+// Without them each route's default width is used with WebP.
+const DEFAULT_IMAGE_FORMATS = ['webp'];
+const MAX_IMAGE_WIDTH = 4096;
+
+const imagePreferences = (req, defaultWidth) => {
+  const width = parseInt(req.query.image_width) || defaultWidth;
+  const formats = req.query.image_format
+    ? String(req.query.image_format).split(',').map(format => format.trim().toLowerCase()).filter(Boolean)
+    : DEFAULT_IMAGE_FORMATS;
+  return { width: Math.min(Math.max(width, 1), MAX_IMAGE_WIDTH), formats };
+};
+
+// Smallest derivative at least `width` wide in the first preferred format that has any,
+// else the widest one in that format; null when none is usable
+const pickVariant = (variants, { width, formats }) => {
+  if (!variants || variants.length === 0) {
+    return null;
+  }
+  for (const format of formats) {
+    const candidates = variants
+      .filter(variant => variant.format === format)
+      .sort((a, b) => a.width - b.width);
+    if (candidates.length > 0) {
+      return candidates.find(variant => variant.width >= width) || candidates[candidates.length - 1];
+    }
+  }
+  return null;
+};
+
+// Public image shape: `url` is the best-fitting derivative (or the upload itself until
+// derivatives exist) and `original_url` the upload; pipeline bookkeeping is dropped
+const fitImage = (image, preferences) => {
+  const { variants, variants_status, variants_attempts, variants_claimed_at, ...rest } = image;
+  const variant = pickVariant(variants, preferences);
+  if (!variant) {
+    return rest;
+  }
+  return { ...rest, url: variant.url, original_url: rest.url, width: variant.width, format: variant.format };
+};
+
+module.exports = {
+  imagePreferences,
+  pickVariant,
+  fitImage,
+};